@@ -0,0 +1,108 @@
+"""benchmarks of move generation and games
+
+Run with ``make bench``. Needs pytest-benchmark.
+Move generation, actions and random games are measured for every even board
+length from 4 to 16, so ``--benchmark-group-by=func`` shows the time versus N.
+"""
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Protocol, Tuple, cast
+
+import numpy as np
+import pytest
+
+from pyreversi import logic
+from pyreversi.game import Game
+from pyreversi.models import Disk
+from pyreversi.mutable import MutableGame
+from pyreversi.perft import perft_mutable
+from pyreversi.players import RandomPlayer
+from pyreversi.tournament import play_game
+from pyreversi.vecenv import VecGame
+
+if TYPE_CHECKING:
+    from pytest_benchmark.fixture import BenchmarkFixture
+
+pytest.importorskip("pytest_benchmark")
+
+
+class _Pedantic(Protocol):
+    """typed signature of BenchmarkFixture.pedantic as used here"""
+
+    def __call__(
+        self,
+        target: Callable[[Game], None],
+        *,
+        setup: Callable[[], Tuple[Tuple[Game], Dict[str, object]]],
+        rounds: int,
+    ) -> object: ...
+
+
+# 盤の大きさに対する伸び方を見るため，4から16まで
+LENGTHS = list(range(4, 17, 2))
+
+
+def _midgame(length: int) -> Game:
+    """position after random moves, the same for every run"""
+    rng = random.Random(length)
+    game = Game.init_game(length)
+    for _ in range(length * length // 3):
+        actions = sorted(game.get_legal_actions())
+        game.execute_action(rng.choice(actions) if actions else None)
+    return game
+
+
+@pytest.fixture(params=logic.available_backends())
+def backend(request: pytest.FixtureRequest) -> Iterator[str]:
+    with logic.use_backend(request.param):
+        yield request.param
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_obtain_legal_actions(
+    benchmark: BenchmarkFixture, backend: str, length: int
+) -> None:
+    game = _midgame(length)
+    benchmark(logic.obtain_legal_actions, game.board, game.current_disk)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_execute_action(benchmark: BenchmarkFixture, backend: str, length: int) -> None:
+    game = _midgame(length)
+    action = min(game.get_legal_actions())
+    benchmark(logic.execute_action, game.board, game.current_disk, action)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_game_execute_action(
+    benchmark: BenchmarkFixture, backend: str, length: int
+) -> None:
+    game = _midgame(length)
+    action = min(game.get_legal_actions())
+
+    def setup() -> Tuple[Tuple[Game], Dict[str, object]]:
+        return (Game(game.board, game.current_disk),), {}
+
+    pedantic = cast(_Pedantic, benchmark.pedantic)
+    pedantic(lambda fresh: fresh.execute_action(action), setup=setup, rounds=200)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_random_game(benchmark: BenchmarkFixture, backend: str, length: int) -> None:
+    random.seed(0)
+    benchmark(play_game, RandomPlayer(), RandomPlayer(), length)
+
+
+def test_perft(benchmark: BenchmarkFixture) -> None:
+    game = MutableGame(Game.init_game(8).board, Disk.DARK)
+    assert benchmark(perft_mutable, game, 5) == 1396
+
+
+@pytest.mark.parametrize("num_games", [256, 4096])
+def test_vecgame_step(benchmark: BenchmarkFixture, num_games: int) -> None:
+    env = VecGame(num_games)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        env.step(env.random_actions(rng))
+    benchmark(lambda: env.step(env.random_actions(rng)))
@@ -0,0 +1,405 @@
+"""position analysis
+
+best move and score of every position of a stream, over a process pool.
+
+Input is read from a file or stdin in one of two formats:
+
+    text: boards as printed by ``Board.__str__`` (``x`` dark, ``o`` light,
+        ``-`` empty), one row per line, optionally followed by a line ``x`` or
+        ``o`` for the side to move (dark if omitted). Blocks are separated by
+        blank lines, and lines starting with ``#`` are ignored.
+    binary: concatenated ``pyreversi.codec`` records, lengths may be mixed.
+
+The format is detected from the first bytes unless given. Positions are
+searched by ``search.AlphaBetaSearch`` in chunks over worker processes, with
+at most ``2 * workers`` chunks submitted and not yet written, so memory stays
+flat however long the input is. Results are written as JSON lines in input
+order as soon as they are ready:
+
+    {"index": 0, "disk": "x", "move": [2, 3], "score": 12, "depth": 6,
+     "nodes": 10234}
+
+``move`` is null for a pass. With ``--output PATH --resume`` the complete
+lines already in the output are kept and their positions are skipped, so an
+interrupted run continues where it stopped. Workers cache results by the
+symmetry-canonical position (``pyreversi.symmetry``), so rotated and
+reflected copies of a position are searched once per worker.
+
+Usage:
+    python -m pyreversi.analysis positions.txt --output results.jsonl --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import (
+    IO,
+    BinaryIO,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from pyreversi import codec, symmetry
+from pyreversi.evaluation import PatternEvaluator
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk
+from pyreversi.search import AlphaBetaSearch, Evaluator, SearchResult, evaluate
+from pyreversi.transposition import TranspositionTable
+
+FORMATS = ("auto", "text", "binary")
+_CELLS = {"x": int(Disk.DARK), "o": int(Disk.LIGHT), "-": 0}
+_SIDES = {"x": Disk.DARK, "o": Disk.LIGHT}
+_TEXT_BYTES = b"xo- \t\r\n"
+_PEEK = 64
+# board and side to move
+Item = Tuple[Board, Disk]
+Result = Dict[str, Union[int, str, None, List[int]]]
+
+
+class AnalysisOptions(NamedTuple):
+    """search settings of the analysis
+
+    Attributes:
+        time_limit (Optional[float]): seconds per position
+        max_depth (Optional[int]): max depth per position
+        evaluator (Optional[str]): weight file of ``evaluation.PatternEvaluator``,
+            None means ``search.evaluate``
+        cache (bool): reuse results of symmetric positions
+    """
+
+    time_limit: Optional[float] = 0.1
+    max_depth: Optional[int] = None
+    evaluator: Optional[str] = None
+    cache: bool = True
+
+
+def _parse_block(lines: List[str], line_number: int) -> Item:
+    """parse a text block
+
+    Args:
+        lines (List[str]): rows and the optional side to move
+        line_number (int): line number of the first line, for errors
+
+    Raises:
+        ValueError: malformed block
+
+    Returns:
+        Item: board and side to move
+    """
+    disk = Disk.DARK
+    if len(lines) > 1 and lines[-1] in _SIDES:
+        disk = _SIDES[lines[-1]]
+        lines = lines[:-1]
+    length = len(lines)
+    if any(len(line) != length for line in lines):
+        raise ValueError(f"line {line_number}: board is not square")
+    try:
+        cells = [_CELLS[char] for line in lines for char in line]
+    except KeyError as error:
+        raise ValueError(f"line {line_number}: unknown square {error}") from error
+    return Board(np.array(cells, dtype=np.int8).reshape(length, length)), disk
+
+
+def iter_text_positions(lines: Iterable[str]) -> Iterator[Item]:
+    """positions of text boards
+
+    Args:
+        lines (Iterable[str]): lines of the input
+
+    Raises:
+        ValueError: malformed board
+
+    Yields:
+        Iterator[Item]: board and side to move
+    """
+    block: List[str] = []
+    first = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        if line:
+            if not block:
+                first = number
+            block.append(line)
+        elif block:
+            yield _parse_block(block, first)
+            block = []
+    if block:
+        yield _parse_block(block, first)
+
+
+def iter_binary_positions(stream: BinaryIO) -> Iterator[Item]:
+    """positions of concatenated codec records
+
+    Args:
+        stream (BinaryIO): input stream
+
+    Raises:
+        ValueError: truncated record
+
+    Yields:
+        Iterator[Item]: board and side to move
+    """
+    while True:
+        header = stream.read(1)
+        if not header:
+            return
+        size = codec.record_size(header[0] >> 1)
+        body = stream.read(size - 1)
+        if len(body) != size - 1:
+            raise ValueError("truncated record")
+        yield codec.decode(header + body)
+
+
+def read_positions(stream: BinaryIO, input_format: str = "auto") -> Iterator[Item]:
+    """positions of a stream in text or binary format
+
+    Args:
+        stream (BinaryIO): input stream
+        input_format (str, optional): "text", "binary" or "auto", which looks at
+            the first bytes. Defaults to "auto".
+
+    Raises:
+        ValueError: unknown format
+
+    Returns:
+        Iterator[Item]: board and side to move
+    """
+    if input_format not in FORMATS:
+        raise ValueError(f"unknown format '{input_format}'")
+    buffered = (
+        stream
+        if isinstance(stream, io.BufferedReader)
+        else io.BufferedReader(stream)  # type: ignore[type-var]
+    )
+    if input_format == "auto":
+        # 先頭がコメントまで盤の文字と空白だけならtext
+        head = buffered.peek(_PEEK)[:_PEEK].split(b"#", 1)[0]
+        input_format = "binary" if head.translate(None, _TEXT_BYTES) else "text"
+    if input_format == "binary":
+        return iter_binary_positions(buffered)
+    return iter_text_positions(io.TextIOWrapper(buffered, encoding="utf-8"))
+
+
+# worker processごとの探索と，対称形のcache
+_searches: Dict[AnalysisOptions, AlphaBetaSearch] = {}
+
+
+def _search(options: AnalysisOptions) -> AlphaBetaSearch:
+    search = _searches.get(options)
+    if search is None:
+        evaluator: Evaluator = (
+            evaluate
+            if options.evaluator is None
+            else PatternEvaluator.load(options.evaluator)
+        )
+        search = _searches[options] = AlphaBetaSearch(
+            evaluator, TranspositionTable(1 << 18)
+        )
+    return search
+
+
+def analyze_position(board: Board, disk: Disk, options: AnalysisOptions) -> Result:
+    """best move and score of a position
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+        options (AnalysisOptions): search settings
+
+    Returns:
+        Result: "disk", "move", "score", "depth" and "nodes"
+    """
+    search = _search(options)
+
+    def run(target: Board, side: Disk) -> SearchResult:
+        return search.search(Game(target, side), options.time_limit, options.max_depth)
+
+    if options.cache:
+        result, form = symmetry.shared_cache().get_or_compute(
+            board, disk, run, f"analysis:{options}"
+        )
+        action = None if result.action is None else form.to_original(result.action)
+    else:
+        result = run(board, disk)
+        action = result.action
+    return {
+        "disk": "x" if disk == Disk.DARK else "o",
+        "move": None if action is None else [action.row, action.col],
+        "score": result.score,
+        "depth": result.depth,
+        "nodes": result.nodes,
+    }
+
+
+def _analyze_chunk(
+    first: int, records: List[bytes], options: AnalysisOptions
+) -> List[Result]:
+    results = []
+    for index, record in enumerate(records, first):
+        board, disk = codec.decode(record)
+        results.append({"index": index, **analyze_position(board, disk, options)})
+    return results
+
+
+def analyze(
+    positions: Iterable[Item],
+    options: AnalysisOptions = AnalysisOptions(),
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    start: int = 0,
+) -> Iterator[Result]:
+    """analyze positions in input order
+
+    Args:
+        positions (Iterable[Item]): boards and sides to move
+        options (AnalysisOptions, optional): search settings.
+            Defaults to AnalysisOptions().
+        workers (Optional[int], optional): worker processes, 0 means analyzing
+            in this process. Defaults to None, the number of CPUs.
+        chunk_size (int, optional): positions per dispatched chunk. Defaults to 16.
+        start (int, optional): index of the first position, for resumption.
+            Defaults to 0.
+
+    Yields:
+        Iterator[Result]: result of every position with its "index"
+    """
+    iterator = iter(positions)
+
+    def chunks() -> Iterator[Tuple[int, List[bytes]]]:
+        first = start
+        while True:
+            chunk = [
+                codec.encode(*position) for position in islice(iterator, chunk_size)
+            ]
+            if not chunk:
+                return
+            yield first, chunk
+            first += len(chunk)
+
+    if workers == 0:
+        for first, records in chunks():
+            yield from _analyze_chunk(first, records, options)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        # 書き出していないchunkはworker数の2倍までにして，メモリを一定に保つ
+        pending: Deque[Future[List[Result]]] = deque()
+        for first, records in chunks():
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_analyze_chunk, first, records, options))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def completed_results(path: str) -> int:
+    """number of complete results in an output file, dropping a partial last line
+
+    Args:
+        path (str): output file of a previous run
+
+    Raises:
+        ValueError: the file is not an output of this module
+
+    Returns:
+        int: number of results, which is the index of the next position
+    """
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    complete = 0
+    last: Optional[bytes] = None
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            complete += len(line)
+            last = line
+    if last is not None and json.loads(last).get("index") != count - 1:
+        raise ValueError(f"{path} is not an analysis output in input order")
+    # 中断で途中まで書かれた行を捨てる
+    with open(path, "r+b") as file:
+        file.truncate(complete)
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.analysis",
+        description="best move and score of every position as JSON lines",
+    )
+    parser.add_argument("input", nargs="?", help="position file (default: stdin)")
+    parser.add_argument("--output", "-o", help="output file (default: stdout)")
+    parser.add_argument(
+        "--format", choices=FORMATS, default="auto", help="input format"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="keep the results in --output and skip their positions",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=16, help="positions per chunk"
+    )
+    parser.add_argument(
+        "--time-limit", type=float, default=0.1, help="seconds per position"
+    )
+    parser.add_argument("--depth", type=int, default=None, help="max search depth")
+    parser.add_argument("--evaluator", help="pattern weight file (default: built-in)")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="search symmetric positions again"
+    )
+    args = parser.parse_args(argv)
+    if args.resume and args.output is None:
+        parser.error("--resume needs --output")
+    start = completed_results(args.output) if args.resume else 0
+    options = AnalysisOptions(
+        None if args.time_limit <= 0 else args.time_limit,
+        args.depth,
+        args.evaluator,
+        not args.no_cache,
+    )
+    source: BinaryIO = (
+        sys.stdin.buffer if args.input is None else open(args.input, "rb")
+    )
+    output: IO[str] = (
+        sys.stdout
+        if args.output is None
+        else open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    )
+    try:
+        positions = islice(read_positions(source, args.format), start, None)
+        for result in analyze(positions, options, args.workers, args.chunk_size, start):
+            output.write(json.dumps(result) + "\n")
+            # 中断しても書いた行は残るように，1行ごとにflushする
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""reversi batch logic
+
+vectorized logic over many boards at once.
+
+Boards are stacked into a ``(B, N, N)`` int8 array whose elements are the same
+as ``Board.config``, and the side to move of each board is given by a ``(B,)``
+array of ``Disk`` values. Loops run over directions and distances only,
+never over boards or squares.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Tuple, Union
+
+import numpy as np
+
+from pyreversi.models import _DIRECTIONS, Square
+
+_NULL = int(Square.NULL)
+# boards of at most this many squares are packed into uint64
+_BITS = 64
+
+
+def _padded(mask: np.ndarray) -> np.ndarray:
+    """pad boards with N - 1 False squares on every side
+
+    ``_window(padded, row, col)[:, i, j]`` is then ``mask[:, i + row, j + col]``,
+    False outside of the boards, without copying
+
+    Args:
+        mask (np.ndarray): (B, N, N) bool array
+
+    Returns:
+        np.ndarray: (B, 3N - 2, 3N - 2) padded array
+    """
+    length = mask.shape[-1]
+    margin = length - 1
+    padded = np.zeros(
+        (mask.shape[0], length + 2 * margin, length + 2 * margin), dtype=mask.dtype
+    )
+    padded[:, margin : margin + length, margin : margin + length] = mask
+    return padded
+
+
+def _window(padded: np.ndarray, row: int, col: int) -> np.ndarray:
+    """view of a padded array shifted by (row, col)"""
+    margin = (padded.shape[-1] + 2) // 3 - 1
+    length = margin + 1
+    return padded[
+        :,
+        margin + row : margin + row + length,
+        margin + col : margin + col + length,
+    ]
+
+
+def _as_disks(disks: Union[np.ndarray, int], batch_size: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(disks, dtype=np.int8), (batch_size,))
+
+
+def obtain_legal_actions(
+    configs: np.ndarray, disks: Union[np.ndarray, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """obtain legal actions of every board
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations
+        disks (Union[np.ndarray, int]): (B,) disks to put, or a single disk for
+            all boards
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (B, N, N) bool legal mask and
+            (B, N, N) number of disks flipped by each move, 0 for illegal squares
+    """
+    batch_size, length = configs.shape[0], configs.shape[-1]
+    disks = _as_disks(disks, batch_size)[:, None, None]
+    own = _padded(configs == disks)
+    opponent = _padded(configs == -disks)
+    empty = configs == _NULL
+    flip_counts = np.zeros(configs.shape, dtype=np.int32)
+    for direction in _DIRECTIONS:
+        # run: 空マスから距離1からk-1まで全て相手の石が続いているか
+        run = _window(opponent, direction.row, direction.col) & empty
+        for distance in range(2, length):
+            if not run.any():
+                break
+            end = _window(own, direction.row * distance, direction.col * distance)
+            flip_counts += (run & end) * np.int32(distance - 1)
+            run &= _window(opponent, direction.row * distance, direction.col * distance)
+    return flip_counts > 0, flip_counts
+
+
+def legal_mask(configs: np.ndarray, disks: Union[np.ndarray, int]) -> np.ndarray:
+    """legal actions of every board without counting flips
+
+    boards of at most 64 squares are packed into one uint64 per board and
+    searched with shifts of the packed boards
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations
+        disks (Union[np.ndarray, int]): (B,) disks to put, or a single disk for
+            all boards
+
+    Returns:
+        np.ndarray: (B, N, N) bool legal mask, same as ``obtain_legal_actions(...)[0]``
+    """
+    batch_size, length = configs.shape[0], configs.shape[-1]
+    disks = _as_disks(disks, batch_size)[:, None, None]
+    if length * length <= _BITS:
+        return _legal_mask_packed(configs == disks, configs == -disks)
+    own = _padded(configs == disks)
+    opponent = _padded(configs == -disks)
+    empty = configs == _NULL
+    legal = np.zeros(configs.shape, dtype=bool)
+    end = np.empty(configs.shape, dtype=bool)
+    for direction in _DIRECTIONS:
+        run = _window(opponent, direction.row, direction.col) & empty
+        # 既にlegalなマスは調べなくてよい
+        run &= ~legal
+        for distance in range(2, length):
+            if not run.any():
+                break
+            np.logical_and(
+                run,
+                _window(own, direction.row * distance, direction.col * distance),
+                out=end,
+            )
+            legal |= end
+            run &= ~end
+            run &= _window(opponent, direction.row * distance, direction.col * distance)
+    return legal
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """(B, N, N) bool -> (B,) uint64, bit index is row * N + col"""
+    flat = mask.reshape(len(mask), mask.shape[-1] * mask.shape[-1])
+    packed = np.zeros((len(mask), _BITS // 8), dtype=np.uint8)
+    bits = np.packbits(flat, axis=1, bitorder="little")
+    packed[:, : bits.shape[1]] = bits
+    return packed.view("<u8")[:, 0]
+
+
+def _unpack(bits: np.ndarray, length: int) -> np.ndarray:
+    """(B,) uint64 -> (B, N, N) bool"""
+    flat = np.unpackbits(
+        bits.astype("<u8").view(np.uint8).reshape(len(bits), _BITS // 8),
+        axis=1,
+        bitorder="little",
+    )
+    return flat[:, : length * length].reshape(len(bits), length, length).view(bool)
+
+
+@lru_cache(maxsize=None)
+def _packed_shifts(length: int) -> Tuple[Tuple[int, int, int], ...]:
+    """(left shift, right shift, mask of valid destinations) per direction
+
+    列をまたいで回り込んだマスと盤の外のビットはmaskで落とす
+    """
+    shifts = []
+    for direction in _DIRECTIONS:
+        mask = 0
+        for row in range(length):
+            for col in range(length):
+                if 0 <= col - direction.col < length:
+                    mask |= 1 << (row * length + col)
+        offset = direction.row * length + direction.col
+        # bit (row, col) moves to (row + direction.row, col + direction.col)
+        shifts.append((max(offset, 0), max(-offset, 0), mask))
+    return tuple(shifts)
+
+
+def _legal_mask_packed(own_mask: np.ndarray, opponent_mask: np.ndarray) -> np.ndarray:
+    """legal mask of boards of at most 64 squares
+
+    Args:
+        own_mask (np.ndarray): (B, N, N) bool disks of the side to move
+        opponent_mask (np.ndarray): (B, N, N) bool disks of the opponent
+
+    Returns:
+        np.ndarray: (B, N, N) bool legal mask
+    """
+    length = own_mask.shape[-1]
+    own = _pack(own_mask)
+    opponent = _pack(opponent_mask)
+    full = np.uint64((1 << (length * length)) - 1)
+    empty = ~(own | opponent) & full
+    legal = np.zeros_like(own)
+    for left, right, mask in _packed_shifts(length):
+        left_shift, right_shift, valid = (
+            np.uint64(left),
+            np.uint64(right),
+            np.uint64(mask),
+        )
+        # 自分の石から相手の石が続く限り進み，その先の空マスがlegal
+        run = ((own << left_shift) >> right_shift) & valid & opponent
+        for _ in range(length - 3):
+            run |= ((run << left_shift) >> right_shift) & valid & opponent
+        legal |= ((run << left_shift) >> right_shift) & valid & empty
+    return _unpack(legal, length)
+
+
+def _execute_action_packed(
+    configs: np.ndarray, disks: np.ndarray, rows: np.ndarray, cols: np.ndarray
+) -> np.ndarray:
+    """execute_action of boards of at most 64 squares"""
+    length = configs.shape[-1]
+    signs = disks[:, None, None]
+    own = _pack(configs == signs)
+    opponent = _pack(configs == -signs)
+    placed = rows >= 0
+    squares = np.where(placed, rows * length + cols, 0).astype(np.uint64)
+    moves = np.where(placed, np.uint64(1) << squares, np.uint64(0))
+    flips = np.zeros_like(own)
+    for left, right, mask in _packed_shifts(length):
+        left_shift, right_shift, valid = (
+            np.uint64(left),
+            np.uint64(right),
+            np.uint64(mask),
+        )
+        # 置いた石から相手の石が続き，その先が自分の石なら裏返る
+        run = ((moves << left_shift) >> right_shift) & valid & opponent
+        for _ in range(length - 3):
+            run |= ((run << left_shift) >> right_shift) & valid & opponent
+        closed = ((run << left_shift) >> right_shift) & valid & own
+        flips |= np.where(closed != 0, run, np.uint64(0))
+    own |= flips | moves
+    opponent &= ~flips
+    changed = np.flatnonzero(placed)
+    configs[changed] = (
+        _unpack(own[changed], length).astype(np.int8)
+        - _unpack(opponent[changed], length).astype(np.int8)
+    ) * signs[changed]
+    return np.asarray(_unpack(flips, length).sum(axis=(1, 2), dtype=np.int32))
+
+
+def execute_action(
+    configs: np.ndarray,
+    disks: Union[np.ndarray, int],
+    rows: np.ndarray,
+    cols: np.ndarray,
+) -> np.ndarray:
+    """execute one action per board in place
+
+    actionsは必ずlegalなものを使うこと．この関数ではlegalかのチェックはしない
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations, updated in place
+        disks (Union[np.ndarray, int]): (B,) disks to put, or a single disk for
+            all boards
+        rows (np.ndarray): (B,) rows to put disks, negative means pass
+        cols (np.ndarray): (B,) columns to put disks
+
+    Returns:
+        np.ndarray: (B,) number of flipped disks, 0 for passed boards
+    """
+    batch_size, length = configs.shape[0], configs.shape[-1]
+    disks = _as_disks(disks, batch_size)
+    rows = np.asarray(rows)
+    cols = np.asarray(cols)
+    flip_counts = np.zeros(batch_size, dtype=np.int32)
+    indices = np.flatnonzero(rows >= 0)
+    if indices.size == 0 or length < 3:
+        return flip_counts
+    if length * length <= _BITS:
+        return _execute_action_packed(configs, disks, rows, cols)
+    row, col, disk = rows[indices, None], cols[indices, None], disks[indices, None]
+    distances = np.arange(1, length)
+    for direction in _DIRECTIONS:
+        ray_rows = row + direction.row * distances
+        ray_cols = col + direction.col * distances
+        inside = (
+            (ray_rows >= 0)
+            & (ray_rows < length)
+            & (ray_cols >= 0)
+            & (ray_cols < length)
+        )
+        values = np.where(
+            inside,
+            configs[
+                indices[:, None],
+                np.clip(ray_rows, 0, length - 1),
+                np.clip(ray_cols, 0, length - 1),
+            ],
+            _NULL,
+        )
+        # 相手の石が連続する数と，その先のマスに自分の石があるか
+        run = np.cumprod(values == -disk, axis=1).sum(axis=1)
+        end = values[np.arange(indices.size), np.minimum(run, length - 2)]
+        count = np.where((run < length - 1) & (end == disk[:, 0]), run, 0)
+        flip_counts[indices] += count
+        flipped = distances <= count[:, None]
+        configs[
+            np.broadcast_to(indices[:, None], flipped.shape)[flipped],
+            ray_rows[flipped],
+            ray_cols[flipped],
+        ] = np.broadcast_to(disk, flipped.shape)[flipped]
+    configs[indices, row[:, 0], col[:, 0]] = disk[:, 0]
+    return flip_counts
@@ -0,0 +1,298 @@
+"""reversi bitboard
+
+bitboard implementation of reversi logic.
+
+Each side is held in an integer mask whose bit ``row * length + col`` is set
+when the square is occupied by the side. Python integers are unbounded, so the
+same shift-and-mask code serves every board length.
+The module exposes the same functions as ``pyreversi.logic`` and can be selected
+with ``pyreversi.logic.set_backend("bitboard")``.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from pyreversi.models import Board, Disk, Position, board_positions
+
+# numpyの配列とenumの比較は遅いので，intと比べる
+_DARK = int(Disk.DARK)
+_LIGHT = int(Disk.LIGHT)
+
+
+class _Masks(NamedTuple):
+    full: int
+    # (shift, mask of disks which can be passed through without wrapping)
+    shifts: Tuple[Tuple[int, int], ...]
+
+
+@lru_cache(maxsize=None)
+def _masks(length: int) -> _Masks:
+    """masks for the board length
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        _Masks: full mask and (shift, mask) pairs of the eight directions
+    """
+    full = (1 << length * length) - 1
+    # 左右の端の列を除いたマスク．横方向と斜め方向で行をまたいで回り込むのを防ぐ
+    inner = 0
+    for row in range(length):
+        for col in range(1, length - 1):
+            inner |= 1 << row * length + col
+    shifts = (
+        (1, inner),
+        (-1, inner),
+        (length, full),
+        (-length, full),
+        (length + 1, inner),
+        (-length - 1, inner),
+        (length - 1, inner),
+        (-length + 1, inner),
+    )
+    return _Masks(full, shifts)
+
+
+def popcount(mask: int) -> int:
+    """count set bits
+
+    Args:
+        mask (int): bitboard
+
+    Returns:
+        int: number of set bits
+    """
+    return bin(mask).count("1")
+
+
+def initial_masks(length: int) -> Tuple[int, int]:
+    """masks of the initial board
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Tuple[int, int]: dark mask and light mask
+    """
+    half = length // 2
+    dark = 1 << (half - 1) * length + half | 1 << half * length + half - 1
+    light = 1 << (half - 1) * length + half - 1 | 1 << half * length + half
+    return dark, light
+
+
+def legal_moves(player: int, opponent: int, length: int) -> int:
+    """legal moves of player
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        length (int): length of board
+
+    Returns:
+        int: mask of the squares where player can put a disk
+    """
+    masks = _masks(length)
+    empty = masks.full & ~(player | opponent)
+    moves = 0
+    for shift, mask in masks.shifts:
+        passable = opponent & mask
+        if shift > 0:
+            line = passable & (player << shift)
+            while line:
+                moves |= empty & (line << shift)
+                line = passable & (line << shift)
+        else:
+            shift = -shift
+            line = passable & (player >> shift)
+            while line:
+                moves |= empty & (line >> shift)
+                line = passable & (line >> shift)
+    return moves
+
+
+def flips(player: int, opponent: int, move: int, length: int) -> int:
+    """disks flipped by the move
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        move (int): single bit mask of the square to put a disk
+        length (int): length of board
+
+    Returns:
+        int: mask of the opponent disks which are flipped, 0 if the move is illegal
+    """
+    flipped = 0
+    for shift, mask in _masks(length).shifts:
+        passable = opponent & mask
+        line = 0
+        if shift > 0:
+            cursor = move << shift
+            while cursor & passable:
+                line |= cursor
+                cursor <<= shift
+        else:
+            shift = -shift
+            cursor = move >> shift
+            while cursor & passable:
+                line |= cursor
+                cursor >>= shift
+        if cursor & player:
+            flipped |= line
+    return flipped
+
+
+def iter_indices(mask: int) -> Iterator[int]:
+    """iterate square indices of set bits from lower to higher
+
+    Args:
+        mask (int): bitboard
+
+    Yields:
+        Iterator[int]: square index, ``row * length + col``
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def to_masks(board: Board) -> Tuple[int, int]:
+    """convert board to masks
+
+    Args:
+        board (Board): 盤の状態
+
+    Returns:
+        Tuple[int, int]: dark mask and light mask
+    """
+    flat = board.config.ravel()
+    return _pack(flat == _DARK), _pack(flat == _LIGHT)
+
+
+def to_board(dark: int, light: int, length: int) -> Board:
+    """convert masks to board
+
+    Args:
+        dark (int): dark mask
+        light (int): light mask
+        length (int): length of board
+
+    Returns:
+        Board: board of the masks
+    """
+    config = _unpack(dark, length).astype(np.int8) - _unpack(light, length)
+    return Board(config.reshape(length, length))
+
+
+def _pack(flags: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def _unpack(mask: int, length: int) -> np.ndarray:
+    size = length * length
+    buffer = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(buffer, count=size, bitorder="little").view(np.int8)
+
+
+def _split(board: Board, disk: Disk) -> Tuple[int, int]:
+    dark, light = to_masks(board)
+    return (dark, light) if disk == Disk.DARK else (light, dark)
+
+
+def init_board(length: int) -> Board:
+    """initialize board
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Board: initial board
+    """
+    return to_board(*initial_masks(length), length)
+
+
+def obtain_legal_actions(board: Board, disk: Disk) -> FrozenSet[Position]:
+    """obtain legal actions
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+
+    Returns:
+        FrozenSet[Position]: legal actions
+    """
+    length = len(board.config)
+    moves = legal_moves(*_split(board, disk), length)
+    return frozenset(Position(*divmod(index, length)) for index in iter_indices(moves))
+
+
+def obtain_legal_flips(
+    board: Board, disk: Disk, positions: Optional[Iterable[Position]] = None
+) -> Dict[Position, Tuple[Position, ...]]:
+    """obtain legal actions among positions and the disks flipped by them
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+        positions (Optional[Iterable[Position]], optional): 調べる位置．
+            Defaults to None, all squares.
+
+    Returns:
+        Dict[Position, Tuple[Position, ...]]: legal action -> 裏返る石の位置
+    """
+    length = len(board.config)
+    player, opponent = _split(board, disk)
+    moves = legal_moves(player, opponent, length)
+    if positions is not None:
+        wanted = 0
+        for position in positions:
+            wanted |= 1 << position.row * length + position.col
+        moves &= wanted
+    squares = board_positions(length)
+    result: Dict[Position, Tuple[Position, ...]] = {}
+    for index in iter_indices(moves):
+        flipped = flips(player, opponent, 1 << index, length)
+        result[squares[index]] = tuple([squares[i] for i in iter_indices(flipped)])
+    return result
+
+
+def execute_action(board: Board, disk: Disk, position: Position) -> Board:
+    """execute action and return new state board
+
+    positionは必ずlegalなものを使うこと．この関数ではlegalかのチェックはしない
+
+    Args:
+        board (Board): 盤
+        disk (Disk): 石の色
+        position (Position): 石を置く場所
+    Returns:
+        Board: 石が置かれた新しい状態の盤
+    """
+    length = len(board.config)
+    player, opponent = _split(board, disk)
+    move = 1 << position.row * length + position.col
+    flipped = flips(player, opponent, move, length)
+    assert flipped
+    player |= move | flipped
+    opponent ^= flipped
+    if disk == Disk.DARK:
+        return to_board(player, opponent, length)
+    return to_board(opponent, player, length)
+
+
+def count_disk(board: Board, disk: Disk) -> int:
+    """count disk
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 数えたい石の種類
+
+    Returns:
+        int: 数えたい石の数
+    """
+    return board.cells.count(int(disk))
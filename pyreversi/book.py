@@ -0,0 +1,353 @@
+"""opening book
+
+move statistics of early positions, keyed by a symmetry-canonical hash.
+
+The book is a ``.npy`` file of a structured array sorted by ``(key, move)``:
+
+    key: first 8 bytes of blake2b of the ``codec`` record of the canonical
+        board (``symmetry.canonicalize``)
+    move: square index of the move on the canonical board
+    count: number of games (or search results) which played the move
+    wins, draws: results of those games for the side to move
+    score: sum of final disk differences from the side to move
+
+The file is opened with ``mmap_mode="r"`` and the moves of a position are
+found with ``searchsorted``, so a large book is neither parsed nor loaded.
+Looked up moves are kept in ``symmetry.shared_cache`` under the
+``namespace`` of the book, so positions repeated over games and their symmetric images skip the
+hashing and the search.
+
+Usage:
+    python -m pyreversi.book games.rec book.npy --plies 20 --min-count 2
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from pyreversi import codec, symmetry
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk, Position
+from pyreversi.players import Player, make_player
+from pyreversi.records import GameRecord, RecordReader, replay
+from pyreversi.symmetry import Canonical, canonicalize
+
+BOOK_DTYPE = np.dtype(
+    [
+        ("key", "<u8"),
+        ("move", "<u2"),
+        ("count", "<u4"),
+        ("wins", "<u4"),
+        ("draws", "<u4"),
+        ("score", "<i8"),
+    ]
+)
+
+
+class BookMove(NamedTuple):
+    """statistics of a book move
+
+    Attributes:
+        action (Position): move on the given board
+        games (int): number of games which played the move
+        wins (int): games won by the side to move
+        draws (int): drawn games
+        score (int): sum of final disk differences from the side to move
+    """
+
+    action: Position
+    games: int
+    wins: int
+    draws: int
+    score: int
+
+    @property
+    def mean_score(self) -> float:
+        return self.score / self.games
+
+
+def position_key(board: Board, disk: Disk) -> Tuple[int, int]:
+    """symmetry-canonical key of the position
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+
+    Returns:
+        Tuple[int, int]: 64 bit key and the symmetry which maps board to the
+            canonical board
+    """
+    key, form = _canonical_key(board, disk)
+    return key, form.symmetry
+
+
+def _canonical_key(board: Board, disk: Disk) -> Tuple[int, Canonical]:
+    """key and canonical form of the position"""
+    form = canonicalize(board)
+    config = np.frombuffer(form.key, dtype=np.int8).reshape(form.length, form.length)
+    return _config_key(config, disk), form
+
+
+def _config_key(config: np.ndarray, disk: Disk) -> int:
+    """key of the canonical board config"""
+    record = codec.encode_many(config[None], np.array([disk], dtype=np.int8))
+    digest = hashlib.blake2b(record, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class BookBuilder:
+    """accumulate move statistics and write a book"""
+
+    def __init__(self, plies: int = 20):
+        """constructor
+
+        Args:
+            plies (int, optional): max plies from the start to add. Defaults to 20.
+        """
+        self.plies = plies
+        self._stats: Dict[Tuple[int, int], List[int]] = defaultdict(
+            lambda: [0, 0, 0, 0]
+        )
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def add(self, board: Board, disk: Disk, action: Position, score: int) -> None:
+        """add a move
+
+        search results are added with the searched score as the result
+
+        Args:
+            board (Board): 盤の状態
+            disk (Disk): side to move
+            action (Position): played move
+            score (int): final disk difference from the side to move
+        """
+        key, form = _canonical_key(board, disk)
+        # 対称な局面では同じ手に対応するマスのうち最小のものに揃える
+        canonical = form.to_canonical(action)
+        stats = self._stats[key, canonical.row * form.length + canonical.col]
+        stats[0] += 1
+        stats[1] += score > 0
+        stats[2] += score == 0
+        stats[3] += score
+
+    def add_game(self, record: GameRecord) -> None:
+        """add the first plies of a recorded game
+
+        Args:
+            record (GameRecord): game
+        """
+        for ply, (game, move) in enumerate(replay(record)):
+            if ply >= self.plies:
+                break
+            if move is None:
+                continue
+            sign = 1 if game.current_disk == Disk.DARK else -1
+            self.add(
+                game.board,
+                game.current_disk,
+                Position(*divmod(move, record.length)),
+                record.score * sign,
+            )
+
+    def build(self, min_count: int = 1) -> np.ndarray:
+        """sorted book
+
+        Args:
+            min_count (int, optional): drop moves played fewer times. Defaults to 1.
+
+        Returns:
+            np.ndarray: structured array of BOOK_DTYPE sorted by key and move
+        """
+        rows = [
+            (key, move, *stats)
+            for (key, move), stats in self._stats.items()
+            if stats[0] >= min_count
+        ]
+        book = np.array(rows, dtype=BOOK_DTYPE)
+        return book[np.argsort(book, order=("key", "move"))]
+
+    def save(self, path: str, min_count: int = 1) -> None:
+        # ファイル名に.npyを付け足されないようにファイルオブジェクトに書く
+        with open(path, "wb") as file:
+            np.save(file, self.build(min_count))
+
+
+def build_book(
+    records: Iterable[GameRecord], plies: int = 20, min_count: int = 1
+) -> np.ndarray:
+    """build a book from recorded games
+
+    Args:
+        records (Iterable[GameRecord]): games
+        plies (int, optional): max plies from the start. Defaults to 20.
+        min_count (int, optional): drop moves played fewer times. Defaults to 1.
+
+    Returns:
+        np.ndarray: structured array of BOOK_DTYPE sorted by key and move
+    """
+    builder = BookBuilder(plies)
+    for record in records:
+        builder.add_game(record)
+    return builder.build(min_count)
+
+
+# 定石ごとのshared_cacheのnamespace
+_namespaces = itertools.count()
+# canonicalな盤でのmoveのsquare index, count, wins, draws, score
+_Entry = Tuple[int, int, int, int, int]
+
+
+class OpeningBook:
+    """sorted book looked up by binary search"""
+
+    def __init__(self, book: Union[str, np.ndarray]):
+        """constructor
+
+        Args:
+            book (Union[str, np.ndarray]): path of the book file, which is memory
+                mapped, or the array itself
+        """
+        self.entries: np.ndarray = (
+            np.load(book, mmap_mode="r") if isinstance(book, str) else book
+        )
+        self._keys: np.ndarray = self.entries["key"]
+        # shared_cacheの統計もこの名前で引ける
+        self.namespace = f"book:{next(_namespaces)}"
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, board: Board, disk: Disk) -> List[BookMove]:
+        """book moves of the position
+
+        Args:
+            board (Board): 盤の状態
+            disk (Disk): side to move
+
+        Returns:
+            List[BookMove]: moves on the given board, empty if out of book
+        """
+        entries, form = symmetry.shared_cache().get_or_compute(
+            board, disk, self._search, self.namespace
+        )
+        return [
+            BookMove(
+                form.to_original(Position(*divmod(move, form.length))),
+                games,
+                wins,
+                draws,
+                score,
+            )
+            for move, games, wins, draws, score in entries
+        ]
+
+    def _search(self, board: Board, disk: Disk) -> Tuple[_Entry, ...]:
+        """entries of the canonical board"""
+        key = np.uint64(_config_key(board.config, disk))
+        left = int(np.searchsorted(self._keys, key, side="left"))
+        right = int(np.searchsorted(self._keys, key, side="right"))
+        return tuple(
+            [
+                (
+                    int(entry["move"]),
+                    int(entry["count"]),
+                    int(entry["wins"]),
+                    int(entry["draws"]),
+                    int(entry["score"]),
+                )
+                for entry in self.entries[left:right]
+            ]
+        )
+
+
+class BookPlayer(Player):
+    """opening book player
+
+    定石にある局面では定石の手を打ち，定石を外れたらinnerに任せる．
+    keyの衝突で合法でない手が見つかった場合もinnerに任せる
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        inner: Union[Player, str] = "alphabeta",
+        book: Optional[OpeningBook] = None,
+        min_count: int = 1,
+        randomize: bool = False,
+    ):
+        """constructor
+
+        Args:
+            path (Optional[str], optional): path of the book file. Defaults to None.
+            inner (Union[Player, str], optional): player or player spec used out
+                of book. Defaults to "alphabeta".
+            book (Optional[OpeningBook], optional): book used instead of path.
+                Defaults to None.
+            min_count (int, optional): ignore moves played fewer times.
+                Defaults to 1.
+            randomize (bool, optional): choose moves with probability
+                proportional to games instead of the best mean score.
+                Defaults to False.
+
+        Raises:
+            ValueError: neither path nor book is given
+        """
+        if book is None:
+            if path is None:
+                raise ValueError("path or book is required")
+            book = OpeningBook(path)
+        self.book = book
+        self.inner = make_player(inner) if isinstance(inner, str) else inner
+        self.min_count = min_count
+        self.randomize = randomize
+
+    def set_disk(self, disk: Disk) -> None:
+        super().set_disk(disk)
+        self.inner.set_disk(disk)
+
+    def play(self, game: Game) -> Optional[Position]:
+        # keyは64 bitのhashなので衝突しうる．合法でない定石の手は使わない
+        moves = [
+            move
+            for move in self.book.lookup(game.board, game.current_disk)
+            if move.games >= self.min_count and game.is_legal_action(move.action)
+        ]
+        if not moves:
+            return self.inner.play(game)
+        if self.randomize:
+            return random.choices(
+                [move.action for move in moves], [move.games for move in moves]
+            )[0]
+        return max(moves, key=lambda move: (move.mean_score, move.games)).action
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.book",
+        description="build an opening book from a record file",
+    )
+    parser.add_argument("records", help="record file, see pyreversi.records")
+    parser.add_argument("output", help="output book file (.npy)")
+    parser.add_argument("--plies", type=int, default=20, help="max plies")
+    parser.add_argument(
+        "--min-count", type=int, default=1, help="drop moves played fewer times"
+    )
+    args = parser.parse_args(argv)
+    builder = BookBuilder(args.plies)
+    with RecordReader(args.records) as reader:
+        for record in reader:
+            builder.add_game(record)
+    builder.save(args.output, args.min_count)
+    print(f"{len(builder)} moves")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""position codec
+
+compact binary representation of positions.
+
+A record is one header byte, ``length << 1 | light to move``, followed by the
+disks:
+
+    8x8: dark mask and light mask, 8 bytes each in little endian, the same bit
+        layout as ``pyreversi.bitboard`` (17 bytes per record)
+    other lengths: base-3 packing, 5 squares per byte as
+        ``sum((cell + 1) * 3 ** i)`` (``ceil(length ** 2 / 5)`` bytes)
+
+Records of the same length have a fixed size, so many positions are encoded
+into one ``bytes`` with ``encode_many`` and decoded with ``decode_many``
+without per-square Python loops.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from pyreversi import symmetry
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk
+
+_MASK_LENGTH = 8
+_DARK = int(Disk.DARK)
+_LIGHT = int(Disk.LIGHT)
+_SQUARES_PER_BYTE = 5
+_POWERS = 3 ** np.arange(_SQUARES_PER_BYTE, dtype=np.int32)
+# base-3 byte -> cells + 1 of the 5 squares
+_DIGITS = (np.arange(3**_SQUARES_PER_BYTE)[:, None] // _POWERS % 3).astype(np.int8)
+
+
+def record_size(length: int) -> int:
+    """bytes of a record
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        int: bytes of a record including the header
+    """
+    if length == _MASK_LENGTH:
+        return 1 + 2 * _MASK_LENGTH * _MASK_LENGTH // 8
+    return 1 + -(-length * length // _SQUARES_PER_BYTE)
+
+
+def encode(board: Board, disk: Disk) -> bytes:
+    """encode position
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+
+    Returns:
+        bytes: record
+    """
+    return encode_many(board.config[None], np.array([disk], dtype=np.int8))
+
+
+def decode(data: bytes) -> Tuple[Board, Disk]:
+    """decode position
+
+    Args:
+        data (bytes): record
+
+    Returns:
+        Tuple[Board, Disk]: board and side to move
+    """
+    configs, disks = decode_many(data, data[0] >> 1)
+    return Board(configs[0]), Disk(int(disks[0]))
+
+
+def encode_game(game: Game) -> bytes:
+    return encode(game.board, game.current_disk)
+
+
+def decode_game(data: bytes) -> Game:
+    return Game(*decode(data))
+
+
+def encode_many(configs: np.ndarray, disks: np.ndarray) -> bytes:
+    """encode many positions of the same length
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations
+        disks (np.ndarray): (B,) sides to move
+
+    Returns:
+        bytes: concatenated records
+    """
+    batch_size, length = configs.shape[0], configs.shape[-1]
+    flat = configs.reshape(batch_size, length * length)
+    header = np.full((batch_size, 1), length << 1, dtype=np.uint8)
+    # numpyとenumの比較は遅いのでintと比べる
+    header[:, 0] |= np.asarray(disks).reshape(batch_size) == _LIGHT
+    if length == _MASK_LENGTH:
+        body = np.concatenate(
+            [
+                np.packbits(flat == _DARK, axis=1, bitorder="little"),
+                np.packbits(flat == _LIGHT, axis=1, bitorder="little"),
+            ],
+            axis=1,
+        )
+    else:
+        size = record_size(length) - 1
+        digits = np.zeros((batch_size, size * _SQUARES_PER_BYTE), dtype=np.int32)
+        digits[:, : length * length] = flat + 1
+        body = (digits.reshape(batch_size, size, _SQUARES_PER_BYTE) @ _POWERS).astype(
+            np.uint8
+        )
+    return np.concatenate([header, body], axis=1).tobytes()
+
+
+def decode_many(data: bytes, length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """decode concatenated records of the same length
+
+    Args:
+        data (bytes): concatenated records
+        length (int): length of board
+
+    Raises:
+        ValueError: data is not a sequence of records of the length
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (B, N, N) int8 configurations and
+            (B,) int8 sides to move
+    """
+    size = record_size(length)
+    if len(data) % size:
+        raise ValueError(f"data is not a sequence of {size} byte records")
+    records = np.frombuffer(data, dtype=np.uint8).reshape(-1, size)
+    if np.any(records[:, 0] >> 1 != length):
+        raise ValueError(f"data contains a record of another length than {length}")
+    batch_size = len(records)
+    disks = np.where(records[:, 0] & 1, Disk.LIGHT, Disk.DARK).astype(np.int8)
+    squares = length * length
+    if length == _MASK_LENGTH:
+        bits = np.unpackbits(records[:, 1:], axis=1, bitorder="little").view(np.int8)
+        flat = bits[:, :squares] - bits[:, squares:]
+    else:
+        digits = _DIGITS[records[:, 1:]].reshape(
+            batch_size, (size - 1) * _SQUARES_PER_BYTE
+        )
+        flat = digits[:, :squares] - 1
+    return flat.reshape(batch_size, length, length).astype(np.int8), disks
+
+
+def encode_positions(positions: Iterable[Tuple[Board, Disk]]) -> bytes:
+    """encode positions of the same length
+
+    Args:
+        positions (Iterable[Tuple[Board, Disk]]): boards and sides to move
+
+    Returns:
+        bytes: concatenated records, empty for no positions
+    """
+    items = list(positions)
+    if not items:
+        return b""
+    return encode_many(
+        np.stack([board.config for board, _ in items]),
+        np.array([disk for _, disk in items], dtype=np.int8),
+    )
+
+
+def decode_positions(data: bytes, length: int) -> List[Tuple[Board, Disk]]:
+    """decode concatenated records into boards
+
+    Args:
+        data (bytes): concatenated records
+        length (int): length of board
+
+    Returns:
+        List[Tuple[Board, Disk]]: boards and sides to move
+    """
+    configs, disks = decode_many(data, length)
+    return [(Board(config), Disk(int(disk))) for config, disk in zip(configs, disks)]
+
+
+def canonical(board: Board, disk: Disk) -> Tuple[bytes, int]:
+    """canonical record under the 8 board symmetries
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+
+    Returns:
+        Tuple[bytes, int]: record of the canonical board (``symmetry.canonicalize``)
+            and the symmetry which maps board to it
+    """
+    form = symmetry.canonicalize(board)
+    config = np.frombuffer(form.key, dtype=np.int8).reshape(form.length, form.length)
+    return encode_many(config[None], np.array([disk], dtype=np.int8)), form.symmetry
@@ -0,0 +1,277 @@
+"""reversi endgame solver
+
+exact alpha-beta search to the end of the game.
+
+The score is the final disk difference from the side to move, the same as
+``Game.count_disk(own) - Game.count_disk(other)`` at the end of the game.
+Moves are ordered fastest-first (fewest opponent moves) while many squares are
+empty, with moves into regions holding an odd number of empty squares first
+(parity). The last few empty squares are solved by a specialized loop over the
+list of empty squares without move generation.
+"""
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from pyreversi import bitboard
+from pyreversi.game import Game
+from pyreversi.models import Position
+from pyreversi.mutable import MutableGame
+from pyreversi.players import Player, make_player
+
+# この数以下の空きマスは専用のループで解く
+_SMALL_EMPTIES = 4
+# この数より空きマスが多いときは相手の着手可能数で並べる
+_FASTEST_FIRST_EMPTIES = 6
+_INFINITY = 1 << 16
+
+
+class EndgameResult(NamedTuple):
+    """result of solving
+
+    Attributes:
+        score (int): final disk difference from the side to move with perfect play
+        line (Tuple[Optional[Position], ...]): best line to the end, None means pass
+        nodes (int): searched nodes
+        elapsed (float): elapsed seconds
+    """
+
+    score: int
+    line: Tuple[Optional[Position], ...]
+    nodes: int
+    elapsed: float
+
+
+@lru_cache(maxsize=None)
+def _regions(length: int) -> Tuple[int, ...]:
+    """masks of the four quadrants, used for parity"""
+    half = (length + 1) // 2
+    regions = [0, 0, 0, 0]
+    for row in range(length):
+        for col in range(length):
+            regions[(row >= half) * 2 + (col >= half)] |= 1 << row * length + col
+    return tuple(regions)
+
+
+class EndgameSolver:
+    """exact endgame solver"""
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self._length = 0
+
+    def solve(self, game: Union[Game, MutableGame]) -> EndgameResult:
+        """solve the game
+
+        Args:
+            game (Union[Game, MutableGame]): 解く局面
+
+        Returns:
+            EndgameResult: score and best line
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        mutable = MutableGame.from_game(game) if isinstance(game, Game) else game
+        self._length = mutable.length
+        player, opponent = mutable.player, mutable.opponent
+        score = self.score(player, opponent, -_INFINITY, _INFINITY)
+        line: List[Optional[Position]] = []
+        value = score
+        # 読み筋は，評価値が変わらない手を順にたどって求める
+        while True:
+            moves = bitboard.legal_moves(player, opponent, self._length)
+            if not moves:
+                if not bitboard.legal_moves(opponent, player, self._length):
+                    break
+                line.append(None)
+                player, opponent, value = opponent, player, -value
+                continue
+            for move in self._ordered_moves(player, opponent, moves):
+                flipped = bitboard.flips(player, opponent, move, self._length)
+                child = (opponent ^ flipped, player | move | flipped)
+                if -self.score(*child, -value - 1, -value + 1) == value:
+                    break
+            line.append(Position(*divmod(move.bit_length() - 1, self._length)))
+            player, opponent, value = child[0], child[1], -value
+        return EndgameResult(
+            score, tuple(line), self.nodes, time.perf_counter() - start
+        )
+
+    def score(self, player: int, opponent: int, alpha: int, beta: int) -> int:
+        """exact score with alpha-beta window
+
+        Args:
+            player (int): mask of the side to move
+            opponent (int): mask of the other side
+            alpha (int): lower bound of the window
+            beta (int): upper bound of the window
+
+        Returns:
+            int: fail-soft score from the side to move
+        """
+        size = self._length * self._length
+        empties = size - bitboard.popcount(player | opponent)
+        if empties <= _SMALL_EMPTIES:
+            empty = ((1 << size) - 1) & ~(player | opponent)
+            squares = self._ordered_moves(player, opponent, empty)
+            return self._score_small(player, opponent, squares, alpha, beta, False)
+        return self._score(player, opponent, empties, alpha, beta, False)
+
+    def _score(
+        self,
+        player: int,
+        opponent: int,
+        empties: int,
+        alpha: int,
+        beta: int,
+        passed: bool,
+    ) -> int:
+        self.nodes += 1
+        length = self._length
+        moves = bitboard.legal_moves(player, opponent, length)
+        if not moves:
+            if passed:
+                # 両者とも打てないので終局
+                return bitboard.popcount(player) - bitboard.popcount(opponent)
+            return -self._score(opponent, player, empties, -beta, -alpha, True)
+        best = -_INFINITY
+        for move in self._ordered_moves(player, opponent, moves):
+            flipped = bitboard.flips(player, opponent, move, length)
+            next_player, next_opponent = opponent ^ flipped, player | move | flipped
+            if empties - 1 <= _SMALL_EMPTIES:
+                empty = ((1 << length * length) - 1) & ~(next_player | next_opponent)
+                score = -self._score_small(
+                    next_player,
+                    next_opponent,
+                    self._ordered_moves(next_player, next_opponent, empty),
+                    -beta,
+                    -alpha,
+                    False,
+                )
+            else:
+                score = -self._score(
+                    next_player, next_opponent, empties - 1, -beta, -alpha, False
+                )
+            if score > best:
+                best = score
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        return best
+
+    def _score_small(
+        self,
+        player: int,
+        opponent: int,
+        squares: List[int],
+        alpha: int,
+        beta: int,
+        passed: bool,
+    ) -> int:
+        """solve the last few empty squares
+
+        合法手を生成せず，空きマスを順に試す
+        """
+        self.nodes += 1
+        length = self._length
+        best = -_INFINITY
+        for i, move in enumerate(squares):
+            flipped = bitboard.flips(player, opponent, move, length)
+            if not flipped:
+                continue
+            score = -self._score_small(
+                opponent ^ flipped,
+                player | move | flipped,
+                squares[:i] + squares[i + 1 :],
+                -beta,
+                -alpha,
+                False,
+            )
+            if score > best:
+                best = score
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        if best > -_INFINITY:
+            return best
+        if passed:
+            # 両者とも打てないので終局
+            return bitboard.popcount(player) - bitboard.popcount(opponent)
+        return -self._score_small(opponent, player, squares, -beta, -alpha, True)
+
+    def _ordered_moves(self, player: int, opponent: int, moves: int) -> List[int]:
+        """order moves by parity and fastest-first
+
+        Args:
+            player (int): mask of the side to move
+            opponent (int): mask of the other side
+            moves (int): mask of the candidate moves
+
+        Returns:
+            List[int]: single bit masks of the moves, promising first
+        """
+        length = self._length
+        empty = ((1 << length * length) - 1) & ~(player | opponent)
+        odd = 0
+        for region in _regions(length):
+            if bitboard.popcount(empty & region) & 1:
+                odd |= region
+        move_list = [1 << index for index in bitboard.iter_indices(moves)]
+        if bitboard.popcount(empty) <= _FASTEST_FIRST_EMPTIES:
+            return sorted(move_list, key=lambda move: not move & odd)
+        keys = []
+        for move in move_list:
+            flipped = bitboard.flips(player, opponent, move, length)
+            mobility = bitboard.popcount(
+                bitboard.legal_moves(
+                    opponent ^ flipped, player | move | flipped, length
+                )
+            )
+            keys.append((mobility, not move & odd))
+        return [move for _, move in sorted(zip(keys, move_list))]
+
+
+def solve(game: Union[Game, MutableGame]) -> EndgameResult:
+    """solve the game to the end
+
+    Args:
+        game (Union[Game, MutableGame]): 解く局面
+
+    Returns:
+        EndgameResult: score and best line
+    """
+    return EndgameSolver().solve(game)
+
+
+class EndgamePlayer(Player):
+    """endgame player
+
+    空きマスがthreshold以下になったら終局まで読み切り，それまではinnerに任せる
+
+    Attributes:
+        last_result (Optional[EndgameResult]): result of the last solve
+    """
+
+    def __init__(self, inner: Union[Player, str] = "alphabeta", threshold: int = 12):
+        """constructor
+
+        Args:
+            inner (Union[Player, str], optional): player or player spec used while
+                many squares are empty. Defaults to "alphabeta".
+            threshold (int, optional): max empty squares to solve. Defaults to 12.
+        """
+        self.inner = make_player(inner) if isinstance(inner, str) else inner
+        self.threshold = threshold
+        self.solver = EndgameSolver()
+        self.last_result: Optional[EndgameResult] = None
+
+    def play(self, game: Game) -> Optional[Position]:
+        mutable = MutableGame.from_game(game)
+        if mutable.count_empty() > self.threshold:
+            return self.inner.play(game)
+        self.last_result = self.solver.solve(mutable)
+        return self.last_result.line[0] if self.last_result.line else None
@@ -0,0 +1,373 @@
+"""pattern evaluation
+
+static evaluation by pattern tables, mobility and frontier.
+
+A pattern is an ordered list of squares, e.g. an edge or the 3x3 block at a
+corner. All 8 symmetric images of every pattern are evaluated, and the images
+of a pattern share one table indexed by the base-3 number of the squares
+(0: the other side, 1: empty, 2: the side to move), so the evaluation is
+symmetric. The squares of every image are precomputed per board length, and
+the indices of all images are computed at once with one gather and a dot
+product instead of per-square branching.
+
+The score is the sum of the table entries plus weighted mobility (legal move
+count difference) and frontier (disks next to an empty square) differences
+and a bias. Weights are kept per game phase, which is given by the number of
+disks, and estimate the final disk difference from the side to move.
+
+Weights are stored in a compressed ``.npz`` file, see
+``PatternEvaluator.save`` and ``pyreversi.training``.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import NamedTuple, Tuple, Union
+
+import numpy as np
+
+from pyreversi import batch, bitboard, symmetry
+
+DEFAULT_PHASES = 8
+# パターンのマス数の上限．テーブルの大きさは3のこの数乗
+_MAX_SQUARES = 10
+# names of the numeric features after the pattern tables
+NUMERIC_FEATURES = ("mobility", "frontier", "bias")
+
+
+class Layout(NamedTuple):
+    """precomputed pattern images of a board length
+
+    Attributes:
+        names (Tuple[str, ...]): pattern names
+        sizes (Tuple[int, ...]): table size of every pattern
+        squares (np.ndarray): (I, K) squares of every image, padded with
+            ``length ** 2`` which reads an always empty cell
+        powers (np.ndarray): (I, K) powers of 3 of the squares, 0 for the padding
+        offsets (np.ndarray): (I,) offset of the table of every image in the
+            weight vector
+        features (int): length of the weight vector of a phase
+    """
+
+    names: Tuple[str, ...]
+    sizes: Tuple[int, ...]
+    squares: np.ndarray
+    powers: np.ndarray
+    offsets: np.ndarray
+    features: int
+
+
+def _shapes(length: int) -> Tuple[Tuple[str, Tuple[Tuple[int, int], ...]], ...]:
+    span = min(length, _MAX_SQUARES)
+    corner = min(length, 3)
+    return (
+        ("edge", tuple((0, col) for col in range(span))),
+        ("edge2", tuple((1, col) for col in range(span))),
+        ("diagonal", tuple((i, i) for i in range(span))),
+        (
+            "corner",
+            tuple((row, col) for row in range(corner) for col in range(corner)),
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def layout(length: int) -> Layout:
+    """pattern images of the board length
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Layout: precomputed squares and offsets
+    """
+    grids = symmetry.permutations(length).reshape(-1, length, length)
+    names, sizes, images, image_offsets = [], [], [], []
+    offset = 0
+    for name, shape in _shapes(length):
+        rows, cols = np.array(shape).T
+        # 対称な像のうち，マスの並びまで同じものは除く
+        pattern_images = sorted({tuple(grid[rows, cols].tolist()) for grid in grids})
+        names.append(name)
+        sizes.append(3 ** len(shape))
+        images.extend(pattern_images)
+        image_offsets.extend([offset] * len(pattern_images))
+        offset += 3 ** len(shape)
+    width = max(map(len, images))
+    squares = np.full((len(images), width), length * length, dtype=np.int64)
+    powers = np.zeros((len(images), width), dtype=np.int64)
+    for i, image in enumerate(images):
+        squares[i, : len(image)] = image
+        powers[i, : len(image)] = 3 ** np.arange(len(image))
+    return Layout(
+        tuple(names),
+        tuple(sizes),
+        squares,
+        powers,
+        np.array(image_offsets, dtype=np.int64),
+        offset + len(NUMERIC_FEATURES),
+    )
+
+
+def phases_of(configs: np.ndarray, phases: int = DEFAULT_PHASES) -> np.ndarray:
+    """game phases of the boards
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations
+        phases (int, optional): number of phases. Defaults to DEFAULT_PHASES.
+
+    Returns:
+        np.ndarray: (B,) phase from 0 to phases - 1
+    """
+    squares = configs.shape[-1] * configs.shape[-2]
+    filled = np.count_nonzero(configs.reshape(len(configs), -1), axis=1)
+    phase: np.ndarray = np.clip(
+        (filled - 4) * phases // max(squares - 3, 1), 0, phases - 1
+    )
+    return phase
+
+
+def _phase(filled: int, squares: int, phases: int) -> int:
+    """phase from the number of disks, the same as phases_of"""
+    return min(max((filled - 4) * phases // max(squares - 3, 1), 0), phases - 1)
+
+
+def _frontier(relative: np.ndarray) -> np.ndarray:
+    """(B, N, N) disks next to an empty square -> own minus other, (B,)"""
+    empty = np.pad(relative == 0, ((0, 0), (1, 1), (1, 1)))
+    length = relative.shape[-1]
+    near_empty = np.zeros(relative.shape, dtype=bool)
+    for row in range(3):
+        for col in range(3):
+            near_empty |= empty[:, row : row + length, col : col + length]
+    frontier: np.ndarray = (
+        (relative * near_empty).reshape(len(relative), -1).sum(axis=1)
+    )
+    return frontier
+
+
+def features(
+    configs: np.ndarray, disks: Union[np.ndarray, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """features of many boards
+
+    Args:
+        configs (np.ndarray): (B, N, N) stacked configurations
+        disks (Union[np.ndarray, int]): (B,) sides to move, or a single disk for
+            all boards
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (B, I) indices of the pattern images in
+            the weight vector and (B, 3) float32 values of NUMERIC_FEATURES
+    """
+    batch_size, length = configs.shape[0], configs.shape[-1]
+    disks = np.broadcast_to(np.asarray(disks, dtype=np.int8), (batch_size,))
+    relative = configs * disks[:, None, None]
+    own = np.ones(batch_size, dtype=np.int8)
+    own_moves = batch.obtain_legal_actions(relative, own)[0]
+    other_moves = batch.obtain_legal_actions(relative, -own)[0]
+    numeric = np.stack(
+        [
+            own_moves.reshape(batch_size, -1).sum(axis=1)
+            - other_moves.reshape(batch_size, -1).sum(axis=1),
+            _frontier(relative),
+            np.ones(batch_size),
+        ],
+        axis=1,
+    ).astype(np.float32)
+    return _pattern_indices(relative.reshape(batch_size, -1), length), numeric
+
+
+def _pattern_indices(relative: np.ndarray, length: int) -> np.ndarray:
+    """(B, N * N) cells from the side to move -> (B, I) indices in the weights"""
+    table = layout(length)
+    # 末尾に常に空きのマスを足して，パディングを読ませる
+    cells = np.concatenate(
+        [relative.astype(np.int64), np.zeros((len(relative), 1), dtype=np.int64)],
+        axis=1,
+    )
+    digits = cells[:, table.squares] + 1
+    indices: np.ndarray = (digits * table.powers).sum(axis=2) + table.offsets
+    return indices
+
+
+@lru_cache(maxsize=None)
+def _shifts(length: int) -> Tuple[Tuple[int, int], ...]:
+    """(shift, mask of the squares which do not wrap) of the eight neighbors"""
+    full = (1 << length * length) - 1
+    first = last = 0
+    for row in range(length):
+        first |= 1 << row * length
+        last |= 1 << row * length + length - 1
+    shifts = []
+    for row in (-1, 0, 1):
+        for col in (-1, 0, 1):
+            if row or col:
+                mask = full & ~(last if col == 1 else first if col == -1 else 0)
+                shifts.append((row * length + col, mask))
+    return tuple(shifts)
+
+
+def _near_empty(occupied: int, length: int) -> int:
+    """mask of the squares next to an empty square"""
+    empty = ((1 << length * length) - 1) & ~occupied
+    near = 0
+    for shift, mask in _shifts(length):
+        source = empty & mask
+        near |= source << shift if shift > 0 else source >> -shift
+    return near & ((1 << length * length) - 1)
+
+
+def _square_values(length: int) -> np.ndarray:
+    """hand-made value of every square in disks"""
+    last = length - 1
+    near = np.minimum(np.arange(length), last - np.arange(length))
+    near_row, near_col = np.meshgrid(near, near, indexing="ij")
+    values = np.zeros((length, length), dtype=np.float32)
+    low = np.minimum(near_row, near_col)
+    high = np.maximum(near_row, near_col)
+    values[low == 0] = 0.2
+    values[(low == 0) & (high == 1)] = -0.4
+    values[(low == 1) & (high == 1)] = -1.2
+    values[(low == 0) & (high == 0)] = 3.0
+    return values.ravel()
+
+
+class PatternEvaluator:
+    """pattern evaluation
+
+    Usable as ``search.Evaluator``: ``evaluator(player, opponent, length)``
+    returns the score from the side to move in 1 / scale disks.
+
+    Attributes:
+        weights (np.ndarray): (phases, features) float32 weights
+        length (int): length of board
+        scale (float): multiplier of the integer score
+    """
+
+    def __init__(self, weights: np.ndarray, length: int, scale: float = 100.0):
+        """constructor
+
+        Args:
+            weights (np.ndarray): (phases, features) weights
+            length (int): length of board
+            scale (float, optional): multiplier of the integer score.
+                Defaults to 100.0.
+
+        Raises:
+            ValueError: weights do not match the layout of the length
+        """
+        weights = np.asarray(weights, dtype=np.float32)
+        if weights.ndim != 2 or weights.shape[1] != layout(length).features:
+            raise ValueError(
+                f"weights of shape {weights.shape} do not match length {length}"
+            )
+        self.weights = weights
+        self.length = length
+        self.scale = scale
+
+    @property
+    def phases(self) -> int:
+        return len(self.weights)
+
+    @staticmethod
+    def initial(length: int, phases: int = DEFAULT_PHASES) -> PatternEvaluator:
+        """hand-made weights: square values, mobility and frontier
+
+        Args:
+            length (int): length of board
+            phases (int, optional): number of phases. Defaults to DEFAULT_PHASES.
+
+        Returns:
+            PatternEvaluator: evaluator
+        """
+        table = layout(length)
+        squares = length * length
+        # マスの価値を，そのマスを含む像の数で割って各パターンに配る
+        coverage = np.bincount(table.squares.ravel(), minlength=squares + 1)
+        share = _square_values(length) / np.maximum(coverage[:squares], 1)
+        weights = np.zeros(table.features, dtype=np.float32)
+        # 各パターンの最初の像 (同じパターンの像はテーブルを共有する)
+        firsts = np.flatnonzero(np.diff(table.offsets, prepend=-1))
+        for image, size in zip(firsts, table.sizes):
+            used = table.powers[image] > 0
+            digits = np.arange(size)[:, None] // table.powers[image, used] % 3
+            offset = int(table.offsets[image])
+            weights[offset : offset + size] = (digits - 1) @ share[
+                table.squares[image, used]
+            ]
+        weights[-3:] = (0.3, -0.2, 0.0)
+        return PatternEvaluator(np.tile(weights, (phases, 1)), length)
+
+    @staticmethod
+    def load(path: str) -> PatternEvaluator:
+        with np.load(path) as data:
+            return PatternEvaluator(data["weights"], int(data["length"]))
+
+    def save(self, path: str) -> None:
+        # ファイル名に.npzを付け足されないようにファイルオブジェクトに書く
+        with open(path, "wb") as file:
+            np.savez_compressed(file, weights=self.weights, length=self.length)
+
+    def evaluate_batch(
+        self, configs: np.ndarray, disks: Union[np.ndarray, int]
+    ) -> np.ndarray:
+        """evaluate many boards
+
+        Args:
+            configs (np.ndarray): (B, N, N) stacked configurations
+            disks (Union[np.ndarray, int]): (B,) sides to move, or a single disk
+                for all boards
+
+        Raises:
+            ValueError: the boards are not of the length of the weights
+
+        Returns:
+            np.ndarray: (B,) float32 estimated disk difference from the side to move
+        """
+        self._check_length(configs.shape[-1])
+        indices, numeric = features(configs, disks)
+        weights = self.weights[phases_of(configs, self.phases)]
+        rows = np.arange(len(configs))[:, None]
+        scores: np.ndarray = weights[rows, indices].sum(axis=1) + (
+            numeric * weights[:, -3:]
+        ).sum(axis=1)
+        return scores
+
+    def _check_length(self, length: int) -> None:
+        # 他の大きさの盤では重みの表を読み違えるので，黙って評価しない
+        if length != self.length:
+            raise ValueError(
+                f"weights of length {self.length} cannot evaluate length {length}"
+            )
+
+    def __call__(self, player: int, opponent: int, length: int) -> int:
+        self._check_length(length)
+        squares = length * length
+        # 1バイト余分に展開して，パディングのマスを常に空きとして読ませる
+        nbytes = squares // 8 + 1
+        bits = np.unpackbits(
+            np.frombuffer(
+                player.to_bytes(nbytes, "little") + opponent.to_bytes(nbytes, "little"),
+                dtype=np.uint8,
+            ),
+            bitorder="little",
+        ).astype(np.int64)
+        cells = bits[: nbytes * 8] - bits[nbytes * 8 :]
+        table = layout(length)
+        popcount = bitboard.popcount
+        weights = self.weights[
+            _phase(popcount(player | opponent), squares, self.phases)
+        ]
+        indices = ((cells[table.squares] + 1) * table.powers).sum(axis=1)
+        mobility = popcount(bitboard.legal_moves(player, opponent, length)) - popcount(
+            bitboard.legal_moves(opponent, player, length)
+        )
+        near_empty = _near_empty(player | opponent, length)
+        frontier = popcount(player & near_empty) - popcount(opponent & near_empty)
+        score = (
+            weights[indices + table.offsets].sum()
+            + weights[-3] * mobility
+            + weights[-2] * frontier
+            + weights[-1]
+        )
+        return int(float(score) * self.scale)
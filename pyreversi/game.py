@@ -1,20 +1,29 @@
 """reversi game"""
 from __future__ import annotations
 
-from typing import FrozenSet, Optional, cast
+import time
+from typing import Dict, FrozenSet, Optional, Set, Tuple, cast
 
-from pyreversi import logic
-from pyreversi.models import Board, Disk, Position
+from pyreversi import instrumentation, logic
+from pyreversi.models import Board, Disk, Position, Square, board_positions
 
 
 class Game:
     def __init__(self, board: Board, disk: Disk):
         self.current_disk = disk
         self.board = board
-        self._legal_actions = logic.obtain_legal_actions(board, self.current_disk)
-        self._game_over = not self._legal_actions and not logic.obtain_legal_actions(
-            board, cast(Disk, self.current_disk.reverse())
-        )
+        # 石の色 -> {legalな位置: その位置に置いたときに裏返る位置}
+        # Reversible.__eq__はintと等しくならないので，intにそろえてkeyにする
+        self._flips: Dict[int, Dict[Position, Tuple[Position, ...]]] = {
+            int(Disk.DARK): {},
+            int(Disk.LIGHT): {},
+        }
+        self._update_flips(None)
+        self._disk_counts: Dict[int, int] = {
+            int(Disk.DARK): logic.count_disk(board, Disk.DARK),
+            int(Disk.LIGHT): logic.count_disk(board, Disk.LIGHT),
+        }
+        self._update_status()
 
     @staticmethod
     def init_game(length: int) -> Game:
@@ -27,6 +36,17 @@ class Game:
     def get_legal_actions(self) -> FrozenSet[Position]:
         return self._legal_actions
 
+    def get_flips(self, action: Position) -> Tuple[Position, ...]:
+        """positions of the disks flipped by the action of current disk
+
+        Args:
+            action (Position): 石を置く場所
+
+        Returns:
+            Tuple[Position, ...]: 裏返る石の位置，legalでない場合は空
+        """
+        return self._flips[int(self.current_disk)].get(action, ())
+
     def execute_action(self, action: Optional[Position]) -> None:
         """execute action
 
@@ -38,15 +58,33 @@ class Game:
         """
         if not self.is_legal_action(action):
             raise IllegalActionError("不正な操作です．")
+        measure = instrumentation.enabled
+        if measure:
+            start = time.perf_counter()
         # Noneならパスなので，boardは変わらない
         if isinstance(action, Position):
-            self.board = logic.execute_action(self.board, self.current_disk, action)
+            flipped = self._flips[int(self.current_disk)][action]
+            config = self.board.config.copy()
+            config[action] = self.current_disk
+            for position in flipped:
+                config[position] = self.current_disk
+            self.board = Board(config)
+            self._disk_counts[int(self.current_disk)] += len(flipped) + 1
+            self._disk_counts[-self.current_disk] -= len(flipped)
+            # 置いた石と裏返した石を通る線上のマスだけ調べ直す
+            affected = _affected_positions(self.board, (action,) + flipped)
+            self._update_flips(affected)
+            if measure:
+                instrumentation.count("game_board_copies_total")
+                instrumentation.count("game_flips_total", len(flipped))
+                instrumentation.count("game_square_updates_total", len(affected))
         self.current_disk = cast(Disk, self.current_disk.reverse())
-        self._legal_actions = logic.obtain_legal_actions(self.board, self.current_disk)
-        # 自分も相手も石を置ける場所がないなら，ゲーム終了
-        self._game_over = not self._legal_actions and not logic.obtain_legal_actions(
-            self.board, cast(Disk, self.current_disk.reverse())
-        )
+        self._update_status()
+        if measure:
+            instrumentation.count("game_actions_total")
+            instrumentation.observe(
+                "game_execute_action_seconds", time.perf_counter() - start
+            )
 
     def is_legal_action(self, action: Optional[Position]) -> bool:
         """is legal action
@@ -64,7 +102,57 @@ class Game:
         )
 
     def count_disk(self, disk: logic.Disk) -> int:
-        return logic.count_disk(self.board, disk)
+        return self._disk_counts[int(disk)]
+
+    def _update_flips(self, positions: Optional[Set[Position]]) -> None:
+        """recompute legal actions and flips at the positions with the backend
+
+        Args:
+            positions (Optional[Set[Position]]): 調べ直す位置，Noneなら全てのマス
+        """
+        for disk in (Disk.DARK, Disk.LIGHT):
+            flips = self._flips[int(disk)]
+            if positions is None:
+                flips.clear()
+            else:
+                for position in positions:
+                    flips.pop(position, None)
+            flips.update(logic.obtain_legal_flips(self.board, disk, positions))
+
+    def _update_status(self) -> None:
+        self._legal_actions = frozenset(self._flips[int(self.current_disk)])
+        # 自分も相手も石を置ける場所がないなら，ゲーム終了
+        self._game_over = (
+            not self._legal_actions and not self._flips[-self.current_disk]
+        )
+
+
+def _affected_positions(board: Board, changed: Tuple[Position, ...]) -> Set[Position]:
+    """positions whose legality may be changed by the changed squares
+
+    空マスのlegalityは，その空マスから各方向に次の空マスまでの石で決まる．
+    そのため，変化したマスから石が続く限り進んで最初に出会う空マスだけが影響を受ける
+
+    Args:
+        board (Board): 変化した後の盤
+        changed (Tuple[Position, ...]): 石を置いた位置と裏返した位置
+
+    Returns:
+        Set[Position]: 影響を受ける位置，変化したマス自身も含む
+    """
+    length = len(board.config)
+    cells = board.cells
+    rays = logic._rays(length)  # pylint: disable=protected-access
+    positions = board_positions(length)
+    empty = int(Square.NULL)
+    affected = set(changed)
+    for position in changed:
+        for ray in rays[position.row * length + position.col]:
+            for index in ray:
+                if cells[index] == empty:
+                    affected.add(positions[index])
+                    break
+    return affected
 
 
 class IllegalActionError(ValueError):
@@ -0,0 +1,297 @@
+"""instrumentation
+
+opt-in counters and timing histograms of the hot paths.
+
+Instrumentation is off by default. ``Game`` and ``logic`` check the module
+flag ``enabled`` before recording anything, and ``Player.play`` of every
+player class is wrapped only while instrumentation is enabled, so a disabled
+process pays at most a flag check per call.
+
+Recorded metrics:
+    logic_legal_move_generations_total: calls of ``logic.obtain_legal_actions``
+        and ``logic.obtain_legal_flips``, which ``Game`` uses
+    logic_board_copies_total: boards copied by ``logic.execute_action``
+    game_actions_total: actions executed by ``Game``, including passes
+    game_board_copies_total: boards copied by ``Game.execute_action``
+    game_flips_total: disks flipped by ``Game.execute_action``
+    game_square_updates_total: squares whose legal moves were recomputed
+    game_execute_action_seconds: histogram of ``Game.execute_action``
+    player_play_seconds{player}: histogram of ``Player.play``
+    player_search_nodes_total{player}: ``last_result.nodes`` of search players
+    player_playouts_total{player}: ``last_result.playouts`` of MCTS players,
+        counted only when ``play`` replaced ``last_result``
+
+Histograms have power-of-two buckets from 1 microsecond. Metrics are exported
+as a dict by ``snapshot`` or as Prometheus text by ``prometheus_text``, which
+``serve`` exposes over HTTP for scraping.
+"""
+from __future__ import annotations
+
+import functools
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict
+
+# 計測の有効・無効．呼び出し側はこのフラグだけを見る
+enabled = False
+
+# 最も小さいバケツの上限 (秒)，バケツの上限はこれの2のべき乗倍
+_BASE = 1e-6
+_BUCKETS = 25
+
+Labels = Tuple[Tuple[str, str], ...]
+Play = Callable[[object, object], object]
+
+
+class HistogramSnapshot(TypedDict):
+    """recorded values of a histogram, see ``snapshot``"""
+
+    count: int
+    sum: float
+    buckets: List[int]
+
+
+class Snapshot(TypedDict):
+    """recorded values, see ``snapshot``"""
+
+    counters: Dict[str, int]
+    histograms: Dict[str, HistogramSnapshot]
+
+
+class Histogram:
+    """histogram of durations with power-of-two buckets
+
+    Attributes:
+        counts (List[int]): observations per bucket, the last one is +Inf
+        total (float): sum of the observations in seconds
+    """
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (_BUCKETS + 1)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, seconds: float) -> None:
+        # seconds <= _BASE * 2 ** exponent となる最小のexponentがバケツ
+        exponent = math.frexp(seconds / _BASE)[1] if seconds > _BASE else 0
+        self.counts[min(exponent, _BUCKETS)] += 1
+        self.total += seconds
+
+    @staticmethod
+    def bounds() -> List[float]:
+        """upper bounds of the buckets except +Inf"""
+        return [_BASE * 2**i for i in range(_BUCKETS)]
+
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], int] = {}
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+# 計測対象のPlayerのクラスと，包む前のplay
+_player_classes: List[type] = []
+_originals: Dict[type, Play] = {}
+
+
+def enable() -> None:
+    """start recording and wrap Player.play of every player class"""
+    global enabled  # pylint: disable=global-statement
+    enabled = True
+    for cls in _player_classes:
+        _wrap_play(cls)
+
+
+def disable() -> None:
+    """stop recording and restore Player.play, recorded values are kept"""
+    global enabled  # pylint: disable=global-statement
+    enabled = False
+    for cls, play in _originals.items():
+        setattr(cls, "play", play)
+    _originals.clear()
+
+
+def reset() -> None:
+    """clear recorded values"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def count(name: str, value: int = 1, **labels: str) -> None:
+    """add to a counter
+
+    Args:
+        name (str): metric name
+        value (int, optional): amount. Defaults to 1.
+        labels (str): labels of the metric
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    """record a duration
+
+    Args:
+        name (str): metric name
+        seconds (float): duration
+        labels (str): labels of the metric
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def register_player(cls: type) -> None:
+    """register a player class, called by ``Player.__init_subclass__``
+
+    Args:
+        cls (type): subclass of Player
+    """
+    _player_classes.append(cls)
+    if enabled:
+        _wrap_play(cls)
+
+
+def _wrap_play(cls: type) -> None:
+    play: Optional[Play] = cls.__dict__.get("play")
+    if play is None or cls in _originals:
+        return
+    _originals[cls] = play
+    player = cls.__name__
+
+    @functools.wraps(play)
+    def wrapper(self: object, game: object) -> object:
+        previous = getattr(self, "last_result", None)
+        start = time.perf_counter()
+        try:
+            return play(self, game)
+        finally:
+            observe("player_play_seconds", time.perf_counter() - start, player=player)
+            # 探索しなかった手 (定石など) では前の結果が残っているので数えない
+            result = getattr(self, "last_result", None)
+            if result is not previous:
+                _count_result(result, player)
+
+    setattr(cls, "play", wrapper)
+
+
+def _count_result(result: object, player: str) -> None:
+    nodes = getattr(result, "nodes", None)
+    if nodes is not None:
+        count("player_search_nodes_total", nodes, player=player)
+    playouts = getattr(result, "playouts", None)
+    if playouts is not None:
+        count("player_playouts_total", playouts, player=player)
+
+
+def _format(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def snapshot() -> Snapshot:
+    """copy of the recorded values
+
+    Returns:
+        Snapshot: {"counters": {metric: value}, "histograms": {metric: {"count",
+            "sum", "buckets"}}}, where metric is ``name{label="value"}`` and
+            buckets are the observations per bucket of ``Histogram.bounds`` and +Inf
+    """
+    with _lock:
+        return {
+            "counters": {
+                _format(name, labels): value
+                for (name, labels), value in sorted(_counters.items())
+            },
+            "histograms": {
+                _format(name, labels): {
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    "buckets": list(histogram.counts),
+                }
+                for (name, labels), histogram in sorted(_histograms.items())
+            },
+        }
+
+
+def prometheus_text(prefix: str = "pyreversi") -> str:
+    """recorded values in the Prometheus text exposition format
+
+    Args:
+        prefix (str, optional): prefix of the metric names. Defaults to "pyreversi".
+
+    Returns:
+        str: exposition text
+    """
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = [
+            (key, list(histogram.counts), histogram.total)
+            for key, histogram in sorted(_histograms.items())
+        ]
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{prefix}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{_format(metric, labels)} {value}")
+    bounds = [f"{bound:g}" for bound in Histogram.bounds()] + ["+Inf"]
+    for (name, labels), counts, total in histograms:
+        metric = f"{prefix}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, bucket in zip(bounds, counts):
+            cumulative += bucket
+            lines.append(
+                f"{_format(metric + '_bucket', labels + (('le', bound),))} {cumulative}"
+            )
+        lines.append(f"{_format(metric + '_sum', labels)} {total}")
+        lines.append(f"{_format(metric + '_count', labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+
+def serve(port: int = 9100, host: str = "") -> ThreadingHTTPServer:
+    """serve ``/metrics`` from a daemon thread
+
+    Args:
+        port (int, optional): port, 0 picks a free one. Defaults to 9100.
+        host (str, optional): address to bind. Defaults to "", all interfaces.
+
+    Returns:
+        ThreadingHTTPServer: running server, stop it with ``shutdown()``
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -4,11 +4,147 @@ fundamental elements and logics of reversi
 """
 from __future__ import annotations
 
-from typing import FrozenSet, Optional, Tuple
+import importlib
+import importlib.util
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    cast,
+)
 
 import numpy as np
 
-from pyreversi.models import _DIRECTIONS, Board, Direction, Disk, Position, Square
+from pyreversi import instrumentation
+from pyreversi.models import (
+    _DIRECTIONS,
+    Board,
+    Direction,
+    Disk,
+    Position,
+    Square,
+    board_positions,
+)
+
+
+class _Backend(Protocol):
+    """functions which a backend module must provide"""
+
+    def init_board(self, length: int) -> Board: ...
+
+    def obtain_legal_actions(self, board: Board, disk: Disk) -> FrozenSet[Position]: ...
+
+    def execute_action(self, board: Board, disk: Disk, position: Position) -> Board: ...
+
+    def obtain_legal_flips(
+        self, board: Board, disk: Disk, positions: Optional[Iterable[Position]]
+    ) -> Dict[Position, Tuple[Position, ...]]: ...
+
+    def count_disk(self, board: Board, disk: Disk) -> int: ...
+
+
+# raw value of an empty square. Reversible.__eq__ is False for plain ints,
+# so compare raw cells (Board.cells, Board.value) with this instead of Square.NULL
+_NULL = int(Square.NULL)
+
+# backend name -> module implementing the same functions as this module
+_BACKENDS: Dict[str, str] = {
+    "python": __name__,
+    "bitboard": "pyreversi.bitboard",
+    "native": "pyreversi.native",
+}
+# backend name -> optional package which the backend needs
+_REQUIREMENTS: Dict[str, str] = {
+    "native": "numba",
+}
+# set_backend("auto") selects the first available one
+AUTO = "auto"
+_AUTO_ORDER = ("native", "python")
+_backend_name = "python"
+# Noneならこのモジュールの実装を使う
+_backend: Optional[_Backend] = None
+
+
+def _is_available(name: str) -> bool:
+    requirement = _REQUIREMENTS.get(name)
+    return requirement is None or importlib.util.find_spec(requirement) is not None
+
+
+def available_backends() -> Tuple[str, ...]:
+    """names of the selectable backends
+
+    Backends whose optional package is not installed are left out.
+
+    Returns:
+        Tuple[str, ...]: backend names
+    """
+    return tuple(name for name in _BACKENDS if _is_available(name))
+
+
+def get_backend() -> str:
+    """name of the active backend
+
+    After ``set_backend("auto")`` this is the backend which was chosen.
+
+    Returns:
+        str: backend name
+    """
+    return _backend_name
+
+
+def set_backend(name: str) -> None:
+    """select the implementation used by the functions of this module
+
+    Game and players call this module, so they follow the selected backend.
+    "auto" selects the compiled backend if its package is installed and falls
+    back to this module otherwise.
+
+    Args:
+        name (str): backend name, one of ``available_backends()`` or "auto"
+
+    Raises:
+        ValueError: unknown backend name or missing optional package
+    """
+    global _backend, _backend_name  # pylint: disable=global-statement
+    if name == AUTO:
+        name = next(name for name in _AUTO_ORDER if _is_available(name))
+    if name not in _BACKENDS:
+        raise ValueError(f"unknown backend '{name}'")
+    if not _is_available(name):
+        raise ValueError(f"backend '{name}' needs {_REQUIREMENTS[name]}")
+    module_name = _BACKENDS[name]
+    _backend = (
+        None
+        if module_name == __name__
+        else cast(_Backend, importlib.import_module(module_name))
+    )
+    _backend_name = name
+
+
+@contextmanager
+def use_backend(name: str) -> Iterator[None]:
+    """select the backend within the block and restore the previous one after
+
+    Args:
+        name (str): backend name, one of ``available_backends()`` or "auto"
+
+    Yields:
+        Iterator[None]: nothing
+    """
+    previous = _backend_name
+    set_backend(name)
+    try:
+        yield
+    finally:
+        set_backend(previous)
 
 
 def init_board(length: int) -> Board:
@@ -20,6 +156,8 @@ def init_board(length: int) -> Board:
     Returns:
         Board: [description]
     """
+    if _backend is not None:
+        return _backend.init_board(length)
     config: np.ndarray = np.zeros((length, length), dtype=np.int8)
     config[length // 2][length // 2] = Square.LIGHT
     config[length // 2 - 1][length // 2 - 1] = Square.LIGHT
@@ -38,11 +176,107 @@ def obtain_legal_actions(board: Board, disk: Disk) -> FrozenSet[Position]:
     Returns:
         FrozenSet[Position]: legal actions
     """
+    if instrumentation.enabled:
+        instrumentation.count("logic_legal_move_generations_total")
+    if _backend is not None:
+        return _backend.obtain_legal_actions(board, disk)
+    length = len(board.config)
+    cells = board.cells
+    disk_value = int(disk)
+    positions = board_positions(length)
     return frozenset(
-        [position for position in board if _is_legal_action(board, disk, position)]
+        [
+            positions[index]
+            for index, rays in enumerate(_rays(length))
+            if cells[index] == _NULL and _is_legal_on_rays(cells, disk_value, rays)
+        ]
     )
 
 
+@lru_cache(maxsize=None)
+def _rays(length: int) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """precomputed rays of the board length
+
+    rays[index]は，flat index indexのマスから8方向に進んだときのマスのflat indexの列．
+    盤の内側に切り詰め，空の列は除く
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Tuple[Tuple[Tuple[int, ...], ...], ...]: rays per flat index
+    """
+    rays = []
+    for row in range(length):
+        for col in range(length):
+            square_rays = []
+            for direction in _DIRECTIONS:
+                ray = []
+                next_row, next_col = row + direction.row, col + direction.col
+                while 0 <= next_row < length and 0 <= next_col < length:
+                    ray.append(next_row * length + next_col)
+                    next_row, next_col = (
+                        next_row + direction.row,
+                        next_col + direction.col,
+                    )
+                if ray:
+                    square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+def _is_legal_on_rays(
+    cells: Sequence[int], disk: int, rays: Tuple[Tuple[int, ...], ...]
+) -> bool:
+    """diskを置いたときにいずれかのrayで石を挟めるか
+
+    Args:
+        cells (Sequence[int]): flat config
+        disk (int): 置きたい石
+        rays (Tuple[Tuple[int, ...], ...]): 置きたいマスのray
+
+    Returns:
+        bool: True if legal
+    """
+    for ray in rays:
+        if cells[ray[0]] != -disk:
+            continue
+        for index in ray[1:]:
+            cell = cells[index]
+            if cell == disk:
+                return True
+            if cell == _NULL:
+                break
+    return False
+
+
+def _flips_on_rays(
+    cells: Sequence[int], disk: int, rays: Tuple[Tuple[int, ...], ...]
+) -> List[int]:
+    """diskを置いたときに裏返る石のflat index
+
+    Args:
+        cells (Sequence[int]): flat config
+        disk (int): 置きたい石
+        rays (Tuple[Tuple[int, ...], ...]): 置きたいマスのray
+
+    Returns:
+        List[int]: 裏返る石のflat index
+    """
+    flipped: List[int] = []
+    for ray in rays:
+        if cells[ray[0]] != -disk:
+            continue
+        for distance in range(1, len(ray)):
+            cell = cells[ray[distance]]
+            if cell == disk:
+                flipped.extend(ray[:distance])
+                break
+            if cell == _NULL:
+                break
+    return flipped
+
+
 def _is_legal_action(board: Board, disk: Disk, position: Position) -> bool:
     """legal actionか
 
@@ -54,19 +288,15 @@ def _is_legal_action(board: Board, disk: Disk, position: Position) -> bool:
     Returns:
         bool: True if legal, False if illegal
     """
-    if board[position] != Square.NULL:
+    if board.value(position) != _NULL:
         return False
-    # 周囲8マスにdiskの逆がなければfalse
-    # 周囲8マスにdiskの逆がある場合，その方向に進んで，NULLにならずにdiskがあればTrue
-    for direction in _DIRECTIONS:
-        adjacent_position = position + direction
-        if (
-            board.is_in_range(adjacent_position)
-            and board[adjacent_position] == disk.reverse()
-            and _increment_search(board, disk, adjacent_position, direction)[0]
-        ):
-            return True
-    return False
+    # 各方向のrayを進んで，diskの逆が続いた後にNULLにならずにdiskがあればTrue
+    length = len(board.config)
+    return _is_legal_on_rays(
+        board.cells,
+        int(disk),
+        _rays(length)[position.row * length + position.col],
+    )
 
 
 def _increment_search(
@@ -86,18 +316,16 @@ def _increment_search(
     Returns:
         Tuple[bool, Optional[Position]]: diskのマスに到達できたかの真偽値と到達した位置
     """
-    if not board.is_in_range(position):
-        return False, None
-    if board[position] == Square.NULL:
-        return False, None
-    if board[position] == disk:
-        return True, position
-    return _increment_search(
-        board,
-        disk,
-        position + direction,
-        direction,
-    )
+    disk_value = int(disk)
+    # 再帰すると大きな盤で再帰の上限に届くので，ループで進む
+    while board.is_in_range(position):
+        value = board.value(position)
+        if value == _NULL:
+            break
+        if value == disk_value:
+            return True, position
+        position = position + direction
+    return False, None
 
 
 def execute_action(board: Board, disk: Disk, position: Position) -> Board:
@@ -112,31 +340,87 @@ def execute_action(board: Board, disk: Disk, position: Position) -> Board:
     Returns:
         Board: 石が置かれた新しい状態の盤
     """
-    flip_position_list = [position]
-    for direction in _DIRECTIONS:
-        adjacent_position = position + direction
-        # 隣の位置がマスをはみ出すか隣の位置のマスの色がdiskの逆でないないなら
-        if (
-            not board.is_in_range(adjacent_position)
-            or board[adjacent_position] != disk.reverse()
-        ):
-            continue
-        legal, end_position = _increment_search(
-            board, disk, adjacent_position, direction
-        )
-        while legal and adjacent_position != end_position:
-            flip_position_list.append(adjacent_position)
-            adjacent_position = adjacent_position + direction
-
-    # flip_position_listが1なら一枚もひっくり返らないのでlegal actionではない
+    if instrumentation.enabled:
+        instrumentation.count("logic_board_copies_total")
+    if _backend is not None:
+        return _backend.execute_action(board, disk, position)
+    flip_position_list = obtain_flips(board, disk, position)
+    # flip_position_listが空なら一枚もひっくり返らないのでlegal actionではない
     # 関数呼び出し側がちゃんとlegal actionとなるように注意する
-    assert len(flip_position_list) > 1
+    assert flip_position_list
     config: np.ndarray = board.config.copy()
+    config[position] = disk
     for flipped_position in flip_position_list:
         config[flipped_position] = disk
     return Board(config)
 
 
+def obtain_flips(board: Board, disk: Disk, position: Position) -> Tuple[Position, ...]:
+    """obtain positions of the disks flipped by the action
+
+    空でないマスやlegalでない場所では空のtupleを返す．
+    backendによらず，このモジュールの実装を使う．多くの位置を調べるなら
+    backendを使うobtain_legal_flipsの方が速い
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+        position (Position): 置きたい位置
+
+    Returns:
+        Tuple[Position, ...]: 裏返る石の位置
+    """
+    if board.value(position) != _NULL:
+        return ()
+    length = len(board.config)
+    flipped = _flips_on_rays(
+        board.cells,
+        int(disk),
+        _rays(length)[position.row * length + position.col],
+    )
+    positions = board_positions(length)
+    return tuple(positions[index] for index in flipped)
+
+
+def obtain_legal_flips(
+    board: Board, disk: Disk, positions: Optional[Iterable[Position]] = None
+) -> Dict[Position, Tuple[Position, ...]]:
+    """obtain legal actions among positions and the disks flipped by them
+
+    Game keeps this map and updates it only at the squares affected by a move.
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+        positions (Optional[Iterable[Position]], optional): 調べる位置．
+            Defaults to None, all squares.
+
+    Returns:
+        Dict[Position, Tuple[Position, ...]]: legal action -> 裏返る石の位置．
+            裏返る石は行優先の順に並ぶ
+    """
+    if instrumentation.enabled:
+        instrumentation.count("logic_legal_move_generations_total")
+    if _backend is not None:
+        return _backend.obtain_legal_flips(board, disk, positions)
+    length = len(board.config)
+    cells = board.cells
+    disk_value = int(disk)
+    rays = _rays(length)
+    squares = board_positions(length)
+    if positions is None:
+        positions = squares
+    result: Dict[Position, Tuple[Position, ...]] = {}
+    for position in positions:
+        index = position.row * length + position.col
+        if cells[index] != _NULL:
+            continue
+        flipped = _flips_on_rays(cells, disk_value, rays[index])
+        if flipped:
+            result[position] = tuple([squares[flip] for flip in sorted(flipped)])
+    return result
+
+
 def count_disk(board: Board, disk: Disk) -> int:
     """count disk
 
@@ -147,4 +431,6 @@ def count_disk(board: Board, disk: Disk) -> int:
     Returns:
         int: 数えたい石の数
     """
-    return int(np.count_nonzero(board.config == disk))
+    if _backend is not None:
+        return _backend.count_disk(board, disk)
+    return board.cells.count(int(disk))
@@ -0,0 +1,419 @@
+"""monte carlo tree search
+
+UCT over bitboard positions with random playouts.
+
+Each simulation selects a leaf by UCT, expands one untried move and plays
+random games from it. Playouts run on bitboards one at a time, or on
+``pyreversi.batch`` when ``rollouts`` playouts are played from every leaf at
+once. The tree is kept after a move and reused when the next position is a
+child of it.
+
+Root parallelization runs independent trees of the same position in worker
+processes and sums the visit counts of the root moves.
+"""
+from __future__ import annotations
+
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from pyreversi import batch, bitboard
+from pyreversi.game import Game
+from pyreversi.models import Disk, Position
+from pyreversi.mutable import MutableGame
+from pyreversi.players import Player
+
+# 木をたどって再利用する局面を探す深さ (自分の手と相手の手)
+_REUSE_DEPTH = 2
+
+
+class MCTSResult(NamedTuple):
+    """result of a search
+
+    Attributes:
+        action (Optional[Position]): most visited action, None means pass
+        visits (Dict[Optional[Position], int]): visits of the root actions
+        win_rate (float): mean reward of the action for the side to move
+        playouts (int): playouts of this search
+        elapsed (float): elapsed seconds
+    """
+
+    action: Optional[Position]
+    visits: Dict[Optional[Position], int]
+    win_rate: float
+    playouts: int
+    elapsed: float
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Node:
+    """node of the search tree
+
+    Attributes:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        move (int): move mask from the parent, 0 means pass
+        visits (int): playouts through the node
+        reward (float): sum of rewards of the side which played move
+        children (List[Node]): expanded children
+        untried (List[int]): moves not expanded yet, 0 means pass
+    """
+
+    __slots__ = (
+        "player",
+        "opponent",
+        "move",
+        "visits",
+        "reward",
+        "children",
+        "untried",
+    )
+
+    def __init__(self, player: int, opponent: int, move: int, length: int):
+        self.player = player
+        self.opponent = opponent
+        self.move = move
+        self.visits = 0
+        self.reward = 0.0
+        self.children: List[Node] = []
+        moves = bitboard.legal_moves(player, opponent, length)
+        if moves:
+            self.untried = [1 << index for index in bitboard.iter_indices(moves)]
+            random.shuffle(self.untried)
+        elif bitboard.legal_moves(opponent, player, length):
+            self.untried = [0]
+        else:
+            # 終局
+            self.untried = []
+
+    def is_terminal(self) -> bool:
+        return not self.untried and not self.children
+
+    def expand(self, length: int) -> Node:
+        move = self.untried.pop()
+        flipped = (
+            bitboard.flips(self.player, self.opponent, move, length) if move else 0
+        )
+        child = Node(
+            self.opponent ^ flipped, self.player | move | flipped, move, length
+        )
+        self.children.append(child)
+        return child
+
+    def select(self, exploration: float) -> Node:
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.reward / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+def playout(player: int, opponent: int, length: int) -> int:
+    """play a random game on bitboards
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        length (int): length of board
+
+    Returns:
+        int: final disk difference from the side to move
+    """
+    sign = 1
+    passed = False
+    while True:
+        moves = bitboard.legal_moves(player, opponent, length)
+        if moves:
+            passed = False
+            move = 1 << random.choice(list(bitboard.iter_indices(moves)))
+            flipped = bitboard.flips(player, opponent, move, length)
+            player, opponent = opponent ^ flipped, player | move | flipped
+        elif passed:
+            break
+        else:
+            passed = True
+            player, opponent = opponent, player
+        sign = -sign
+    return sign * (bitboard.popcount(player) - bitboard.popcount(opponent))
+
+
+def batch_playout(player: int, opponent: int, length: int, count: int) -> np.ndarray:
+    """play random games from the same position at once with ``pyreversi.batch``
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        length (int): length of board
+        count (int): number of games
+
+    Returns:
+        np.ndarray: (count,) final disk differences from the side to move
+    """
+    config = bitboard.to_board(player, opponent, length).config
+    # 手番側を黒として打つ
+    configs = np.repeat(config[None], count, axis=0)
+    disks = np.full(count, Disk.DARK, dtype=np.int8)
+    passes = np.zeros(count, dtype=np.int8)
+    while np.any(passes < 2):
+        legal, _ = batch.obtain_legal_actions(configs, disks)
+        flat = legal.reshape(count, -1)
+        # 合法手の中から一様に選ぶ
+        choice = np.argmax(np.random.random(flat.shape) * flat, axis=1)
+        can_move = flat.any(axis=1) & (passes < 2)
+        passes = np.where(can_move, 0, np.minimum(passes + 1, 2))
+        rows = np.where(can_move, choice // length, -1)
+        batch.execute_action(configs, disks, rows, choice % length)
+        disks = -disks
+    differences: np.ndarray = configs.reshape(count, -1).sum(axis=1)
+    return differences
+
+
+class MCTS:
+    """UCT search with tree reuse"""
+
+    def __init__(self, exploration: float = 1.4, rollouts: int = 1):
+        """constructor
+
+        Args:
+            exploration (float, optional): exploration constant of UCT.
+                Defaults to 1.4.
+            rollouts (int, optional): playouts from every expanded leaf, more
+                than 1 plays them at once with ``pyreversi.batch``. Defaults to 1.
+        """
+        self.exploration = exploration
+        self.rollouts = rollouts
+        self.root: Optional[Node] = None
+        self.length = 0
+
+    def set_root(self, player: int, opponent: int, length: int) -> Node:
+        """use the position as the root, reusing the subtree if it is in the tree
+
+        Args:
+            player (int): mask of the side to move
+            opponent (int): mask of the other side
+            length (int): length of board
+
+        Returns:
+            Node: root
+        """
+        if self.root is not None and self.length == length:
+            nodes = [self.root]
+            for _ in range(_REUSE_DEPTH + 1):
+                for node in nodes:
+                    if node.player == player and node.opponent == opponent:
+                        self.root = node
+                        return node
+                nodes = [child for node in nodes for child in node.children]
+        self.root = Node(player, opponent, 0, length)
+        self.length = length
+        return self.root
+
+    def search(
+        self, playouts: Optional[int] = None, time_limit: Optional[float] = None
+    ) -> int:
+        """run simulations from the root
+
+        Args:
+            playouts (Optional[int], optional): max playouts. Defaults to None.
+            time_limit (Optional[float], optional): max seconds. Defaults to None.
+
+        Returns:
+            int: playouts run
+        """
+        assert self.root is not None
+        assert playouts is not None or time_limit is not None
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        done = 0
+        while (playouts is None or done < playouts) and (
+            deadline is None or time.perf_counter() < deadline
+        ):
+            done += self._simulate(self.root)
+        return done
+
+    def _simulate(self, root: Node) -> int:
+        length = self.length
+        node = root
+        path = [node]
+        while not node.untried and node.children:
+            node = node.select(self.exploration)
+            path.append(node)
+        if node.untried:
+            node = node.expand(length)
+            path.append(node)
+        if node.is_terminal():
+            count = 1
+            differences = [
+                bitboard.popcount(node.player) - bitboard.popcount(node.opponent)
+            ]
+        elif self.rollouts > 1:
+            count = self.rollouts
+            differences = batch_playout(
+                node.player, node.opponent, length, count
+            ).tolist()
+        else:
+            count = 1
+            differences = [playout(node.player, node.opponent, length)]
+        # 葉の手番側から見た報酬，勝ち1，引き分け0.5
+        reward = sum((d > 0) + 0.5 * (d == 0) for d in differences)
+        for node in reversed(path):
+            # node.rewardはnodeへの手を打った側，つまり葉の手番の相手から見た値
+            reward = count - reward
+            node.visits += count
+            node.reward += reward
+        return count
+
+    def best_child(self) -> Node:
+        assert self.root is not None and self.root.children
+        return max(self.root.children, key=lambda child: child.visits)
+
+
+def _to_action(move: int, length: int) -> Optional[Position]:
+    if not move:
+        return None
+    return Position(*divmod(move.bit_length() - 1, length))
+
+
+def _search_root(
+    player: int,
+    opponent: int,
+    length: int,
+    playouts: Optional[int],
+    time_limit: Optional[float],
+    exploration: float,
+    rollouts: int,
+    seed: int,
+) -> Dict[int, Tuple[int, float]]:
+    """search an independent tree in a worker process
+
+    Returns:
+        Dict[int, Tuple[int, float]]: move -> (visits, reward) of the root children
+    """
+    random.seed(seed)
+    np.random.seed(seed % (1 << 32))
+    mcts = MCTS(exploration, rollouts)
+    mcts.set_root(player, opponent, length)
+    mcts.search(playouts, time_limit)
+    assert mcts.root is not None
+    return {child.move: (child.visits, child.reward) for child in mcts.root.children}
+
+
+class MCTSPlayer(Player):
+    """monte carlo tree search player
+
+    Attributes:
+        last_result (Optional[MCTSResult]): result of the last play
+    """
+
+    def __init__(
+        self,
+        playouts: Optional[int] = 1000,
+        time_limit: Optional[float] = None,
+        exploration: float = 1.4,
+        rollouts: int = 1,
+        workers: int = 0,
+        reuse: bool = True,
+    ):
+        """constructor
+
+        Args:
+            playouts (Optional[int], optional): playouts per move.
+                Defaults to 1000.
+            time_limit (Optional[float], optional): seconds per move, the search
+                stops at whichever budget runs out first. Defaults to None.
+            exploration (float, optional): exploration constant of UCT.
+                Defaults to 1.4.
+            rollouts (int, optional): playouts from every expanded leaf.
+                Defaults to 1.
+            workers (int, optional): worker processes of root parallelization,
+                0 searches in this process. The playouts are split among them.
+                Defaults to 0.
+            reuse (bool, optional): reuse the tree across moves. Defaults to True.
+
+        Raises:
+            ValueError: neither playouts nor time_limit is given
+        """
+        if playouts is None and time_limit is None:
+            raise ValueError("playouts or time_limit is required")
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.workers = workers
+        self.reuse = reuse
+        self.mcts = MCTS(exploration, rollouts)
+        self.last_result: Optional[MCTSResult] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def play(self, game: Game) -> Optional[Position]:
+        start = time.perf_counter()
+        mutable = MutableGame.from_game(game)
+        length = mutable.length
+        if self.workers:
+            visits, rewards, playouts = self._search_parallel(mutable)
+        else:
+            if not self.reuse:
+                self.mcts.root = None
+            root = self.mcts.set_root(mutable.player, mutable.opponent, length)
+            before = root.visits
+            self.mcts.search(self.playouts, self.time_limit)
+            playouts = root.visits - before
+            visits = {child.move: child.visits for child in root.children}
+            rewards = {child.move: child.reward for child in root.children}
+        if not visits:
+            self.last_result = MCTSResult(
+                None, {}, 0.0, playouts, time.perf_counter() - start
+            )
+            return None
+        move = max(visits, key=visits.__getitem__)
+        if not self.workers:
+            # 選んだ手の部分木を次の手番で再利用する
+            self.mcts.root = self.mcts.best_child()
+        action = _to_action(move, length)
+        self.last_result = MCTSResult(
+            action,
+            {_to_action(m, length): v for m, v in visits.items()},
+            rewards[move] / visits[move],
+            playouts,
+            time.perf_counter() - start,
+        )
+        return action
+
+    def _search_parallel(
+        self, game: MutableGame
+    ) -> Tuple[Dict[int, int], Dict[int, float], int]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        playouts = None if self.playouts is None else -(-self.playouts // self.workers)
+        futures = [
+            self._executor.submit(
+                _search_root,
+                game.player,
+                game.opponent,
+                game.length,
+                playouts,
+                self.time_limit,
+                self.mcts.exploration,
+                self.mcts.rollouts,
+                random.getrandbits(63),
+            )
+            for _ in range(self.workers)
+        ]
+        visits: Dict[int, int] = {}
+        rewards: Dict[int, float] = {}
+        for future in futures:
+            for move, (count, reward) in future.result().items():
+                visits[move] = visits.get(move, 0) + count
+                rewards[move] = rewards.get(move, 0.0) + reward
+        return visits, rewards, sum(visits.values())
+
+    def close(self) -> None:
+        """shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
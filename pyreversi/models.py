@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 from enum import IntEnum
-from typing import Iterator, NamedTuple, Tuple
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
 
 import numpy as np
 
@@ -12,10 +13,11 @@ class Reversible(IntEnum):
         return self.__class__(-self)
 
     def __eq__(self, obj: object) -> bool:
-        # NOTE: self.value is alerted incorrectly by pylint.
-        # So use int(self)
-        # https://github.com/PyCQA/pylint/issues/2306
-        return isinstance(obj, Reversible) and int(self) == obj.value
+        # intの比較をそのまま使う．Reversible同士でなければFalse
+        return isinstance(obj, Reversible) and int.__eq__(self, obj)
+
+    # __eq__を定義するとunhashableになるので，intのhashを使う
+    __hash__ = int.__hash__
 
 
 class Disk(Reversible):
@@ -90,6 +92,23 @@ class Position(NamedTuple):
         return Position(self.row + direction.row, self.col + direction.col)
 
 
+@lru_cache(maxsize=None)
+def board_positions(length: int) -> Tuple[Position, ...]:
+    """positions of the board in row-major order
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Tuple[Position, ...]: positions, index is the flat index of the square
+    """
+    return tuple(Position(row, col) for row in range(length) for col in range(length))
+
+
+# raw value -> Square, Square(value)より速い
+_SQUARES = {int(square): square for square in Square}
+
+
 class Board:
     """reversi board
 
@@ -107,6 +126,8 @@ class Board:
         """
         self._config: np.ndarray = config.copy()
         self._config.setflags(write=False)
+        self._hash: Optional[int] = None
+        self._cells: Optional[Tuple[int, ...]] = None
 
     def __eq__(self, board: object) -> bool:
         return isinstance(board, Board) and np.array_equal(self._config, board._config)
@@ -114,12 +135,17 @@ class Board:
     def __ne__(self, board: object) -> bool:
         return not self.__eq__(board)
 
+    def __hash__(self) -> int:
+        # configは変更できないので，一度だけ計算する
+        # dtypeが異なっても等しいboardは同じhashになるようにint8にそろえる
+        if self._hash is None:
+            self._hash = hash(
+                (self._config.shape, self._config.astype(np.int8).tobytes())
+            )
+        return self._hash
+
     def __getitem__(self, position: object) -> Square:
-        if not isinstance(position, Position):
-            raise TypeError(f"{position} is not 'Position'")
-        if not self.is_in_range(position):
-            raise IndexError(f"{position} is out of range")
-        return Square(self._config[position])
+        return _SQUARES[self.value(position)]
 
     def __str__(self) -> str:
         board_str = ""
@@ -134,11 +160,45 @@ class Board:
         return f"Board(\n{repr(self._config)})"
 
     def __iter__(self) -> Iterator[Position]:
-        return iter([Position(*index) for index in np.ndindex(self.config.shape)])
+        return iter(board_positions(len(self._config)))
 
     @property
     def config(self) -> np.ndarray:
         return self._config
 
+    @property
+    def cells(self) -> Tuple[int, ...]:
+        """raw values of the squares in row-major order
+
+        configは変更できないので，一度だけ作る
+
+        Returns:
+            Tuple[int, ...]: -1, 0 or 1 per flat index
+        """
+        if self._cells is None:
+            self._cells = tuple(self._config.ravel().tolist())
+        return self._cells
+
+    def value(self, position: object) -> int:
+        """raw value of the square, same as ``int(board[position])``
+
+        Args:
+            position (object): position
+
+        Raises:
+            TypeError: position is not Position
+            IndexError: position is out of range
+
+        Returns:
+            int: -1, 0 or 1
+        """
+        if not isinstance(position, Position):
+            raise TypeError(f"{position} is not 'Position'")
+        row, col = position
+        length = len(self._config)
+        if not (0 <= row < length and 0 <= col < length):
+            raise IndexError(f"{position} is out of range")
+        return self.cells[row * length + col]
+
     def is_in_range(self, position: Position) -> bool:
         return Position(0, 0) <= position < Position(*self._config.shape)
@@ -0,0 +1,153 @@
+"""mutable reversi game
+
+``Game`` replaces its immutable ``Board`` on every action, which costs two array
+copies per move. Tree search makes and unmakes millions of moves, so
+``MutableGame`` keeps the disks as bitboards, updates them in place and records
+every move on an undo stack. The zobrist key of the position is updated along
+with the disks.
+"""
+from __future__ import annotations
+
+from typing import FrozenSet, List, Optional, Tuple
+
+from pyreversi import bitboard, zobrist
+from pyreversi.game import Game, IllegalActionError
+from pyreversi.models import Board, Disk, Position
+
+
+class MutableGame:
+    """mutable game with make / unmake
+
+    Moves are given either as ``Position`` (``make_move``) or as a single bit
+    mask (``make_move_mask``), where the mask 0 means pass.
+    ``Board`` is still the public, immutable representation, see ``board``.
+
+    Attributes:
+        key (int): zobrist key of the position including the side to move
+    """
+
+    def __init__(self, board: Board, disk: Disk):
+        self.length = len(board.config)
+        self.current_disk = disk
+        dark, light = bitboard.to_masks(board)
+        # player: 手番の石，opponent: 相手の石
+        self.player, self.opponent = (
+            (dark, light) if disk == Disk.DARK else (light, dark)
+        )
+        self.key = zobrist.hash_masks(dark, light, disk, self.length)
+        self._keys = zobrist.keys(self.length)
+        # undo stack of (move mask, flipped mask, key before the move)
+        self._history: List[Tuple[int, int, int]] = []
+
+    @staticmethod
+    def from_game(game: Game) -> MutableGame:
+        return MutableGame(game.board, game.current_disk)
+
+    def to_game(self) -> Game:
+        return Game(self.board, self.current_disk)
+
+    @property
+    def board(self) -> Board:
+        if self.current_disk == Disk.DARK:
+            return bitboard.to_board(self.player, self.opponent, self.length)
+        return bitboard.to_board(self.opponent, self.player, self.length)
+
+    @property
+    def ply(self) -> int:
+        """number of moves (including passes) on the undo stack"""
+        return len(self._history)
+
+    def count_empty(self) -> int:
+        return self.length * self.length - bitboard.popcount(
+            self.player | self.opponent
+        )
+
+    def count_disk(self, disk: Disk) -> int:
+        if disk == self.current_disk:
+            return bitboard.popcount(self.player)
+        return bitboard.popcount(self.opponent)
+
+    def legal_moves(self) -> int:
+        """legal moves of the side to move
+
+        Returns:
+            int: mask of the legal moves
+        """
+        return bitboard.legal_moves(self.player, self.opponent, self.length)
+
+    def get_legal_actions(self) -> FrozenSet[Position]:
+        return frozenset(
+            Position(*divmod(index, self.length))
+            for index in bitboard.iter_indices(self.legal_moves())
+        )
+
+    def is_game_over(self) -> bool:
+        return not self.legal_moves() and not bitboard.legal_moves(
+            self.opponent, self.player, self.length
+        )
+
+    def make_move(self, action: Optional[Position]) -> None:
+        """execute action in place
+
+        Args:
+            action (Optional[Position]): 石を置く場所，Noneならパス
+
+        Raises:
+            IllegalActionError: 石を置けるのにパスした場合，石を置けない場所を指定した場合
+        """
+        moves = self.legal_moves()
+        if action is None:
+            if moves:
+                raise IllegalActionError("不正な操作です．")
+            self.make_move_mask(0)
+            return
+        if not (0 <= action.row < self.length and 0 <= action.col < self.length):
+            raise IllegalActionError("不正な操作です．")
+        move = 1 << action.row * self.length + action.col
+        if not moves & move:
+            raise IllegalActionError("不正な操作です．")
+        self.make_move_mask(move)
+
+    def make_move_mask(self, move: int) -> int:
+        """execute move in place without legality check
+
+        moveは必ずlegalなものを使うこと
+
+        Args:
+            move (int): single bit mask of the square, 0 means pass
+
+        Returns:
+            int: mask of the flipped disks
+        """
+        flipped = (
+            bitboard.flips(self.player, self.opponent, move, self.length) if move else 0
+        )
+        self._history.append((move, flipped, self.key))
+        key = self.key ^ self._keys.side
+        if move:
+            own = (
+                self._keys.dark if self.current_disk == Disk.DARK else self._keys.light
+            )
+            key ^= own[move.bit_length() - 1]
+            for index in bitboard.iter_indices(flipped):
+                key ^= self._keys.flip[index]
+        self.key = key
+        self.player, self.opponent = (
+            self.opponent ^ flipped,
+            self.player | move | flipped,
+        )
+        self.current_disk = Disk(-self.current_disk)
+        return flipped
+
+    def unmake_move(self) -> None:
+        """undo the last move
+
+        Raises:
+            IndexError: no move to undo
+        """
+        move, flipped, self.key = self._history.pop()
+        self.player, self.opponent = (
+            self.opponent ^ move ^ flipped,
+            self.player | flipped,
+        )
+        self.current_disk = Disk(-self.current_disk)
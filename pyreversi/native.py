@@ -0,0 +1,292 @@
+"""native reversi kernels
+
+compiled move generation over raw int8 configs.
+
+The kernels walk the ray tables of ``pyreversi.logic`` packed into arrays:
+``rays[square, direction]`` holds the flat indices along the ray and
+``lengths[square, direction]`` its length. With numba installed
+(``pip install pyreversi[native]``) they are compiled by ``numba.njit`` on
+first use and cached on disk, otherwise ``COMPILED`` is False and the same
+functions run as Python, which is only useful for testing the kernels.
+
+The module exposes the same functions as ``pyreversi.logic``. It is selected
+with ``pyreversi.logic.set_backend("native")``, or with
+``set_backend("auto")``, which falls back to the pure Python backend when
+numba is missing.
+"""
+from __future__ import annotations
+
+import importlib
+from functools import lru_cache
+from types import ModuleType
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple, TypeVar, cast
+
+import numpy as np
+
+from pyreversi.logic import _rays
+from pyreversi.models import Board, Disk, Position, board_positions
+
+_F = TypeVar("_F")
+
+try:
+    _numba: Optional[ModuleType] = importlib.import_module("numba")
+except ImportError:
+    _numba = None
+
+# True if the kernels are compiled by numba
+COMPILED = _numba is not None
+_DARK = int(Disk.DARK)
+_LIGHT = int(Disk.LIGHT)
+
+
+def _jit(function: _F) -> _F:
+    if _numba is None:
+        return function
+    return cast(_F, _numba.njit(cache=True, nogil=True)(function))
+
+
+@lru_cache(maxsize=None)
+def ray_table(length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ray tables of the board length as arrays
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N * N, 8, N - 1) int64 flat indices
+            padded with -1, and (N * N, 8) int64 lengths of the rays
+    """
+    size = length * length
+    rays = np.full((size, 8, max(length - 1, 1)), -1, dtype=np.int64)
+    lengths = np.zeros((size, 8), dtype=np.int64)
+    for square, square_rays in enumerate(_rays(length)):
+        for direction, ray in enumerate(square_rays):
+            rays[square, direction, : len(ray)] = ray
+            lengths[square, direction] = len(ray)
+    rays.setflags(write=False)
+    lengths.setflags(write=False)
+    return rays, lengths
+
+
+@_jit
+def legal_mask(
+    cells: np.ndarray, disk: int, rays: np.ndarray, lengths: np.ndarray
+) -> np.ndarray:
+    """legal squares of disk
+
+    Args:
+        cells (np.ndarray): (N * N,) int8 flat config
+        disk (int): 置きたい石
+        rays (np.ndarray): rays of ``ray_table``
+        lengths (np.ndarray): lengths of ``ray_table``
+
+    Returns:
+        np.ndarray: (N * N,) bool, True for legal squares
+    """
+    mask = np.zeros(cells.shape[0], dtype=np.bool_)
+    for square in range(cells.shape[0]):
+        if cells[square] != 0:
+            continue
+        for direction in range(lengths.shape[1]):
+            length = lengths[square, direction]
+            if length < 2 or cells[rays[square, direction, 0]] != -disk:
+                continue
+            for distance in range(1, length):
+                cell = cells[rays[square, direction, distance]]
+                if cell != -disk:
+                    if cell == disk:
+                        mask[square] = True
+                    break
+            if mask[square]:
+                break
+    return mask
+
+
+@_jit
+def flip(
+    cells: np.ndarray, disk: int, square: int, rays: np.ndarray, lengths: np.ndarray
+) -> int:
+    """put disk on square and flip the disks in place
+
+    Args:
+        cells (np.ndarray): (N * N,) int8 flat config, updated in place
+        disk (int): 置く石
+        square (int): flat index of the square
+        rays (np.ndarray): rays of ``ray_table``
+        lengths (np.ndarray): lengths of ``ray_table``
+
+    Returns:
+        int: number of flipped disks, 0 and cells unchanged if illegal
+    """
+    if cells[square] != 0:
+        return 0
+    flipped = 0
+    for direction in range(lengths.shape[1]):
+        length = lengths[square, direction]
+        for distance in range(length):
+            cell = cells[rays[square, direction, distance]]
+            if cell == -disk:
+                continue
+            if cell == disk:
+                for index in range(distance):
+                    cells[rays[square, direction, index]] = disk
+                flipped += distance
+            break
+    if flipped:
+        cells[square] = disk
+    return flipped
+
+
+@_jit
+def legal_flips(
+    cells: np.ndarray,
+    disk: int,
+    candidates: np.ndarray,
+    rays: np.ndarray,
+    lengths: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """legal squares among candidates and the disks flipped by them
+
+    Args:
+        cells (np.ndarray): (N * N,) int8 flat config
+        disk (int): 置きたい石
+        candidates (np.ndarray): (K,) int64 flat indices to examine
+        rays (np.ndarray): rays of ``ray_table``
+        lengths (np.ndarray): lengths of ``ray_table``
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (M,) legal squares,
+            (M + 1,) offsets and flipped squares, where the flips of
+            ``squares[i]`` are ``flipped[offsets[i]:offsets[i + 1]]``
+    """
+    squares = np.empty(candidates.shape[0], dtype=np.int64)
+    offsets = np.zeros(candidates.shape[0] + 1, dtype=np.int64)
+    flipped = np.empty(
+        candidates.shape[0] * rays.shape[1] * rays.shape[2], dtype=np.int64
+    )
+    count = 0
+    total = 0
+    for square in candidates:
+        if cells[square] != 0:
+            continue
+        start = total
+        for direction in range(lengths.shape[1]):
+            for distance in range(lengths[square, direction]):
+                cell = cells[rays[square, direction, distance]]
+                if cell == -disk:
+                    continue
+                if cell == disk:
+                    for index in range(distance):
+                        flipped[total] = rays[square, direction, index]
+                        total += 1
+                break
+        if total > start:
+            squares[count] = square
+            count += 1
+            offsets[count] = total
+    return squares[:count], offsets[: count + 1], flipped[:total]
+
+
+def _flat(board: Board) -> np.ndarray:
+    return np.ascontiguousarray(board.config, dtype=np.int8).reshape(-1)
+
+
+def init_board(length: int) -> Board:
+    """initialize board
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        Board: initial board
+    """
+    config = np.zeros((length, length), dtype=np.int8)
+    half = length // 2
+    config[half - 1, half - 1] = config[half, half] = _LIGHT
+    config[half - 1, half] = config[half, half - 1] = _DARK
+    return Board(config)
+
+
+def obtain_legal_actions(board: Board, disk: Disk) -> FrozenSet[Position]:
+    """obtain legal actions
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+
+    Returns:
+        FrozenSet[Position]: legal actions
+    """
+    length = len(board.config)
+    mask = legal_mask(_flat(board), int(disk), *ray_table(length))
+    positions = board_positions(length)
+    return frozenset([positions[index] for index in np.flatnonzero(mask).tolist()])
+
+
+def obtain_legal_flips(
+    board: Board, disk: Disk, positions: Optional[Iterable[Position]] = None
+) -> Dict[Position, Tuple[Position, ...]]:
+    """obtain legal actions among positions and the disks flipped by them
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 置きたい石
+        positions (Optional[Iterable[Position]], optional): 調べる位置．
+            Defaults to None, all squares.
+
+    Returns:
+        Dict[Position, Tuple[Position, ...]]: legal action -> 裏返る石の位置
+    """
+    length = len(board.config)
+    candidates = (
+        np.arange(length * length, dtype=np.int64)
+        if positions is None
+        else np.array(
+            [position.row * length + position.col for position in positions],
+            dtype=np.int64,
+        )
+    )
+    squares, offsets, flipped = legal_flips(
+        _flat(board), int(disk), candidates, *ray_table(length)
+    )
+    cells = board_positions(length)
+    bounds = offsets.tolist()
+    indices = flipped.tolist()
+    return {
+        cells[square]: tuple([cells[index] for index in sorted(indices[start:stop])])
+        for square, start, stop in zip(squares.tolist(), bounds, bounds[1:])
+    }
+
+
+def execute_action(board: Board, disk: Disk, position: Position) -> Board:
+    """execute action and return new state board
+
+    positionは必ずlegalなものを使うこと．この関数ではlegalかのチェックはしない
+
+    Args:
+        board (Board): 盤
+        disk (Disk): 石の色
+        position (Position): 石を置く場所
+    Returns:
+        Board: 石が置かれた新しい状態の盤
+    """
+    length = len(board.config)
+    cells = _flat(board).copy()
+    flipped = flip(
+        cells, int(disk), position.row * length + position.col, *ray_table(length)
+    )
+    assert flipped
+    return Board(cells.reshape(length, length))
+
+
+def count_disk(board: Board, disk: Disk) -> int:
+    """count disk
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): 数えたい石の種類
+
+    Returns:
+        int: 数えたい石の数
+    """
+    return board.cells.count(int(disk))
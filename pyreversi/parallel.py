@@ -0,0 +1,422 @@
+"""parallel search
+
+lazy SMP alpha-beta search over worker processes sharing one transposition
+table.
+
+Every worker runs the usual iterative deepening search of
+``search.AlphaBetaSearch`` on the same root. The workers share nothing but the
+transposition table, which lives in ``multiprocessing.shared_memory``, so the
+results found by one worker cut the trees of the others. Helper workers
+search the root moves in a rotated order and odd helpers one ply deeper, so
+that they fill different parts of the table. The search of the calling
+process is the main one: its result is returned, and the helpers are stopped
+when it finishes.
+
+Entries are updated without locks. A table entry is two 64 bit words and the
+check word is ``key ^ data``, so an entry torn by concurrent writers fails the
+check and reads as a miss.
+
+Usage:
+    python -m pyreversi.parallel --workers 1 2 4 --depth 8
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.synchronize import Event
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from pyreversi.evaluation import PatternEvaluator
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk, Position
+from pyreversi.mutable import MutableGame
+from pyreversi.players import Player
+from pyreversi.search import AlphaBetaSearch, Evaluator, SearchResult, evaluate
+from pyreversi.transposition import TranspositionTable
+
+# 世代を置く共有メモリ上の位置 (エントリの後ろの1語)
+_HEADER_WORDS = 1
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """transposition table in shared memory
+
+    The process which creates the table owns the shared memory and unlinks it
+    on ``close``, other processes attach to it by ``name``. The search
+    generation is stored in the shared memory as well. ``new_search`` does
+    nothing so that the searches of the workers do not advance it, call
+    ``advance`` once per parallel search instead.
+    """
+
+    def __init__(
+        self,
+        entries: int = 1 << 20,
+        policy: str = "depth",
+        name: Optional[str] = None,
+    ):
+        """constructor
+
+        Args:
+            entries (int, optional): number of entries, rounded down to a power
+                of two. Defaults to 1 << 20.
+            policy (str, optional): replacement policy. Defaults to "depth".
+            name (Optional[str], optional): name of the shared memory to attach
+                to. Defaults to None, which creates a new one.
+        """
+        self._name = name
+        self._memory: Optional[shared_memory.SharedMemory] = None
+        self._header: np.ndarray = np.zeros(_HEADER_WORDS, dtype=np.uint64)
+        super().__init__(entries, policy)
+        self.owner = name is None
+
+    def _allocate(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        nbytes = (2 * size + _HEADER_WORDS) * 8
+        if self._name is None:
+            # 新しい共有メモリは0で埋まっている
+            self._memory = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            # 全プロセスが同じresource trackerを使うので，作成者のunlinkで登録も消える
+            self._memory = shared_memory.SharedMemory(name=self._name)
+        words = np.ndarray((2 * size + _HEADER_WORDS,), np.uint64, self._memory.buf)
+        self._header = words[2 * size :]
+        return words[:size], words[size : 2 * size]
+
+    @property
+    def name(self) -> str:
+        assert self._memory is not None
+        return self._memory.name
+
+    @property
+    def _generation(self) -> int:
+        return int(self._header[0])
+
+    @_generation.setter
+    def _generation(self, generation: int) -> None:
+        # 作成時の初期化だけ書き込む．接続時は既存の世代を使う
+        if self._name is None:
+            self._header[0] = generation
+
+    def new_search(self) -> None:
+        """do nothing, see ``advance``"""
+
+    def advance(self) -> None:
+        """mark the start of a new search for every process"""
+        self._header[0] = int(self._header[0]) % 63 + 1
+
+    def close(self) -> None:
+        """detach from the shared memory, and unlink it if owned"""
+        if self._memory is None:
+            return
+        # 共有メモリを参照するviewを先に手放す
+        self._checks = self._data = self._header = np.zeros(0, dtype=np.uint64)
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+        self._memory = None
+
+
+class _LazySearch(AlphaBetaSearch):
+    """search of a helper worker, diversified by the worker number"""
+
+    def __init__(
+        self, evaluator: Evaluator, table: TranspositionTable, worker: int
+    ) -> None:
+        super().__init__(evaluator, table)
+        self.worker = worker
+
+    def _search_root(
+        self, game: MutableGame, moves: List[int], depth: int
+    ) -> Tuple[int, int]:
+        shift = self.worker % len(moves)
+        rotated = moves[shift:] + moves[:shift]
+        return super()._search_root(game, rotated, depth + (self.worker & 1))
+
+
+# worker processの状態
+_worker_table: Optional[SharedTranspositionTable] = None
+_worker_stop: Optional[Event] = None
+_worker_evaluator: Evaluator = evaluate
+
+
+def _init_worker(
+    name: str, entries: int, policy: str, stop: Event, evaluator: Evaluator
+) -> None:
+    global _worker_table, _worker_stop, _worker_evaluator  # pylint: disable=global-statement
+    _worker_table = SharedTranspositionTable(entries, policy, name)
+    _worker_stop = stop
+    _worker_evaluator = evaluator
+
+
+def _helper_search(
+    board: Board,
+    disk: Disk,
+    worker: int,
+    time_limit: Optional[float],
+    max_depth: Optional[int],
+) -> int:
+    """search of a helper worker
+
+    Returns:
+        int: searched nodes
+    """
+    assert _worker_table is not None and _worker_stop is not None
+    search = _LazySearch(_worker_evaluator, _worker_table, worker)
+    search.stop = _worker_stop.is_set
+    return search.search(Game(board, disk), time_limit, max_depth).nodes
+
+
+class ParallelSearch:
+    """lazy SMP search over worker processes"""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        evaluator: Evaluator = evaluate,
+        entries: int = 1 << 20,
+        policy: str = "depth",
+    ):
+        """constructor
+
+        Args:
+            workers (int, optional): searching processes including the calling
+                one. Defaults to 2.
+            evaluator (Evaluator, optional): static evaluation, must be picklable.
+                Defaults to evaluate.
+            entries (int, optional): entries of the shared table.
+                Defaults to 1 << 20.
+            policy (str, optional): replacement policy of the table.
+                Defaults to "depth".
+
+        Raises:
+            ValueError: workers is less than 1
+        """
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        self.workers = workers
+        self.table = SharedTranspositionTable(entries, policy)
+        self._search = AlphaBetaSearch(evaluator, self.table)
+        context = multiprocessing.get_context()
+        self._stop = context.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(
+                workers - 1,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.table.name, entries, policy, self._stop, evaluator),
+            )
+
+    def search(
+        self,
+        game: Game,
+        time_limit: Optional[float] = None,
+        max_depth: Optional[int] = None,
+    ) -> SearchResult:
+        """search the best action with all workers
+
+        Args:
+            game (Game): 探索する局面
+            time_limit (Optional[float]): wall-clock budget in seconds, None
+                means no limit
+            max_depth (Optional[int]): max depth, None means until the end of game
+
+        Returns:
+            SearchResult: result of the main search, nodes are of all workers
+        """
+        start = time.perf_counter()
+        self.table.advance()
+        self._stop.clear()
+        helpers: List[Future[int]] = []
+        if self._executor is not None and len(game.get_legal_actions()) > 1:
+            helpers = [
+                self._executor.submit(
+                    _helper_search,
+                    game.board,
+                    game.current_disk,
+                    worker,
+                    time_limit,
+                    max_depth,
+                )
+                for worker in range(1, self.workers)
+            ]
+        try:
+            result = self._search.search(game, time_limit, max_depth)
+        finally:
+            self._stop.set()
+        nodes = result.nodes + sum(helper.result() for helper in helpers)
+        return result._replace(nodes=nodes, elapsed=time.perf_counter() - start)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._stop.set()
+            self._executor.shutdown()
+            self._executor = None
+        self.table.close()
+
+    def __enter__(self) -> ParallelSearch:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+
+class ParallelPlayer(Player):
+    """alpha-beta player searching with many processes
+
+    Attributes:
+        last_result (Optional[SearchResult]): result of the last play, nodes are
+            of all workers
+    """
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = 1.0,
+        max_depth: Optional[int] = None,
+        workers: int = 0,
+        evaluator: Union[Evaluator, str] = evaluate,
+        entries: int = 1 << 20,
+    ):
+        """constructor
+
+        Args:
+            time_limit (Optional[float], optional): seconds per move. Defaults to 1.0.
+            max_depth (Optional[int], optional): max depth. Defaults to None.
+            workers (int, optional): searching processes, 0 means the number of
+                CPUs. Defaults to 0.
+            evaluator (Union[Evaluator, str], optional): static evaluation, or the
+                path of a weight file of ``evaluation.PatternEvaluator``.
+                Defaults to evaluate.
+            entries (int, optional): entries of the shared table.
+                Defaults to 1 << 20.
+        """
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        if isinstance(evaluator, str):
+            evaluator = PatternEvaluator.load(evaluator)
+        self.search = ParallelSearch(
+            workers or os.cpu_count() or 1, evaluator, entries=entries
+        )
+        self.last_result: Optional[SearchResult] = None
+
+    def play(self, game: Game) -> Optional[Position]:
+        self.last_result = self.search.search(game, self.time_limit, self.max_depth)
+        return self.last_result.action
+
+    def close(self) -> None:
+        self.search.close()
+
+
+class ScalingResult(NamedTuple):
+    """search speed with a number of workers
+
+    Attributes:
+        workers (int): searching processes
+        elapsed (float): seconds to search all positions
+        nodes (int): nodes of all workers
+        speedup (float): elapsed with one worker / elapsed
+    """
+
+    workers: int
+    elapsed: float
+    nodes: int
+    speedup: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def nps_per_worker(self) -> float:
+        return self.nps / self.workers
+
+
+def benchmark_positions(length: int = 8, count: int = 4, seed: int = 0) -> List[Game]:
+    """midgame positions reached by random moves
+
+    Args:
+        length (int, optional): length of board. Defaults to 8.
+        count (int, optional): number of positions. Defaults to 4.
+        seed (int, optional): seed of the moves. Defaults to 0.
+
+    Returns:
+        List[Game]: positions with at least two legal actions
+    """
+    # 呼び出し側のrandomの状態を変えないように専用の乱数を使う
+    rng = random.Random(seed)
+    games: List[Game] = []
+    while len(games) < count:
+        game = Game.init_game(length)
+        for _ in range(length * length // 3):
+            actions = sorted(game.get_legal_actions())
+            game.execute_action(rng.choice(actions) if actions else None)
+        if len(game.get_legal_actions()) > 1:
+            games.append(game)
+    return games
+
+
+def measure_scaling(
+    games: Sequence[Game],
+    worker_counts: Sequence[int],
+    max_depth: int,
+    entries: int = 1 << 20,
+) -> List[ScalingResult]:
+    """time to depth of the positions per number of workers
+
+    Args:
+        games (Sequence[Game]): positions
+        worker_counts (Sequence[int]): numbers of workers, the speedup is
+            relative to the first one
+        max_depth (int): depth of every search
+        entries (int, optional): entries of the table. Defaults to 1 << 20.
+
+    Returns:
+        List[ScalingResult]: result per number of workers
+    """
+    results: List[ScalingResult] = []
+    for workers in worker_counts:
+        with ParallelSearch(workers, entries=entries) as search:
+            elapsed = 0.0
+            nodes = 0
+            for game in games:
+                # 局面ごとに表を空にして独立に測る
+                search.table.clear()
+                result = search.search(game, None, max_depth)
+                elapsed += result.elapsed
+                nodes += result.nodes
+        speedup = results[0].elapsed / elapsed if results else 1.0
+        results.append(ScalingResult(workers, elapsed, nodes, speedup))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.parallel",
+        description="measure speedup and nodes per second of the parallel search",
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts"
+    )
+    parser.add_argument("--depth", type=int, default=7, help="depth of the searches")
+    parser.add_argument("--length", type=int, default=8, help="length of board")
+    parser.add_argument("--positions", type=int, default=4, help="positions to search")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the positions")
+    args = parser.parse_args(argv)
+    games = benchmark_positions(args.length, args.positions, args.seed)
+    print(f"cpus {os.cpu_count()}")
+    for result in measure_scaling(games, args.workers, args.depth):
+        print(
+            f"workers {result.workers:>3} {result.elapsed:.2f}s "
+            f"speedup {result.speedup:.2f} nodes {result.nodes} "
+            f"{result.nps:.0f} nodes/s {result.nps_per_worker:.0f} nodes/s/worker"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""reversi perft
+
+count the leaf positions of the game tree to a fixed depth.
+
+A pass is a ply of its own, and a finished game is a leaf however deep it
+is. The counts from the initial 8x8 board are known (``KNOWN``), and every
+engine must give the same counts for every board length, so perft checks
+both correctness and speed of move generation.
+
+Engines:
+    the backends of ``pyreversi.logic`` (``Board`` in, ``Board`` out), run
+        through the public functions of ``pyreversi.logic``
+    mutable: ``MutableGame`` make / unmake on bitboards, used by the searches
+
+Usage:
+    python -m pyreversi.perft --length 8 --depth 6
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pyreversi import logic
+from pyreversi.models import Board, Disk
+from pyreversi.mutable import MutableGame
+
+# known perft of the initial 8x8 board, KNOWN[8][depth]
+KNOWN: Dict[int, Tuple[int, ...]] = {
+    8: (1, 4, 12, 56, 244, 1396, 8200, 55092, 390216),
+}
+MUTABLE = "mutable"
+
+
+class PerftResult(NamedTuple):
+    """result of perft
+
+    Attributes:
+        engine (str): engine name
+        length (int): length of board
+        depth (int): depth
+        nodes (int): leaf positions
+        elapsed (float): elapsed seconds
+    """
+
+    engine: str
+    length: int
+    depth: int
+    nodes: int
+    elapsed: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def engines() -> Tuple[str, ...]:
+    """names of the engines
+
+    Returns:
+        Tuple[str, ...]: backends of pyreversi.logic and "mutable"
+    """
+    return logic.available_backends() + (MUTABLE,)
+
+
+def perft(board: Board, disk: Disk, depth: int) -> int:
+    """perft with the active backend of pyreversi.logic
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+        depth (int): depth
+
+    Returns:
+        int: leaf positions
+    """
+    if depth == 0:
+        return 1
+    actions = logic.obtain_legal_actions(board, disk)
+    other = Disk(-disk)
+    if not actions:
+        if not logic.obtain_legal_actions(board, other):
+            # 終局
+            return 1
+        return perft(board, other, depth - 1)
+    if depth == 1:
+        return len(actions)
+    return sum(
+        perft(logic.execute_action(board, disk, action), other, depth - 1)
+        for action in actions
+    )
+
+
+def perft_mutable(game: MutableGame, depth: int) -> int:
+    """perft with make / unmake of MutableGame
+
+    Args:
+        game (MutableGame): position, restored on return
+        depth (int): depth
+
+    Returns:
+        int: leaf positions
+    """
+    if depth == 0:
+        return 1
+    moves = game.legal_moves()
+    if not moves:
+        game.make_move_mask(0)
+        try:
+            if not game.legal_moves():
+                # 終局
+                return 1
+            return perft_mutable(game, depth - 1)
+        finally:
+            game.unmake_move()
+    if depth == 1:
+        return bin(moves).count("1")
+    nodes = 0
+    while moves:
+        move = moves & -moves
+        moves ^= move
+        game.make_move_mask(move)
+        nodes += perft_mutable(game, depth - 1)
+        game.unmake_move()
+    return nodes
+
+
+def run(engine: str, length: int, depth: int) -> PerftResult:
+    """perft from the initial board with the engine
+
+    Args:
+        engine (str): one of ``engines()``
+        length (int): length of board
+        depth (int): depth
+
+    Raises:
+        ValueError: unknown engine
+
+    Returns:
+        PerftResult: result
+    """
+    if engine not in engines():
+        raise ValueError(f"unknown engine '{engine}'")
+    with logic.use_backend("python" if engine == MUTABLE else engine):
+        board = logic.init_board(length)
+        start = time.perf_counter()
+        if engine == MUTABLE:
+            nodes = perft_mutable(MutableGame(board, Disk.DARK), depth)
+        else:
+            nodes = perft(board, Disk.DARK, depth)
+        elapsed = time.perf_counter() - start
+    return PerftResult(engine, length, depth, nodes, elapsed)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.perft",
+        description="count leaf positions and compare engines",
+    )
+    parser.add_argument(
+        "--length", type=int, nargs="+", default=[8], help="lengths of board"
+    )
+    parser.add_argument("--depth", type=int, default=5, help="max depth")
+    parser.add_argument(
+        "--engine",
+        nargs="+",
+        default=None,
+        choices=engines(),
+        help="engines to run (default: all)",
+    )
+    args = parser.parse_args(argv)
+    failed = False
+    for length in args.length:
+        for depth in range(1, args.depth + 1):
+            results = [
+                run(engine, length, depth) for engine in args.engine or engines()
+            ]
+            counts = {result.nodes for result in results}
+            known = KNOWN.get(length, ())
+            expected = known[depth] if depth < len(known) else None
+            for result in results:
+                print(
+                    f"{result.engine:>10} {length}x{length} depth {depth} "
+                    f"nodes {result.nodes} {result.elapsed:.3f}s "
+                    f"{result.nps:.0f} nodes/s"
+                )
+            if len(counts) > 1 or (expected is not None and counts != {expected}):
+                failed = True
+                print(
+                    f"mismatch {length}x{length} depth {depth}: "
+                    f"{sorted(counts)} expected {expected}",
+                    file=sys.stderr,
+                )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
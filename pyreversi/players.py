@@ -1,15 +1,23 @@
 """reversi players"""
+import importlib
+import inspect
 import random
-from typing import Dict, List, Optional
+import typing
+from typing import Dict, List, Optional, Protocol, Tuple, Union, cast
 
+from pyreversi import instrumentation
 from pyreversi.game import Game
-from pyreversi.logic import count_disk, execute_action
 from pyreversi.models import Disk, Position
 
 
 class Player:
     disk: Disk
 
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        # instrumentationが有効な間だけplayを計測用に包む
+        super().__init_subclass__(**kwargs)
+        instrumentation.register_player(cls)
+
     def set_disk(self, disk: Disk) -> None:
         self.disk = disk
 
@@ -42,15 +50,12 @@ class GreedyPlayer(Player):
         if not legal_actions:
             return None
         flip_num_action: Dict[int, List[Position]] = dict()
-        current_disk_num = count_disk(game.board, game.current_disk)
         for action in legal_actions:
-            next_disk_num = count_disk(
-                execute_action(game.board, game.current_disk, action), game.current_disk
-            )
-            if flip_num_action.get(next_disk_num - current_disk_num) is None:
-                flip_num_action[next_disk_num - current_disk_num] = [action]
+            flip_num = len(game.get_flips(action))
+            if flip_num_action.get(flip_num) is None:
+                flip_num_action[flip_num] = [action]
             else:
-                flip_num_action[next_disk_num - current_disk_num].append(action)
+                flip_num_action[flip_num].append(action)
         return random.choice(flip_num_action[max(flip_num_action.keys())])
 
 
@@ -77,3 +82,134 @@ class HumanPlayer(Player):
                     print("Invalid integer")
             print("Invalid action")
         return action
+
+
+# player name -> "module:class" of the player, imported when the player is made
+_PLAYERS: Dict[str, str] = {
+    "random": "pyreversi.players:RandomPlayer",
+    "greedy": "pyreversi.players:GreedyPlayer",
+    "alphabeta": "pyreversi.search:AlphaBetaPlayer",
+    "endgame": "pyreversi.endgame:EndgamePlayer",
+    "book": "pyreversi.book:BookPlayer",
+    "mcts": "pyreversi.mcts:MCTSPlayer",
+    "parallel": "pyreversi.parallel:ParallelPlayer",
+}
+
+
+def available_players() -> Tuple[str, ...]:
+    """names of the players which can be made by make_player
+
+    Returns:
+        Tuple[str, ...]: player names
+    """
+    return tuple(_PLAYERS)
+
+
+Value = Union[bool, int, float, str, None]
+
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, Value]]:
+    """split a player spec into the player name and the constructor arguments
+
+    spec is ``name`` or ``name:key=value,key=value``, where keys are the arguments
+    of the constructor, e.g. ``alphabeta:time_limit=0.1,max_depth=4``.
+    Values are parsed as None ("none"), bool ("true", "false"), int or float if
+    possible, otherwise str.
+
+    Args:
+        spec (str): player spec
+
+    Raises:
+        ValueError: unknown player name or malformed arguments
+
+    Returns:
+        Tuple[str, Dict[str, Value]]: player name and keyword arguments
+    """
+    name, _, arguments = spec.partition(":")
+    if name not in _PLAYERS:
+        raise ValueError(f"unknown player '{name}'")
+    kwargs: Dict[str, Value] = {}
+    for argument in filter(None, arguments.split(",")):
+        key, separator, value = argument.partition("=")
+        if not separator:
+            raise ValueError(f"malformed argument '{argument}' in '{spec}'")
+        kwargs[key.strip()] = _parse_value(value.strip())
+    return name, kwargs
+
+
+def check_spec(spec: str) -> None:
+    """check a player spec without making the player
+
+    The arguments must be accepted by the constructor and match the types of
+    its annotations, so that ``make_player`` does not fail on them. Players
+    holding processes or shared memory are not started.
+
+    Args:
+        spec (str): player spec
+
+    Raises:
+        ValueError: unknown player name, or arguments the player does not take
+    """
+    name, kwargs = parse_spec(spec)
+    player_class = _player_class(name)
+    try:
+        inspect.signature(player_class).bind(**kwargs)
+    except TypeError as error:
+        raise ValueError(f"invalid arguments in '{spec}': {error}") from error
+    hints = typing.get_type_hints(getattr(player_class, "__init__"))
+    for key, value in kwargs.items():
+        if key in hints and not _is_instance(value, hints[key]):
+            raise ValueError(f"invalid value {value!r} of '{key}' in '{spec}'")
+
+
+def make_player(spec: str) -> Player:
+    """make a player from spec
+
+    see ``parse_spec`` for the format of spec
+
+    Args:
+        spec (str): player spec
+
+    Raises:
+        ValueError: unknown player name or malformed arguments
+
+    Returns:
+        Player: new player
+    """
+    name, kwargs = parse_spec(spec)
+    player_class = cast(_PlayerClass, _player_class(name))
+    return player_class(**kwargs)
+
+
+class _PlayerClass(Protocol):
+    def __call__(self, **kwargs: Value) -> Player: ...
+
+
+def _player_class(name: str) -> type:
+    module_name, class_name = _PLAYERS[name].split(":")
+    return cast(type, getattr(importlib.import_module(module_name), class_name))
+
+
+def _is_instance(value: Value, hint: object) -> bool:
+    # specの値が取りうる型だけを見る．それ以外 (Callableなど) は値の型で判定する
+    if typing.get_origin(hint) is Union:
+        return any(_is_instance(value, arg) for arg in typing.get_args(hint))
+    if hint is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if hint is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    cls = typing.get_origin(hint) or hint
+    return isinstance(cls, type) and isinstance(value, cls)
+
+
+def _parse_value(value: str) -> Value:
+    if value.lower() == "none":
+        return None
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return value
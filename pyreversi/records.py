@@ -0,0 +1,344 @@
+"""game record store
+
+append-only file of finished games.
+
+Each game is a fixed header ``<BBHh`` (magic, board length, number of moves,
+final dark minus light disks) followed by the moves, one byte per move holding
+the square index ``row * length + col``. Passes are not stored because a side
+passes exactly when it has no legal move, so replay restores them.
+
+``RecordWriter`` appends a game with a single ``write`` under an exclusive
+``flock``, so many processes can append to the same file. ``RecordReader``
+memory-maps the file and yields games or replayed positions lazily, and an
+offset index gives random access by game index.
+"""
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pyreversi import bitboard
+from pyreversi.models import Board, Disk, Position
+from pyreversi.mutable import MutableGame
+
+_MAGIC = 0xA5
+_HEADER = struct.Struct("<BBHh")
+_INDEX_SUFFIX = ".idx"
+
+
+class GameRecord(NamedTuple):
+    """recorded game
+
+    Attributes:
+        length (int): length of board
+        moves (bytes): square indices of the moves, passes are not included
+        score (int): dark disks minus light disks at the end
+    """
+
+    length: int
+    moves: bytes
+    score: int
+
+    def actions(self) -> List[Position]:
+        return [Position(*divmod(move, self.length)) for move in self.moves]
+
+
+def encode_record(
+    length: int, actions: Sequence[Optional[Position]], score: int
+) -> bytes:
+    """encode a game
+
+    Args:
+        length (int): length of board, at most 16
+        actions (Sequence[Optional[Position]]): played actions, None (pass) is skipped
+        score (int): dark disks minus light disks at the end
+
+    Raises:
+        ValueError: board is too large to store a move in one byte
+
+    Returns:
+        bytes: record
+    """
+    if length > 16:
+        raise ValueError("length must be at most 16")
+    moves = bytes(
+        action.row * length + action.col for action in actions if action is not None
+    )
+    return _HEADER.pack(_MAGIC, length, len(moves), score) + moves
+
+
+def replay(record: GameRecord) -> Iterator[Tuple[MutableGame, Optional[int]]]:
+    """replay a game
+
+    yields the position before every action and the action. The yielded game is
+    updated in place after the next step, so copy it if needed.
+
+    Args:
+        record (GameRecord): game
+
+    Yields:
+        Iterator[Tuple[MutableGame, Optional[int]]]: position and square index of
+            the action, None means pass
+    """
+    length = record.length
+    game = MutableGame(
+        bitboard.to_board(*bitboard.initial_masks(length), length), Disk.DARK
+    )
+    for move in record.moves:
+        if not game.legal_moves() & 1 << move:
+            yield game, None
+            game.make_move_mask(0)
+        yield game, move
+        game.make_move_mask(1 << move)
+
+
+def replay_arrays(record: GameRecord) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """replay a game into arrays
+
+    Args:
+        record (GameRecord): game
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (P, N, N) int8 configurations
+            before the moves, (P,) int8 sides to move and (P,) square indices of
+            the moves. Passes are skipped.
+    """
+    length = record.length
+    size = length * length
+    nbytes = (size + 7) // 8
+    dark_masks = bytearray()
+    light_masks = bytearray()
+    disks = []
+    for game, move in replay(record):
+        if move is None:
+            continue
+        dark, light = game.player, game.opponent
+        if game.current_disk == Disk.LIGHT:
+            dark, light = light, dark
+        dark_masks += dark.to_bytes(nbytes, "little")
+        light_masks += light.to_bytes(nbytes, "little")
+        disks.append(game.current_disk)
+    count = len(disks)
+
+    def unpack(masks: bytearray) -> np.ndarray:
+        buffer = np.frombuffer(bytes(masks), dtype=np.uint8).reshape(count, nbytes)
+        return np.unpackbits(buffer, axis=1, count=size, bitorder="little").view(
+            np.int8
+        )
+
+    configs = (unpack(dark_masks) - unpack(light_masks)).reshape(count, length, length)
+    return (
+        configs,
+        np.array(disks, dtype=np.int8),
+        np.frombuffer(record.moves, dtype=np.uint8).astype(np.int64),
+    )
+
+
+class RecordWriter:
+    """append games to a record file
+
+    safe to use from many processes at the same time
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def write(
+        self, length: int, actions: Sequence[Optional[Position]], score: int
+    ) -> None:
+        """append a game
+
+        Args:
+            length (int): length of board
+            actions (Sequence[Optional[Position]]): played actions including passes
+            score (int): dark disks minus light disks at the end
+        """
+        self.write_bytes(encode_record(length, actions, score))
+
+    def write_bytes(self, data: bytes) -> None:
+        """append encoded games
+
+        Args:
+            data (bytes): records
+        """
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # os.writeは一部しか書かないことがあるので，全て書くまで繰り返す
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._fd, view) :]
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class RecordReader:
+    """read a record file lazily through mmap
+
+    The file is mapped when the reader is opened, so games appended later are
+    not visible until the reader is reopened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")  # pylint: disable=consider-using-with
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._map: Optional[mmap.mmap] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._size
+            else None
+        )
+        self._offsets: Optional[np.ndarray] = None
+
+    def __enter__(self) -> RecordReader:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        offset = 0
+        while True:
+            read = self._read(offset)
+            if read is None:
+                return
+            record, offset = read
+            yield record
+
+    def __len__(self) -> int:
+        return len(self.offsets())
+
+    def __getitem__(self, index: int) -> GameRecord:
+        read = self._read(int(self.offsets()[index]))
+        assert read is not None
+        return read[0]
+
+    def positions(self) -> Iterator[Tuple[Board, Disk, GameRecord]]:
+        """replay every game
+
+        Yields:
+            Iterator[Tuple[Board, Disk, GameRecord]]: position before every action
+                including passes, side to move and the game
+        """
+        for record in self:
+            for game, _ in replay(record):
+                yield game.board, game.current_disk, record
+
+    def offsets(self) -> np.ndarray:
+        """offsets of the games
+
+        The index is cached in ``path + ".idx"`` and extended when the file grows.
+        A stale or broken index is rebuilt, and the index is not saved when the
+        directory is not writable.
+
+        Returns:
+            np.ndarray: uint64 offset of every game
+        """
+        if self._offsets is not None:
+            return self._offsets
+        index_path = self.path + _INDEX_SUFFIX
+        offsets: List[int] = []
+        end = 0
+        try:
+            # 末尾の要素は索引を作った時点のファイルの終端
+            stored = np.fromfile(index_path, dtype=np.uint64)
+        except (OSError, ValueError):
+            stored = np.zeros(0, dtype=np.uint64)
+        valid = self._is_valid_index(stored)
+        if valid:
+            offsets = stored[:-1].tolist()
+            end = int(stored[-1])
+        while True:
+            read = self._read(end)
+            if read is None:
+                break
+            offsets.append(end)
+            end = read[1]
+        self._offsets = np.array(offsets, dtype=np.uint64)
+        if not valid or len(stored) != len(offsets) + 1:
+            self._save_index(index_path, offsets + [end])
+        return self._offsets
+
+    def _is_valid_index(self, stored: np.ndarray) -> bool:
+        """whether a stored index matches the file
+
+        Args:
+            stored (np.ndarray): offsets and the end of the indexed part
+
+        Returns:
+            bool: True if the offsets start at 0, increase, and the last game
+                ends at the stored end
+        """
+        if len(stored) == 0 or int(stored[-1]) > self._size:
+            return False
+        if len(stored) == 1:
+            return int(stored[0]) == 0
+        if int(stored[0]) != 0 or not (np.diff(stored.astype(np.int64)) > 0).all():
+            return False
+        try:
+            read = self._read(int(stored[-2]))
+        except ValueError:
+            return False
+        return read is not None and read[1] == int(stored[-1])
+
+    @staticmethod
+    def _save_index(index_path: str, values: List[int]) -> None:
+        # 読み手が並行しても壊れた索引が見えないように，一時ファイルから置き換える
+        temporary = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            np.array(values, dtype=np.uint64).tofile(temporary)
+            os.replace(temporary, index_path)
+        except OSError:
+            # 書き込めないディレクトリでは索引を保存しない
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+    def _read(self, offset: int) -> Optional[Tuple[GameRecord, int]]:
+        """read the game at offset
+
+        Args:
+            offset (int): offset of the game
+
+        Raises:
+            ValueError: the bytes at offset are not a game
+
+        Returns:
+            Optional[Tuple[GameRecord, int]]: the game and the offset of the next
+                one, None at the end of the file or at a torn trailing game
+        """
+        start = offset + _HEADER.size
+        if self._map is None or start > self._size:
+            return None
+        magic, length, count, score = _HEADER.unpack_from(self._map, offset)
+        if magic != _MAGIC:
+            raise ValueError(f"broken record at offset {offset}")
+        if start + count > self._size:
+            return None
+        return (
+            GameRecord(length, self._map[start : start + count], score),
+            start + count,
+        )
@@ -0,0 +1,365 @@
+"""reversi search
+
+negamax search with alpha-beta pruning over ``MutableGame``.
+"""
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+from pyreversi import bitboard
+from pyreversi.evaluation import PatternEvaluator
+from pyreversi.game import Game
+from pyreversi.models import Position
+from pyreversi.mutable import MutableGame
+from pyreversi.players import Player
+from pyreversi.transposition import Bound, TranspositionTable
+
+# (player mask, opponent mask, length) -> score from the side to move
+Evaluator = Callable[[int, int, int], int]
+
+# 終局時の評価値の基準．評価関数の値はこれより十分小さいこと
+WIN_SCORE = 1 << 20
+# 時間切れを調べる間隔 (ノード数 - 1)
+_CHECK_INTERVAL = 1023
+
+
+class SearchResult(NamedTuple):
+    """result of a search
+
+    Attributes:
+        action (Optional[Position]): best action, None means pass
+        score (int): score of the action from the side to move
+        depth (int): depth of the last completed iteration
+        nodes (int): searched nodes
+        elapsed (float): elapsed seconds
+    """
+
+    action: Optional[Position]
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float
+
+    @property
+    def nps(self) -> float:
+        """nodes per second"""
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class _Masks(NamedTuple):
+    corner: int
+    x_square: int
+    c_square: int
+    edge: int
+
+
+@lru_cache(maxsize=None)
+def _masks(length: int) -> _Masks:
+    last = length - 1
+    corner = x_square = c_square = edge = 0
+    for row in range(length):
+        for col in range(length):
+            bit = 1 << row * length + col
+            near_row = min(row, last - row)
+            near_col = min(col, last - col)
+            if near_row == 0 and near_col == 0:
+                corner |= bit
+            elif near_row == 1 and near_col == 1:
+                x_square |= bit
+            elif min(near_row, near_col) == 0 and max(near_row, near_col) == 1:
+                c_square |= bit
+            elif min(near_row, near_col) == 0:
+                edge |= bit
+    return _Masks(corner, x_square, c_square, edge)
+
+
+def evaluate(player: int, opponent: int, length: int) -> int:
+    """default static evaluation
+
+    corners, squares next to corners, edges and mobility
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+        length (int): length of board
+
+    Returns:
+        int: score from the side to move
+    """
+    masks = _masks(length)
+    popcount = bitboard.popcount
+    return (
+        30 * (popcount(player & masks.corner) - popcount(opponent & masks.corner))
+        - 12 * (popcount(player & masks.x_square) - popcount(opponent & masks.x_square))
+        - 4 * (popcount(player & masks.c_square) - popcount(opponent & masks.c_square))
+        + 2 * (popcount(player & masks.edge) - popcount(opponent & masks.edge))
+        + 3
+        * (
+            popcount(bitboard.legal_moves(player, opponent, length))
+            - popcount(bitboard.legal_moves(opponent, player, length))
+        )
+    )
+
+
+def final_score(player: int, opponent: int) -> int:
+    """score of the finished game
+
+    Args:
+        player (int): mask of the side to move
+        opponent (int): mask of the other side
+
+    Returns:
+        int: WIN_SCORE plus disk difference if won, minus if lost
+    """
+    difference = bitboard.popcount(player) - bitboard.popcount(opponent)
+    if difference > 0:
+        return WIN_SCORE + difference
+    if difference < 0:
+        return -WIN_SCORE + difference
+    return 0
+
+
+class _Timeout(Exception):
+    pass
+
+
+class AlphaBetaSearch:
+    """iterative deepening negamax search with alpha-beta pruning
+
+    Moves are ordered by the best move of the previous iteration or of the
+    transposition table first, then by the opponent mobility after the move in
+    deep nodes and by the static square class in shallow nodes.
+    """
+
+    def __init__(
+        self,
+        evaluator: Evaluator = evaluate,
+        table: Optional[TranspositionTable] = None,
+    ):
+        """constructor
+
+        Args:
+            evaluator (Evaluator, optional): static evaluation. Defaults to evaluate.
+            table (Optional[TranspositionTable], optional): transposition table
+                shared by the searches. Defaults to None, which means no table.
+        """
+        self.evaluator = evaluator
+        self.table = table
+        # 時間切れと同じ間隔で呼ばれ，Trueなら探索を打ち切る
+        self.stop: Optional[Callable[[], bool]] = None
+        self._nodes = 0
+        self._deadline = 0.0
+
+    def search(
+        self,
+        game: Game,
+        time_limit: Optional[float] = None,
+        max_depth: Optional[int] = None,
+    ) -> SearchResult:
+        """search the best action
+
+        Args:
+            game (Game): 探索する局面
+            time_limit (Optional[float]): wall-clock budget in seconds, None means
+                no limit
+            max_depth (Optional[int]): max depth, None means until the end of game
+
+        Returns:
+            SearchResult: result of the last completed iteration
+        """
+        start = time.perf_counter()
+        self._nodes = 0
+        self._deadline = float("inf") if time_limit is None else start + time_limit
+        if self.table is not None:
+            self.table.new_search()
+        mutable = MutableGame.from_game(game)
+        moves = self._ordered_moves(mutable, mutable.legal_moves(), 0)
+        if len(moves) <= 1:
+            # パスか一手しかないなら探索しない
+            action = _to_action(moves[0], mutable.length) if moves else None
+            return SearchResult(action, 0, 0, 0, time.perf_counter() - start)
+        limit = mutable.count_empty()
+        if max_depth is not None:
+            limit = min(limit, max_depth)
+        best: Tuple[int, int, int] = (moves[0], 0, 0)
+        for depth in range(1, limit + 1):
+            try:
+                move, score = self._search_root(mutable, moves, depth)
+            except _Timeout:
+                break
+            best = (move, score, depth)
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= WIN_SCORE:
+                break
+        move, score, depth = best
+        return SearchResult(
+            _to_action(move, mutable.length),
+            score,
+            depth,
+            self._nodes,
+            time.perf_counter() - start,
+        )
+
+    def _search_root(
+        self, game: MutableGame, moves: List[int], depth: int
+    ) -> Tuple[int, int]:
+        alpha = -WIN_SCORE * 2
+        best_move = moves[0]
+        for move in moves:
+            game.make_move_mask(move)
+            score = -self._negamax(game, depth - 1, -WIN_SCORE * 2, -alpha)
+            game.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        if self.table is not None:
+            self.table.store(
+                game.key, alpha, depth, Bound.EXACT, best_move.bit_length() - 1
+            )
+        return best_move, alpha
+
+    def _negamax(self, game: MutableGame, depth: int, alpha: int, beta: int) -> int:
+        self._nodes += 1
+        if not self._nodes & _CHECK_INTERVAL and (
+            time.perf_counter() > self._deadline
+            or (self.stop is not None and self.stop())
+        ):
+            # 探索中の局面は捨てるので，unmakeせずに抜ける
+            raise _Timeout()
+        moves = game.legal_moves()
+        if not moves:
+            if not bitboard.legal_moves(game.opponent, game.player, game.length):
+                return final_score(game.player, game.opponent)
+            game.make_move_mask(0)
+            score = -self._negamax(game, depth, -beta, -alpha)
+            game.unmake_move()
+            return score
+        if depth <= 0:
+            return self.evaluator(game.player, game.opponent, game.length)
+        table = self.table
+        original_alpha = alpha
+        if table is not None:
+            entry = table.probe(game.key)
+            if entry is not None and entry.depth >= depth:
+                if entry.bound == Bound.EXACT:
+                    return entry.score
+                if entry.bound == Bound.LOWER:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score
+        best = -WIN_SCORE * 2
+        best_move = 0
+        for move in self._ordered_moves(game, moves, depth):
+            game.make_move_mask(move)
+            score = -self._negamax(game, depth - 1, -beta, -alpha)
+            game.unmake_move()
+            if score > best:
+                best = score
+                best_move = move
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+        if table is not None:
+            if best <= original_alpha:
+                bound = Bound.UPPER
+            elif best >= beta:
+                bound = Bound.LOWER
+            else:
+                bound = Bound.EXACT
+            table.store(game.key, best, depth, bound, best_move.bit_length() - 1)
+        return best
+
+    def _ordered_moves(self, game: MutableGame, moves: int, depth: int) -> List[int]:
+        move_list = _ordered_moves(game, moves, depth)
+        if self.table is not None:
+            entry = self.table.probe(game.key)
+            if entry is not None and entry.move is not None and entry.move >= 0:
+                move = 1 << entry.move
+                if moves & move:
+                    move_list.remove(move)
+                    move_list.insert(0, move)
+        return move_list
+
+
+def _ordered_moves(game: MutableGame, moves: int, depth: int) -> List[int]:
+    """order moves
+
+    Args:
+        game (MutableGame): 局面
+        moves (int): mask of the legal moves
+        depth (int): remaining depth
+
+    Returns:
+        List[int]: single bit masks of the moves, promising first
+    """
+    move_list = [1 << index for index in bitboard.iter_indices(moves)]
+    if depth >= 3:
+        # 相手の着手可能数が少ない手から調べる
+        mobility = []
+        for move in move_list:
+            game.make_move_mask(move)
+            mobility.append(bitboard.popcount(game.legal_moves()))
+            game.unmake_move()
+        return [move for _, move in sorted(zip(mobility, move_list))]
+    masks = _masks(game.length)
+    return sorted(
+        move_list,
+        key=lambda move: (
+            not move & masks.corner,
+            bool(move & masks.x_square),
+            bool(move & masks.c_square),
+        ),
+    )
+
+
+def _to_action(move: int, length: int) -> Position:
+    return Position(*divmod(move.bit_length() - 1, length))
+
+
+class AlphaBetaPlayer(Player):
+    """alpha-beta player
+
+    iterative deepening alpha-beta search within the time budget per move
+
+    Attributes:
+        last_result (Optional[SearchResult]): result of the last play, which
+            reports nodes searched and nodes per second
+    """
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = 1.0,
+        max_depth: Optional[int] = None,
+        evaluator: Union[Evaluator, str] = evaluate,
+        table: Optional[TranspositionTable] = None,
+    ):
+        """constructor
+
+        Args:
+            time_limit (Optional[float], optional): seconds per move. Defaults to 1.0.
+            max_depth (Optional[int], optional): max depth. Defaults to None.
+            evaluator (Union[Evaluator, str], optional): static evaluation, or the
+                path of a weight file of ``evaluation.PatternEvaluator``.
+                Defaults to evaluate.
+            table (Optional[TranspositionTable], optional): transposition table
+                reused across the moves. Defaults to None, which means a new
+                table of the default size.
+        """
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        if isinstance(evaluator, str):
+            evaluator = PatternEvaluator.load(evaluator)
+        self.search = AlphaBetaSearch(
+            evaluator, TranspositionTable() if table is None else table
+        )
+        self.last_result: Optional[SearchResult] = None
+
+    def play(self, game: Game) -> Optional[Position]:
+        self.last_result = self.search.search(game, self.time_limit, self.max_depth)
+        return self.last_result.action
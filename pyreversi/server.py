@@ -0,0 +1,618 @@
+"""reversi game server
+
+asyncio TCP server hosting many games at once over line-delimited JSON.
+
+Every request and response is one JSON object per line. Requests carry a
+``type`` and an optional ``id``, which is echoed in the response so that a
+client can pipeline requests. Request types:
+
+    new: {"type": "new", "length": 8, "player": "alphabeta:time_limit=0.1",
+        "color": "dark", "move_timeout": 5.0} starts a game against the AI
+        player spec (see ``players.make_player``), the client plays color
+    move: {"type": "move", "session": "...", "action": [2, 3]} plays the
+        client's action, null means pass, and lets the AI reply
+    state: {"type": "state", "session": "..."} returns the current state
+    close: {"type": "close", "session": "..."} ends the game
+    stats: {"type": "stats"} returns latency percentiles per request type
+
+Responses to new, move and state are states: board, side to move, legal
+actions, disk counts, whether the game is over and the AI actions played
+since the last request. Failures are {"type": "error", "error": "..."}. A
+session whose AI player fails is closed.
+
+AI moves run in a process pool so the event loop never blocks. An AI move
+which takes longer than the move timeout of the session is replaced by a
+random legal action. Backpressure: a connection stops being read while it has
+``max_inflight`` requests in progress, at most ``max_pending`` AI moves are in
+the pool, including timed out ones which are still running, responses are
+written with ``drain``, and sessions are limited to ``max_sessions`` and
+expire after ``idle_timeout`` seconds.
+
+Usage:
+    python -m pyreversi.server --port 8765 --workers 4
+
+With ``--metrics-port`` the process enables ``pyreversi.instrumentation`` and
+serves Prometheus metrics on that port. Game and player metrics are recorded
+where the AI moves run, so they are exported with ``--workers 0`` only.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from pyreversi import instrumentation
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk, Position
+from pyreversi.players import Player, check_spec, make_player
+
+# レイテンシの百分位数を求めるために残す，種類ごとの直近のリクエスト数
+_LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+Message = Dict[str, object]
+
+# worker process内で使い回すplayer，使われていない順に並ぶ
+_players: Dict[str, Player] = {}
+# worker processが持つplayerの数の上限，超えたら最も古いものを閉じる
+_MAX_PLAYERS = 8
+
+
+class RequestError(Exception):
+    """invalid request, reported to the client as an error response"""
+
+
+def _ai_move(spec: str, config: bytes, length: int, disk: int) -> Optional[Position]:
+    """play the AI move in a worker process
+
+    Args:
+        spec (str): player spec
+        config (bytes): int8 configuration of the board
+        length (int): length of board
+        disk (int): side to move
+
+    Returns:
+        Optional[Position]: action, None means pass
+    """
+    player = _cached_player(spec)
+    board = Board(np.frombuffer(config, dtype=np.int8).reshape(length, length).copy())
+    player.set_disk(Disk(disk))
+    return player.play(Game(board, Disk(disk)))
+
+
+def _cached_player(spec: str) -> Player:
+    player = _players.pop(spec, None)
+    if player is None:
+        player = make_player(spec)
+        while len(_players) >= _MAX_PLAYERS:
+            evicted = _players.pop(next(iter(_players)))
+            # 並列探索やMCTSのplayerはprocessや共有メモリを持つ
+            close = getattr(evicted, "close", None)
+            if close is not None:
+                close()
+    _players[spec] = player
+    return player
+
+
+class LatencyTracker:
+    """latencies of the recent requests per request type"""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, kind: str, seconds: float) -> None:
+        latencies = self._latencies.get(kind)
+        if latencies is None:
+            latencies = self._latencies[kind] = deque(maxlen=self._window)
+        latencies.append(seconds)
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        if instrumentation.enabled:
+            instrumentation.observe("server_request_seconds", seconds, type=kind)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """latency percentiles in milliseconds
+
+        Returns:
+            Dict[str, Dict[str, float]]: request type -> {"count", "p50", "p90",
+                "p99"}, percentiles are over the recent requests
+        """
+        report = {}
+        for kind, latencies in self._latencies.items():
+            values = np.array(latencies) * 1000
+            report[kind] = {"count": float(self._counts[kind])}
+            for percentile in PERCENTILES:
+                report[kind][f"p{percentile}"] = float(
+                    np.percentile(values, percentile)
+                )
+        return report
+
+
+class Session:
+    """game against an AI player
+
+    Attributes:
+        game (Game): the game
+        player (str): spec of the AI player
+        ai_disk (Disk): disk of the AI
+        move_timeout (float): seconds allowed for an AI move
+    """
+
+    def __init__(self, game: Game, player: str, ai_disk: Disk, move_timeout: float):
+        self.game = game
+        self.player = player
+        self.ai_disk = ai_disk
+        self.move_timeout = move_timeout
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+
+def _state(session_id: str, session: Session, ai_actions: List[Message]) -> Message:
+    game = session.game
+    return {
+        "type": "state",
+        "session": session_id,
+        "board": game.board.config.tolist(),
+        "turn": "dark" if game.current_disk == Disk.DARK else "light",
+        "legal": sorted([list(action) for action in game.get_legal_actions()]),
+        "score": {
+            "dark": game.count_disk(Disk.DARK),
+            "light": game.count_disk(Disk.LIGHT),
+        },
+        "game_over": game.is_game_over(),
+        "ai_actions": ai_actions,
+    }
+
+
+def _parse_action(value: object) -> Optional[Position]:
+    if value is None:
+        return None
+    if (
+        not isinstance(value, list)
+        or len(value) != 2
+        or not all(isinstance(i, int) for i in value)
+    ):
+        raise RequestError("action must be [row, col] or null")
+    return Position(*value)
+
+
+class GameServer:
+    """line-delimited JSON game server"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        workers: Optional[int] = None,
+        max_sessions: int = 10000,
+        move_timeout: float = 10.0,
+        idle_timeout: float = 600.0,
+        max_inflight: int = 16,
+        max_pending: Optional[int] = None,
+    ):
+        """constructor
+
+        Args:
+            host (str, optional): address to bind. Defaults to "127.0.0.1".
+            port (int, optional): port, 0 picks a free one. Defaults to 8765.
+            workers (Optional[int], optional): worker processes of AI moves,
+                0 runs them in a thread of this process. Defaults to None, the
+                number of CPUs.
+            max_sessions (int, optional): max concurrent sessions.
+                Defaults to 10000.
+            move_timeout (float, optional): default seconds allowed for an AI
+                move. Defaults to 10.0.
+            idle_timeout (float, optional): seconds until an untouched session
+                is removed. Defaults to 600.0.
+            max_inflight (int, optional): requests in progress per connection.
+                Defaults to 16.
+            max_pending (Optional[int], optional): AI moves submitted to the
+                pool at once. Defaults to None, 4 per worker.
+        """
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.move_timeout = move_timeout
+        self.idle_timeout = idle_timeout
+        self.max_inflight = max_inflight
+        self.sessions: Dict[str, Session] = {}
+        self.latency = LatencyTracker()
+        self._executor: Executor = (
+            ThreadPoolExecutor(1) if workers == 0 else ProcessPoolExecutor(workers)
+        )
+        pool_size = getattr(self._executor, "_max_workers", 1)
+        self.max_pending = max_pending or 4 * pool_size
+        # semaphoreはevent loopの中で作る (Python 3.9まではloopに結びつくため)
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._jobs: Set[Future[Optional[Position]]] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        """start listening, the bound port is set to ``port``"""
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._reaper = asyncio.create_task(self._reap())
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for job in list(self._jobs):
+            job.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def _reap(self) -> None:
+        """remove idle sessions"""
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60.0))
+            deadline = time.monotonic() - self.idle_timeout
+            for session_id, session in list(self.sessions.items()):
+                if session.last_active < deadline and not session.lock.locked():
+                    del self.sessions[session_id]
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        inflight = asyncio.Semaphore(self.max_inflight)
+        write_lock = asyncio.Lock()
+        tasks: Set[asyncio.Task[None]] = set()
+        try:
+            while True:
+                # 処理中のリクエストが上限に達したら読むのを止める
+                await inflight.acquire()
+                line = await reader.readline()
+                if not line:
+                    inflight.release()
+                    break
+                task = asyncio.create_task(
+                    self._respond(line, writer, write_lock, inflight)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(
+        self,
+        line: bytes,
+        writer: asyncio.StreamWriter,
+        write_lock: asyncio.Lock,
+        inflight: asyncio.Semaphore,
+    ) -> None:
+        start = time.perf_counter()
+        kind = "invalid"
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get("id")
+            kind = str(request.get("type"))
+            response = await self.handle(request)
+        except asyncio.CancelledError:
+            raise
+        except (RequestError, ValueError) as error:
+            response = {"type": "error", "error": str(error)}
+        except Exception as error:  # pylint: disable=broad-except
+            # 想定外の失敗でも接続は保ち，エラーを返す
+            response = {"type": "error", "error": f"internal error: {error!r}"}
+        finally:
+            inflight.release()
+        if request_id is not None:
+            response["id"] = request_id
+        self.latency.record(kind, time.perf_counter() - start)
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def handle(self, request: Message) -> Message:
+        """handle a request
+
+        Args:
+            request (Message): request object
+
+        Raises:
+            RequestError: invalid request
+
+        Returns:
+            Message: response object
+        """
+        kind = request.get("type")
+        if kind == "new":
+            return await self._new(request)
+        if kind == "stats":
+            return {
+                "type": "stats",
+                "sessions": len(self.sessions),
+                "latency_ms": self.latency.report(),
+            }
+        session_id = str(request.get("session"))
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(f"unknown session {session_id}")
+        session.last_active = time.monotonic()
+        if kind == "state":
+            return _state(session_id, session, [])
+        if kind == "close":
+            del self.sessions[session_id]
+            return {"type": "closed", "session": session_id}
+        if kind == "move":
+            action = _parse_action(request.get("action"))
+            async with session.lock:
+                if session.game.is_game_over():
+                    raise RequestError("game is over")
+                if session.game.current_disk == session.ai_disk:
+                    raise RequestError("not your turn")
+                if not session.game.is_legal_action(action):
+                    raise RequestError(f"illegal action {request.get('action')}")
+                session.game.execute_action(action)
+                ai_actions = await self._play_ai_or_close(session_id, session)
+            return _state(session_id, session, ai_actions)
+        raise RequestError(f"unknown request type {kind}")
+
+    async def _new(self, request: Message) -> Message:
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("too many sessions")
+        length = request.get("length", 8)
+        if not isinstance(length, int) or length < 4 or length % 2:
+            raise RequestError("length must be an even integer of at least 4")
+        spec = request.get("player", "greedy")
+        if not isinstance(spec, str):
+            raise RequestError("player must be a player spec")
+        try:
+            check_spec(spec)
+        except ValueError as error:
+            raise RequestError(str(error)) from error
+        color = request.get("color", "dark")
+        if color not in ("dark", "light"):
+            raise RequestError("color must be dark or light")
+        move_timeout = request.get("move_timeout", self.move_timeout)
+        if (
+            isinstance(move_timeout, bool)
+            or not isinstance(move_timeout, (int, float))
+            or not 0 < move_timeout < math.inf
+        ):
+            raise RequestError("move_timeout must be a positive number")
+        session_id = uuid.uuid4().hex
+        session = Session(
+            Game.init_game(length),
+            spec,
+            Disk.LIGHT if color == "dark" else Disk.DARK,
+            float(move_timeout),
+        )
+        self.sessions[session_id] = session
+        async with session.lock:
+            ai_actions = await self._play_ai_or_close(session_id, session)
+        return _state(session_id, session, ai_actions)
+
+    async def _play_ai_or_close(
+        self, session_id: str, session: Session
+    ) -> List[Message]:
+        """play AI moves, the session is removed if they fail
+
+        Raises:
+            RequestError: the AI player failed
+        """
+        try:
+            return await self._play_ai(session)
+        except asyncio.CancelledError:
+            # AIの手番で止まったゲームは続けられない
+            self.sessions.pop(session_id, None)
+            raise
+        except Exception as error:  # pylint: disable=broad-except
+            self.sessions.pop(session_id, None)
+            raise RequestError(f"AI player failed: {error!r}") from error
+
+    async def _play_ai(self, session: Session) -> List[Message]:
+        """play AI moves until it is the client's turn or the game is over"""
+        game = session.game
+        ai_actions: List[Message] = []
+        while not game.is_game_over() and game.current_disk == session.ai_disk:
+            timed_out = False
+            legal_actions = game.get_legal_actions()
+            if not legal_actions:
+                action = None
+            else:
+                config = game.board.config.astype(np.int8).tobytes()
+                length = len(game.board.config)
+                job = await self._submit(
+                    session.player, config, length, int(game.current_disk)
+                )
+                try:
+                    action = await asyncio.wait_for(
+                        asyncio.wrap_future(job), session.move_timeout
+                    )
+                except asyncio.TimeoutError:
+                    # 時間切れなら合法手からランダムに選ぶ
+                    timed_out = True
+                    action = None
+                if not game.is_legal_action(action):
+                    action = random.choice(sorted(legal_actions))
+            game.execute_action(action)
+            ai_actions.append(
+                {
+                    "action": None if action is None else list(action),
+                    "timeout": timed_out,
+                }
+            )
+        return ai_actions
+
+    async def _submit(
+        self, spec: str, config: bytes, length: int, disk: int
+    ) -> Future[Optional[Position]]:
+        """submit an AI move to the pool once a pending slot is free
+
+        The slot is released when the job ends, not when its caller stops
+        waiting, so that timed out moves still count against ``max_pending``.
+        """
+        pending = self._pending
+        assert pending is not None, "server is not started"
+        await pending.acquire()
+        loop = asyncio.get_running_loop()
+
+        def release(job: Future[Optional[Position]]) -> None:
+            self._jobs.discard(job)
+            pending.release()
+
+        def done(job: Future[Optional[Position]]) -> None:
+            # worker側のthreadから呼ばれる
+            try:
+                loop.call_soon_threadsafe(release, job)
+            except RuntimeError:
+                pass  # loop is closed
+
+        try:
+            job = self._executor.submit(_ai_move, spec, config, length, disk)
+        except BaseException:
+            pending.release()
+            raise
+        self._jobs.add(job)
+        job.add_done_callback(done)
+        return job
+
+
+class Client:
+    """client of GameServer
+
+    requests may be sent concurrently, responses are matched by id
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._futures: Dict[int, asyncio.Future[Message]] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @staticmethod
+    async def connect(host: str = "127.0.0.1", port: int = 8765) -> Client:
+        reader, writer = await asyncio.open_connection(host, port)
+        return Client(reader, writer)
+
+    async def close(self) -> None:
+        self._receiver.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def __aenter__(self) -> Client:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.close()
+
+    async def _receive(self) -> None:
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                for waiting in self._futures.values():
+                    waiting.set_exception(ConnectionError("connection closed"))
+                self._futures.clear()
+                return
+            response = json.loads(line)
+            future = self._futures.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    async def request(self, **request: object) -> Message:
+        """send a request and wait for the response
+
+        Args:
+            request (object): fields of the request, id is added
+
+        Returns:
+            Message: response
+        """
+        request_id = next(self._ids)
+        future: asyncio.Future[Message] = asyncio.get_running_loop().create_future()
+        self._futures[request_id] = future
+        self._writer.write(json.dumps({**request, "id": request_id}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def new_game(self, **options: object) -> Message:
+        return await self.request(type="new", **options)
+
+    async def move(self, session: str, action: Optional[Tuple[int, int]]) -> Message:
+        return await self.request(
+            type="move",
+            session=session,
+            action=None if action is None else list(action),
+        )
+
+    async def state(self, session: str) -> Message:
+        return await self.request(type="state", session=session)
+
+    async def close_game(self, session: str) -> Message:
+        return await self.request(type="close", session=session)
+
+    async def stats(self) -> Message:
+        return await self.request(type="stats")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.server",
+        description="serve reversi games against AI players over TCP",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="port")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--move-timeout", type=float, default=10.0)
+    parser.add_argument("--idle-timeout", type=float, default=600.0)
+    parser.add_argument("--max-inflight", type=int, default=16)
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics on this port (default: disabled)",
+    )
+    args = parser.parse_args(argv)
+    if args.metrics_port is not None:
+        instrumentation.enable()
+        instrumentation.serve(args.metrics_port, args.host)
+    server = GameServer(
+        args.host,
+        args.port,
+        args.workers,
+        args.max_sessions,
+        args.move_timeout,
+        args.idle_timeout,
+        args.max_inflight,
+    )
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""board symmetries
+
+canonical forms of positions under the 8 symmetries of the square board and
+a result cache shared through them.
+
+Symmetry ``s`` flips the columns if ``s & 4`` and then rotates the board
+``s & 3`` times by 90 degrees counterclockwise. Every symmetry is precomputed
+per board length as a permutation of the flat square indices, so transforming
+a board is one fancy index.
+
+The canonical form of a board is the transformed board whose int8 bytes are
+the smallest. Symmetric positions share the canonical form, so a result
+computed on the canonical board is valid for all of them after mapping its
+moves back with ``Canonical.to_original``.
+
+``SymmetryCache`` is a bounded LRU cache keyed by the canonical form and the
+side to move, split into namespaces so that search, opening books and
+analysis can share one cache (``shared_cache``). It counts hits and misses
+per namespace to help sizing it.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, TypeVar, cast
+
+import numpy as np
+
+from pyreversi.models import Board, Disk, Position
+
+SYMMETRIES = 8
+DEFAULT_CACHE_SIZE = 1 << 16
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def permutations(length: int) -> np.ndarray:
+    """flat index permutations of the symmetries
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        np.ndarray: (8, N * N) read-only array, ``[s, t]`` is the original
+            square which symmetry s moves to square t
+    """
+    grid = np.arange(length * length).reshape(length, length)
+    result = np.stack(
+        [
+            np.rot90(grid[:, ::-1] if symmetry & 4 else grid, symmetry & 3).ravel()
+            for symmetry in range(SYMMETRIES)
+        ]
+    )
+    result.setflags(write=False)
+    return result
+
+
+@lru_cache(maxsize=None)
+def inverse_permutations(length: int) -> np.ndarray:
+    """inverse of ``permutations``
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        np.ndarray: (8, N * N) read-only array, ``[s, o]`` is the square to
+            which symmetry s moves the original square o
+    """
+    forward = permutations(length)
+    result = np.empty_like(forward)
+    np.put_along_axis(
+        result, forward, np.broadcast_to(np.arange(length * length), forward.shape), 1
+    )
+    result.setflags(write=False)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _square_maps(length: int) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """``permutations`` and ``inverse_permutations`` as tuples of ints"""
+    return tuple(map(tuple, permutations(length).tolist())), tuple(
+        map(tuple, inverse_permutations(length).tolist())
+    )
+
+
+def transform(config: np.ndarray, symmetry: int) -> np.ndarray:
+    """apply one of the 8 board symmetries
+
+    Args:
+        config (np.ndarray): (..., N, N) configurations
+        symmetry (int): 0 to 7, 0 is identity
+
+    Returns:
+        np.ndarray: transformed configurations, a new array
+    """
+    length = config.shape[-1]
+    flat = config.reshape(config.shape[:-2] + (length * length,))
+    return flat[..., permutations(length)[symmetry]].reshape(config.shape)
+
+
+def transform_square(square: int, length: int, symmetry: int) -> int:
+    """square to which the symmetry moves the flat index square"""
+    return _square_maps(length)[1][symmetry][square]
+
+
+def restore_square(square: int, length: int, symmetry: int) -> int:
+    """original flat index of the transformed square"""
+    return _square_maps(length)[0][symmetry][square]
+
+
+class Canonical(NamedTuple):
+    """canonical form of a board
+
+    Attributes:
+        key (bytes): int8 bytes of the canonical board
+        length (int): length of board
+        symmetry (int): symmetry which maps the board to the canonical board
+        symmetries (Tuple[int, ...]): every such symmetry, more than one if
+            the board is symmetric
+    """
+
+    key: bytes
+    length: int
+    symmetry: int
+    symmetries: Tuple[int, ...]
+
+    @property
+    def board(self) -> Board:
+        """the canonical board"""
+        config = np.frombuffer(self.key, dtype=np.int8)
+        return Board(config.reshape(self.length, self.length))
+
+    def to_canonical(self, position: Position) -> Position:
+        """position of the move on the canonical board
+
+        対称な盤では，同じ手に対応するマスのうち最小のものにそろえる
+
+        Args:
+            position (Position): position on the original board
+
+        Returns:
+            Position: position on the canonical board
+        """
+        inverse = _square_maps(self.length)[1]
+        square = position.row * self.length + position.col
+        canonical = min(inverse[symmetry][square] for symmetry in self.symmetries)
+        return Position(*divmod(canonical, self.length))
+
+    def to_original(self, position: Position) -> Position:
+        """position of the move on the original board
+
+        Args:
+            position (Position): position on the canonical board
+
+        Returns:
+            Position: position on the original board
+        """
+        square = restore_square(
+            position.row * self.length + position.col, self.length, self.symmetry
+        )
+        return Position(*divmod(square, self.length))
+
+
+def canonicalize(board: Board) -> Canonical:
+    """canonical form of the board
+
+    Args:
+        board (Board): 盤の状態
+
+    Returns:
+        Canonical: canonical form
+    """
+    length = len(board.config)
+    flat = np.asarray(board.cells, dtype=np.int8)
+    images = flat[permutations(length)]
+    keys = [image.tobytes() for image in images]
+    key = min(keys)
+    symmetries = tuple(s for s in range(SYMMETRIES) if keys[s] == key)
+    return Canonical(key, length, symmetries[0], symmetries)
+
+
+class CacheStats(NamedTuple):
+    """hits and misses of a cache namespace
+
+    Attributes:
+        hits (int): lookups which found a value
+        misses (int): lookups which did not
+    """
+
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SymmetryCache:
+    """LRU cache of results keyed by canonical positions
+
+    values must be in the orientation of the canonical board, map moves back
+    with ``Canonical.to_original``. Thread safe.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """constructor
+
+        Args:
+            maxsize (int, optional): max entries over all namespaces.
+                Defaults to DEFAULT_CACHE_SIZE.
+        """
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Tuple[str, bytes, int], object] = OrderedDict()
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, canonical: Canonical, disk: Disk, namespace: str = ""
+    ) -> Optional[object]:
+        """cached value of the position
+
+        Args:
+            canonical (Canonical): canonical form of the board
+            disk (Disk): side to move
+            namespace (str, optional): namespace of the value. Defaults to "".
+
+        Returns:
+            Optional[object]: value, None if not cached
+        """
+        key = (namespace, canonical.key, int(disk))
+        with self._lock:
+            hits, misses = self._stats.get(namespace, (0, 0))
+            value = self._entries.get(key)
+            if value is None:
+                self._stats[namespace] = hits, misses + 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[namespace] = hits + 1, misses
+            return value
+
+    def put(
+        self, canonical: Canonical, disk: Disk, value: object, namespace: str = ""
+    ) -> None:
+        """cache a value of the position, evicting the least recently used
+
+        Args:
+            canonical (Canonical): canonical form of the board
+            disk (Disk): side to move
+            value (object): value in the orientation of the canonical board
+            namespace (str, optional): namespace of the value. Defaults to "".
+        """
+        key = (namespace, canonical.key, int(disk))
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        board: Board,
+        disk: Disk,
+        compute: Callable[[Board, Disk], T],
+        namespace: str = "",
+    ) -> Tuple[T, Canonical]:
+        """cached value of the position, computed on the canonical board if missing
+
+        Args:
+            board (Board): 盤の状態
+            disk (Disk): side to move
+            compute (Callable[[Board, Disk], T]): called with the canonical
+                board, must not return None
+            namespace (str, optional): namespace of the value. Defaults to "".
+
+        Returns:
+            Tuple[T, Canonical]: value and the canonical form to map it back
+        """
+        canonical = canonicalize(board)
+        cached = self.get(canonical, disk, namespace)
+        if cached is not None:
+            # namespaceごとに同じcomputeの値だけを入れているのでTになる
+            return cast(T, cached), canonical
+        value = compute(canonical.board, disk)
+        self.put(canonical, disk, value, namespace)
+        return value, canonical
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """remove the entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def stats(self) -> Dict[str, CacheStats]:
+        """hits and misses per namespace
+
+        Returns:
+            Dict[str, CacheStats]: namespace -> statistics
+        """
+        with self._lock:
+            return {name: CacheStats(*counts) for name, counts in self._stats.items()}
+
+    def report(self) -> str:
+        """human readable hit rates
+
+        Returns:
+            str: one line per namespace and the number of entries
+        """
+        lines = [
+            f"{name or '(default)'}: {stats.hits} hits {stats.misses} misses "
+            f"hit rate {stats.hit_rate:.1%}"
+            for name, stats in sorted(self.stats().items())
+        ]
+        lines.append(f"entries {len(self)} / {self.maxsize}")
+        return "\n".join(lines)
+
+
+_shared: Optional[SymmetryCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> SymmetryCache:
+    """the process-wide cache, created on first use
+
+    Returns:
+        SymmetryCache: shared cache, resize it with ``resize``
+    """
+    global _shared  # pylint: disable=global-statement
+    with _shared_lock:
+        if _shared is None:
+            _shared = SymmetryCache()
+        return _shared
@@ -0,0 +1,305 @@
+"""reversi tournament
+
+play many games between two players over a process pool.
+
+Usage:
+    python -m pyreversi.tournament random greedy --length 8 --games 10000 --workers 4
+
+Games are dispatched in chunks. Each chunk is seeded from the base seed and its
+index, so results do not depend on which worker runs it. Colors alternate
+between games. Boards are never printed; progress and the final statistics go
+to stderr and stdout. With ``--record PATH`` every game is appended to a record
+file, see ``pyreversi.records``.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from pyreversi.game import Game
+from pyreversi.models import Disk, Position
+from pyreversi.players import Player, check_spec, make_player
+from pyreversi.records import RecordWriter, encode_record
+
+
+class GameResult(NamedTuple):
+    """result of a game
+
+    Attributes:
+        difference (int): dark disks minus light disks
+        actions (Tuple[Optional[Position], ...]): played actions, None means pass
+    """
+
+    difference: int
+    actions: Tuple[Optional[Position], ...]
+
+
+class TournamentStats(NamedTuple):
+    """aggregate results from the first player's point of view
+
+    Attributes:
+        wins (int): games won by the first player
+        draws (int): drawn games
+        losses (int): games lost by the first player
+        elapsed (float): elapsed seconds
+    """
+
+    wins: int
+    draws: int
+    losses: int
+    elapsed: float
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        """mean score of the first player, a win is 1 and a draw is 0.5"""
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.0
+
+    def confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """normal approximation of the confidence interval of score
+
+        Args:
+            z (float, optional): z value. Defaults to 1.96, 95%.
+
+        Returns:
+            Tuple[float, float]: lower and upper bound
+        """
+        if not self.games:
+            return 0.0, 1.0
+        mean = self.score
+        variance = (self.wins + self.draws / 4) / self.games - mean * mean
+        margin = z * math.sqrt(max(variance, 0.0) / self.games)
+        return max(mean - margin, 0.0), min(mean + margin, 1.0)
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        lower, upper = self.confidence_interval()
+        return (
+            f"games {self.games} win {self.wins} draw {self.draws} "
+            f"loss {self.losses} score {self.score:.4f} "
+            f"95%CI [{lower:.4f}, {upper:.4f}] "
+            f"{self.games_per_second:.1f} games/s"
+        )
+
+
+class _Chunk(NamedTuple):
+    player1: str
+    player2: str
+    length: int
+    first_game: int
+    games: int
+    seed: int
+    record: Optional[str] = None
+
+
+def play_game(dark: Player, light: Player, length: int) -> GameResult:
+    """play a game
+
+    Args:
+        dark (Player): 黒番のプレイヤー
+        light (Player): 白番のプレイヤー
+        length (int): length of board
+
+    Returns:
+        GameResult: result of the game
+    """
+    dark.set_disk(Disk.DARK)
+    light.set_disk(Disk.LIGHT)
+    game = Game.init_game(length)
+    actions: List[Optional[Position]] = []
+    while not game.is_game_over():
+        player = dark if game.current_disk == Disk.DARK else light
+        action = player.play(game)
+        game.execute_action(action)
+        actions.append(action)
+    return GameResult(
+        game.count_disk(Disk.DARK) - game.count_disk(Disk.LIGHT), tuple(actions)
+    )
+
+
+def _run_chunk_in_process(chunk: _Chunk) -> Tuple[int, int, int]:
+    # _run_chunkは乱数を設定し直すので，呼び出し側の乱数の状態を戻す
+    state = random.getstate()
+    numpy_state = np.random.get_state()
+    try:
+        return _run_chunk(chunk)
+    finally:
+        random.setstate(state)
+        np.random.set_state(numpy_state)
+
+
+def _run_chunk(chunk: _Chunk) -> Tuple[int, int, int]:
+    random.seed(chunk.seed)
+    np.random.seed(chunk.seed % (1 << 32))
+    player1 = make_player(chunk.player1)
+    player2 = make_player(chunk.player2)
+    wins = draws = losses = 0
+    records = bytearray()
+    for index in range(chunk.first_game, chunk.first_game + chunk.games):
+        # 偶数番目のゲームはplayer1が黒番
+        if index % 2 == 0:
+            result = play_game(player1, player2, chunk.length)
+            difference = result.difference
+        else:
+            result = play_game(player2, player1, chunk.length)
+            difference = -result.difference
+        if chunk.record is not None:
+            records += encode_record(chunk.length, result.actions, result.difference)
+        if difference > 0:
+            wins += 1
+        elif difference < 0:
+            losses += 1
+        else:
+            draws += 1
+    if chunk.record is not None:
+        # chunkの棋譜はまとめて1回で追記する
+        with RecordWriter(chunk.record) as writer:
+            writer.write_bytes(bytes(records))
+    return wins, draws, losses
+
+
+def _chunks(
+    player1: str,
+    player2: str,
+    length: int,
+    games: int,
+    chunk_size: int,
+    seed: int,
+    record: Optional[str],
+) -> Iterator[_Chunk]:
+    for index, first_game in enumerate(range(0, games, chunk_size)):
+        yield _Chunk(
+            player1,
+            player2,
+            length,
+            first_game,
+            min(chunk_size, games - first_game),
+            seed * 1_000_003 + index,
+            record,
+        )
+
+
+def _stats(totals: List[int], start: float) -> TournamentStats:
+    wins, draws, losses = totals
+    return TournamentStats(
+        wins=wins, draws=draws, losses=losses, elapsed=time.perf_counter() - start
+    )
+
+
+def run_tournament(
+    player1: str,
+    player2: str,
+    length: int = 8,
+    games: int = 100,
+    workers: Optional[int] = None,
+    chunk_size: int = 10,
+    seed: int = 0,
+    record: Optional[str] = None,
+) -> Iterator[TournamentStats]:
+    """run tournament
+
+    Args:
+        player1 (str): spec of the first player, see ``players.make_player``
+        player2 (str): spec of the second player
+        length (int, optional): length of board. Defaults to 8.
+        games (int, optional): number of games. Defaults to 100.
+        workers (Optional[int], optional): worker processes, 0 means playing in
+            this process, which keeps the state of the global random generators.
+            Defaults to None, the number of CPUs.
+        chunk_size (int, optional): games per dispatched chunk. Defaults to 10.
+        seed (int, optional): base seed. Defaults to 0.
+        record (Optional[str], optional): path of the record file to append the
+            games to. Defaults to None, games are not recorded.
+
+    Yields:
+        Iterator[TournamentStats]: aggregate stats every time a chunk finishes,
+            the last one covers all games
+    """
+    # 不正なspecはworkerに送る前に，playerを作らずに検出する
+    check_spec(player1)
+    check_spec(player2)
+    start = time.perf_counter()
+    totals = [0, 0, 0]
+    chunks = _chunks(player1, player2, length, games, chunk_size, seed, record)
+    if workers == 0:
+        for chunk in chunks:
+            for i, count in enumerate(_run_chunk_in_process(chunk)):
+                totals[i] += count
+            yield _stats(totals, start)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        pending: Set[Future[Tuple[int, int, int]]] = set()
+        for chunk in chunks:
+            # 実行待ちのchunkはworker数の2倍までにして，メモリを一定に保つ
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for i, count in enumerate(future.result()):
+                        totals[i] += count
+                    yield _stats(totals, start)
+            pending.add(executor.submit(_run_chunk, chunk))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for i, count in enumerate(future.result()):
+                    totals[i] += count
+                yield _stats(totals, start)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.tournament",
+        description="play games between two players and report statistics",
+    )
+    parser.add_argument("player1", help="player spec, e.g. alphabeta:time_limit=0.1")
+    parser.add_argument("player2", help="player spec, e.g. random")
+    parser.add_argument("--length", type=int, default=8, help="length of board")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10, help="games per chunk")
+    parser.add_argument("--seed", type=int, default=0, help="base seed")
+    parser.add_argument("--record", help="append the games to this record file")
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=5.0,
+        help="seconds between progress reports on stderr",
+    )
+    args = parser.parse_args(argv)
+    stats = TournamentStats(0, 0, 0, 0.0)
+    last_report = time.perf_counter()
+    for stats in run_tournament(
+        args.player1,
+        args.player2,
+        args.length,
+        args.games,
+        args.workers,
+        args.chunk_size,
+        args.seed,
+        args.record,
+    ):
+        if time.perf_counter() - last_report >= args.report_interval:
+            print(stats, file=sys.stderr, flush=True)
+            last_report = time.perf_counter()
+    print(f"{args.player1} vs {args.player2}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
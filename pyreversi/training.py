@@ -0,0 +1,256 @@
+"""evaluation weight training
+
+fit ``evaluation.PatternEvaluator`` weights to recorded games.
+
+Positions are replayed from a record file (``pyreversi.records``) game by
+game, passed through a fixed-size shuffle buffer and cut into batches, so only
+the buffer, one batch and the weights are in memory however many games the
+file holds. The target of a position is the final disk difference from the
+side to move.
+
+Every batch takes one SGD step of the squared error per game phase. A
+pattern table entry moves by the mean error of the positions which used it,
+divided by the number of pattern images, and the numeric features take a
+normalized LMS step.
+
+Usage:
+    python -m pyreversi.training games.rec weights.npz --length 8 --epochs 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pyreversi.evaluation import (
+    DEFAULT_PHASES,
+    NUMERIC_FEATURES,
+    PatternEvaluator,
+    features,
+    layout,
+    phases_of,
+)
+from pyreversi.records import GameRecord, RecordReader, replay_arrays
+
+Batch = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def iter_batches(
+    records: Iterable[GameRecord],
+    length: int,
+    batch_size: int = 4096,
+    buffer_size: int = 1 << 16,
+    rng: Optional[np.random.Generator] = None,
+) -> Iterator[Batch]:
+    """stream shuffled batches of positions
+
+    Args:
+        records (Iterable[GameRecord]): games, games of other lengths are skipped
+        length (int): length of board
+        batch_size (int, optional): positions per batch. Defaults to 4096.
+        buffer_size (int, optional): positions in the shuffle buffer.
+            Defaults to 1 << 16.
+        rng (Optional[np.random.Generator], optional): random generator.
+            Defaults to None, a new unseeded generator.
+
+    Yields:
+        Iterator[Batch]: (B, N, N) configurations, (B,) sides to move and
+            (B,) float32 targets
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    buffer_size = max(buffer_size, batch_size)
+    configs = np.zeros((buffer_size, length, length), dtype=np.int8)
+    disks = np.zeros(buffer_size, dtype=np.int8)
+    targets = np.zeros(buffer_size, dtype=np.float32)
+    filled = 0
+    for record in records:
+        if record.length != length:
+            continue
+        game_configs, game_disks, _ = replay_arrays(record)
+        game_targets = record.score * game_disks.astype(np.float32)
+        start = 0
+        while start < len(game_disks):
+            count = min(len(game_disks) - start, buffer_size - filled)
+            end = start + count
+            configs[filled : filled + count] = game_configs[start:end]
+            disks[filled : filled + count] = game_disks[start:end]
+            targets[filled : filled + count] = game_targets[start:end]
+            filled += count
+            start = end
+            if filled == buffer_size:
+                # バッファが一杯になったら混ぜて半分を吐き出す
+                order = rng.permutation(buffer_size)
+                configs[:], disks[:], targets[:] = (
+                    configs[order],
+                    disks[order],
+                    targets[order],
+                )
+                keep = buffer_size // 2
+                for first in range(keep, buffer_size, batch_size):
+                    window = slice(first, min(first + batch_size, buffer_size))
+                    yield (
+                        configs[window].copy(),
+                        disks[window].copy(),
+                        targets[window].copy(),
+                    )
+                filled = keep
+    order = rng.permutation(filled)
+    for first in range(0, filled, batch_size):
+        chosen = order[first : first + batch_size]
+        yield configs[chosen], disks[chosen], targets[chosen]
+
+
+class Trainer:
+    """SGD on the weights of an evaluator in place"""
+
+    def __init__(self, evaluator: PatternEvaluator, learning_rate: float = 0.5) -> None:
+        """constructor
+
+        Args:
+            evaluator (PatternEvaluator): evaluator whose weights are trained
+            learning_rate (float, optional): step size, 1 moves a pattern entry
+                all the way to the mean error. Defaults to 0.5.
+        """
+        self.evaluator = evaluator
+        self.learning_rate = learning_rate
+
+    def step(
+        self, configs: np.ndarray, disks: np.ndarray, targets: np.ndarray
+    ) -> float:
+        """one SGD step
+
+        Args:
+            configs (np.ndarray): (B, N, N) stacked configurations
+            disks (np.ndarray): (B,) sides to move
+            targets (np.ndarray): (B,) final disk differences from the side to move
+
+        Returns:
+            float: mean squared error of the batch before the step
+        """
+        weights = self.evaluator.weights
+        phases, width = weights.shape
+        indices, numeric = features(configs, disks)
+        phase = phases_of(configs, phases)
+        rows = phase[:, None]
+        predictions = weights[rows, indices].sum(axis=1) + (
+            numeric * weights[phase, -len(NUMERIC_FEATURES) :]
+        ).sum(axis=1)
+        errors = targets - predictions
+        # パターン: 使われた局面の誤差の平均だけ，像の数で割って動かす
+        keys = (rows * width + indices).ravel()
+        images = indices.shape[1]
+        sums = np.bincount(
+            keys, weights=np.repeat(errors, images), minlength=weights.size
+        )
+        counts = np.bincount(keys, minlength=weights.size)
+        flat = weights.reshape(-1)
+        flat += (self.learning_rate / images * sums / np.maximum(counts, 1)).astype(
+            np.float32
+        )
+        # 数値特徴: 正規化したLMS
+        for feature in range(len(NUMERIC_FEATURES)):
+            values = numeric[:, feature]
+            gradient = np.bincount(phase, weights=errors * values, minlength=phases)
+            energy = np.bincount(phase, weights=values * values, minlength=phases)
+            column = width - len(NUMERIC_FEATURES) + feature
+            weights[:, column] += (
+                self.learning_rate * gradient / np.maximum(energy, 1.0) / images
+            ).astype(np.float32)
+        return float(np.mean(errors * errors))
+
+
+def train(
+    path: str,
+    length: int = 8,
+    epochs: int = 1,
+    phases: int = DEFAULT_PHASES,
+    batch_size: int = 4096,
+    buffer_size: int = 1 << 16,
+    learning_rate: float = 0.5,
+    seed: int = 0,
+    evaluator: Optional[PatternEvaluator] = None,
+) -> Tuple[PatternEvaluator, List[float]]:
+    """train weights on a record file
+
+    Args:
+        path (str): record file
+        length (int, optional): length of board. Defaults to 8.
+        epochs (int, optional): passes over the file. Defaults to 1.
+        phases (int, optional): number of phases. Defaults to DEFAULT_PHASES.
+        batch_size (int, optional): positions per step. Defaults to 4096.
+        buffer_size (int, optional): positions in the shuffle buffer.
+            Defaults to 1 << 16.
+        learning_rate (float, optional): step size. Defaults to 0.5.
+        seed (int, optional): seed of the shuffle. Defaults to 0.
+        evaluator (Optional[PatternEvaluator], optional): initial weights.
+            Defaults to None, all zero.
+
+    Returns:
+        Tuple[PatternEvaluator, List[float]]: trained evaluator and the mean
+            squared error of every epoch
+    """
+    if evaluator is None:
+        evaluator = PatternEvaluator(
+            np.zeros((phases, layout(length).features), dtype=np.float32), length
+        )
+    trainer = Trainer(evaluator, learning_rate)
+    rng = np.random.default_rng(seed)
+    losses = []
+    for _ in range(epochs):
+        total = 0.0
+        count = 0
+        with RecordReader(path) as reader:
+            for configs, disks, targets in iter_batches(
+                reader, length, batch_size, buffer_size, rng
+            ):
+                total += trainer.step(configs, disks, targets) * len(targets)
+                count += len(targets)
+        losses.append(total / count if count else 0.0)
+    return evaluator, losses
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyreversi.training",
+        description="fit pattern evaluation weights to a record file",
+    )
+    parser.add_argument("records", help="record file, see pyreversi.records")
+    parser.add_argument("output", help="output weight file (.npz)")
+    parser.add_argument("--length", type=int, default=8, help="length of board")
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the file")
+    parser.add_argument(
+        "--phases", type=int, default=DEFAULT_PHASES, help="number of game phases"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=4096, help="positions per step"
+    )
+    parser.add_argument(
+        "--buffer-size", type=int, default=1 << 16, help="positions in shuffle buffer"
+    )
+    parser.add_argument("--learning-rate", type=float, default=0.5, help="step size")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the shuffle")
+    parser.add_argument("--init", help="initial weight file (default: all zero)")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    evaluator, losses = train(
+        args.records,
+        args.length,
+        args.epochs,
+        args.phases,
+        args.batch_size,
+        args.buffer_size,
+        args.learning_rate,
+        args.seed,
+        None if args.init is None else PatternEvaluator.load(args.init),
+    )
+    for epoch, loss in enumerate(losses, 1):
+        print(f"epoch {epoch} mse {loss:.3f}", file=sys.stderr)
+    evaluator.save(args.output)
+    print(f"saved {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
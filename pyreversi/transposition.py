@@ -0,0 +1,170 @@
+"""transposition table
+
+fixed-memory hash table of search results keyed by zobrist keys.
+
+Each entry is two 64 bit words, ``check`` and ``data``. ``data`` packs the
+score, depth, bound, search generation and best move, and ``check`` is
+``key ^ data`` so that a torn or overwritten entry never matches a wrong key.
+"""
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# data layout
+_MOVE_BITS = 16
+_DEPTH_SHIFT = 16
+_BOUND_SHIFT = 24
+_GENERATION_SHIFT = 26
+_SCORE_SHIFT = 32
+_SCORE_OFFSET = 1 << 31
+_NO_MOVE = 0
+_PASS = (1 << _MOVE_BITS) - 1
+_MASK64 = (1 << 64) - 1
+
+POLICIES = ("depth", "always")
+
+
+class Bound(IntEnum):
+    """kind of the stored score"""
+
+    EXACT = 0
+    # score is a lower bound (fail high)
+    LOWER = 1
+    # score is an upper bound (fail low)
+    UPPER = 2
+
+
+class Entry(NamedTuple):
+    """entry of the table
+
+    Attributes:
+        score (int): stored score
+        depth (int): remaining depth of the stored search
+        bound (Bound): kind of the score
+        move (Optional[int]): square index of the best move, -1 for pass,
+            None if unknown
+    """
+
+    score: int
+    depth: int
+    bound: Bound
+    move: Optional[int]
+
+
+class TranspositionTable:
+    """fixed-memory transposition table
+
+    Replacement policies:
+        depth: keep the deeper entry of the current search, entries of older
+            searches are always replaced
+        always: always replace
+    """
+
+    def __init__(self, entries: int = 1 << 20, policy: str = "depth"):
+        """constructor
+
+        Args:
+            entries (int, optional): number of entries, rounded down to a power of
+                two. Each entry takes 16 bytes. Defaults to 1 << 20.
+            policy (str, optional): replacement policy, "depth" or "always".
+                Defaults to "depth".
+
+        Raises:
+            ValueError: invalid entries or policy
+        """
+        if entries < 1:
+            raise ValueError("entries must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy '{policy}'")
+        size = 1 << entries.bit_length() - 1
+        self.policy = policy
+        self._index_mask = size - 1
+        self._checks, self._data = self._allocate(size)
+        self._generation = 1
+
+    def _allocate(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """allocate the check and data words of the entries
+
+        Args:
+            size (int): number of entries
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: zeroed uint64 arrays of the size
+        """
+        return np.zeros(size, dtype=np.uint64), np.zeros(size, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._checks.nbytes + self._data.nbytes)
+
+    def new_search(self) -> None:
+        """mark the start of a new search
+
+        entries of older searches become replaceable
+        """
+        self._generation = self._generation % 63 + 1
+
+    def clear(self) -> None:
+        self._checks.fill(0)
+        self._data.fill(0)
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """look up the key
+
+        Args:
+            key (int): 64 bit zobrist key
+
+        Returns:
+            Optional[Entry]: stored entry, None if not found
+        """
+        index = key & self._index_mask
+        data = int(self._data[index])
+        if not data or int(self._checks[index]) ^ data != key:
+            return None
+        move = data & _PASS
+        return Entry(
+            (data >> _SCORE_SHIFT) - _SCORE_OFFSET,
+            data >> _DEPTH_SHIFT & 0xFF,
+            Bound(data >> _BOUND_SHIFT & 0x3),
+            None if move == _NO_MOVE else -1 if move == _PASS else move - 1,
+        )
+
+    def store(
+        self, key: int, score: int, depth: int, bound: Bound, move: Optional[int]
+    ) -> None:
+        """store a search result
+
+        Args:
+            key (int): 64 bit zobrist key
+            score (int): score, must fit in 32 bits
+            depth (int): remaining depth, 0 to 255
+            bound (Bound): kind of the score
+            move (Optional[int]): square index of the best move, -1 for pass,
+                None if unknown
+        """
+        index = key & self._index_mask
+        if self.policy == "depth":
+            old = int(self._data[index])
+            if (
+                old
+                and old >> _GENERATION_SHIFT & 0x3F == self._generation
+                and old >> _DEPTH_SHIFT & 0xFF > depth
+                and int(self._checks[index]) ^ old != key
+            ):
+                return
+        move_code = _NO_MOVE if move is None else _PASS if move < 0 else move + 1
+        data = (
+            (score + _SCORE_OFFSET) << _SCORE_SHIFT
+            | self._generation << _GENERATION_SHIFT
+            | int(bound) << _BOUND_SHIFT
+            | depth << _DEPTH_SHIFT
+            | move_code
+        )
+        self._checks[index] = (key ^ data) & _MASK64
+        self._data[index] = data
@@ -0,0 +1,172 @@
+"""vectorized reversi environment
+
+many games stepped at once for self-play and reinforcement learning.
+
+``VecGame`` holds B games as one ``(B, N, N)`` int8 array together with the
+side to move of every game, and steps all of them with ``pyreversi.batch``.
+Actions are flat square indices ``row * N + col``. Passes are never actions:
+when the side to move has no legal move after a step, the turn goes back to
+the other side, and a game is over when neither side can move. Finished games
+are reset automatically unless ``auto_reset`` is False.
+
+Observations are the boards seen from the side to move, 1 for own disks and
+-1 for the opponent's. The reward of a step is given to the player who moved:
+the sign of the final disk difference for that player when the game ends,
+otherwise 0.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from pyreversi import batch
+from pyreversi.models import Disk
+
+_DARK = int(Disk.DARK)
+
+
+class StepResult(NamedTuple):
+    """result of VecGame.step
+
+    Attributes:
+        observations (np.ndarray): (B, N, N) int8 boards seen from the side to
+            move, boards of the new games for auto-reset games
+        rewards (np.ndarray): (B,) float32 rewards of the players who moved
+        dones (np.ndarray): (B,) bool, True if the game ended by the step
+        scores (np.ndarray): (B,) int32 final disk difference for dark of the
+            ended games, 0 for the others
+    """
+
+    observations: np.ndarray
+    rewards: np.ndarray
+    dones: np.ndarray
+    scores: np.ndarray
+
+
+class VecGame:
+    """B games of the same length stepped together
+
+    Attributes:
+        configs (np.ndarray): (B, N, N) int8 configurations
+        disks (np.ndarray): (B,) int8 sides to move
+        dones (np.ndarray): (B,) bool, True for ended games which are not reset
+    """
+
+    def __init__(self, num_games: int, length: int = 8, auto_reset: bool = True):
+        """constructor
+
+        Args:
+            num_games (int): number of games B
+            length (int, optional): length of board. Defaults to 8.
+            auto_reset (bool, optional): reset ended games in step.
+                Defaults to True.
+        """
+        self.num_games = num_games
+        self.length = length
+        self.auto_reset = auto_reset
+        self._initial = np.zeros((length, length), dtype=np.int8)
+        half = length // 2
+        self._initial[half - 1, half - 1] = self._initial[half, half] = Disk.LIGHT
+        self._initial[half - 1, half] = self._initial[half, half - 1] = Disk.DARK
+        self.configs = np.empty((num_games, length, length), dtype=np.int8)
+        self.disks = np.empty(num_games, dtype=np.int8)
+        self.dones = np.zeros(num_games, dtype=bool)
+        self._initial_legal = batch.legal_mask(
+            self._initial[None], np.full(1, _DARK, dtype=np.int8)
+        )[0]
+        self._legal = np.zeros((num_games, length, length), dtype=bool)
+        self.reset()
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """start new games
+
+        Args:
+            mask (Optional[np.ndarray], optional): (B,) bool games to reset.
+                Defaults to None, all games.
+
+        Returns:
+            np.ndarray: (B, N, N) observations
+        """
+        indices = np.arange(self.num_games) if mask is None else np.flatnonzero(mask)
+        self.configs[indices] = self._initial
+        self.disks[indices] = _DARK
+        self.dones[indices] = False
+        self._legal[indices] = self._initial_legal
+        return self.observe()
+
+    def observe(self) -> np.ndarray:
+        """boards seen from the side to move
+
+        Returns:
+            np.ndarray: (B, N, N) int8, 1 for own disks and -1 for the opponent's
+        """
+        return self.configs * self.disks[:, None, None]
+
+    def legal_mask(self) -> np.ndarray:
+        """legal actions of the side to move
+
+        Returns:
+            np.ndarray: (B, N * N) bool, all False for ended games
+        """
+        return self._legal.reshape(self.num_games, -1).copy()
+
+    def random_actions(self, rng: np.random.Generator) -> np.ndarray:
+        """uniformly random legal actions
+
+        Args:
+            rng (np.random.Generator): random generator
+
+        Returns:
+            np.ndarray: (B,) flat square indices, 0 for ended games
+        """
+        legal = self._legal.reshape(self.num_games, -1)
+        # 合法手の中で乱数が最大のマスを選ぶ
+        return np.asarray(np.argmax(rng.random(legal.shape) * legal, axis=1))
+
+    def step(self, actions: np.ndarray) -> StepResult:
+        """play one action in every game
+
+        Args:
+            actions (np.ndarray): (B,) flat square indices, ignored for ended games
+
+        Raises:
+            ValueError: an action is not legal
+
+        Returns:
+            StepResult: observations, rewards, dones and scores
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        area = self.length * self.length
+        active = ~self.dones
+        # 終了したゲームの手は無視する
+        actions = np.where(active, actions, 0)
+        if ((actions < 0) | (actions >= area)).any():
+            raise ValueError("actions must be flat square indices")
+        legal = self._legal.reshape(self.num_games, area)
+        illegal = active & ~legal[np.arange(self.num_games), actions]
+        if illegal.any():
+            raise ValueError(f"illegal actions in games {np.flatnonzero(illegal)}")
+        rows = np.where(active, actions // self.length, -1)
+        batch.execute_action(self.configs, self.disks, rows, actions % self.length)
+        movers = self.disks.copy()
+        self.disks = np.where(active, -self.disks, self.disks).astype(np.int8)
+        self._legal[:] = False
+        self._legal[active] = batch.legal_mask(self.configs[active], self.disks[active])
+        # 次の手番が打てないゲームはパスして手番を戻す
+        stuck = active & ~self._legal.any(axis=(1, 2))
+        if stuck.any():
+            self.disks[stuck] = -self.disks[stuck]
+            self._legal[stuck] = batch.legal_mask(
+                self.configs[stuck], self.disks[stuck]
+            )
+        ended = stuck & ~self._legal.any(axis=(1, 2))
+        scores = np.zeros(self.num_games, dtype=np.int32)
+        rewards = np.zeros(self.num_games, dtype=np.float32)
+        if ended.any():
+            scores[ended] = self.configs[ended].sum(axis=(1, 2), dtype=np.int32)
+            rewards[ended] = np.sign(scores[ended] * movers[ended])
+            self.dones |= ended
+            if self.auto_reset:
+                self.reset(ended)
+        return StepResult(self.observe(), rewards, ended, scores)
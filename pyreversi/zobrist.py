@@ -0,0 +1,83 @@
+"""zobrist hashing
+
+Every (square, disk) pair and the light side to move get a random 64 bit key, and
+the key of a position is the xor of the keys of its disks.
+Keys are generated from a fixed seed per board length, so every process
+computes the same keys for the same position.
+"""
+from __future__ import annotations
+
+import random
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+from pyreversi import bitboard
+from pyreversi.models import Board, Disk
+
+
+class ZobristKeys(NamedTuple):
+    """zobrist keys of a board length
+
+    Attributes:
+        dark (Tuple[int, ...]): keys of dark disks per square index
+        light (Tuple[int, ...]): keys of light disks per square index
+        flip (Tuple[int, ...]): ``dark ^ light`` per square index, used to flip a disk
+        side (int): key xored when light is to move
+    """
+
+    dark: Tuple[int, ...]
+    light: Tuple[int, ...]
+    flip: Tuple[int, ...]
+    side: int
+
+
+@lru_cache(maxsize=None)
+def keys(length: int) -> ZobristKeys:
+    """zobrist keys of the board length
+
+    Args:
+        length (int): length of board
+
+    Returns:
+        ZobristKeys: keys
+    """
+    generator = random.Random(length)
+    size = length * length
+    dark = tuple(generator.getrandbits(64) for _ in range(size))
+    light = tuple(generator.getrandbits(64) for _ in range(size))
+    flip = tuple(d ^ l for d, l in zip(dark, light))
+    return ZobristKeys(dark, light, flip, generator.getrandbits(64))
+
+
+def hash_masks(dark: int, light: int, disk: Disk, length: int) -> int:
+    """zobrist key of masks
+
+    Args:
+        dark (int): dark mask
+        light (int): light mask
+        disk (Disk): side to move
+        length (int): length of board
+
+    Returns:
+        int: 64 bit key
+    """
+    table = keys(length)
+    key = table.side if disk == Disk.LIGHT else 0
+    for index in bitboard.iter_indices(dark):
+        key ^= table.dark[index]
+    for index in bitboard.iter_indices(light):
+        key ^= table.light[index]
+    return key
+
+
+def hash_board(board: Board, disk: Disk) -> int:
+    """zobrist key of board
+
+    Args:
+        board (Board): 盤の状態
+        disk (Disk): side to move
+
+    Returns:
+        int: 64 bit key
+    """
+    return hash_masks(*bitboard.to_masks(board), disk, len(board.config))
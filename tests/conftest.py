@@ -0,0 +1,74 @@
+"""helpers shared by the tests
+
+moves are drawn from a ``random.Random`` of the given seed, so the helpers
+return the same positions for a seed and leave the global ``random`` alone.
+Tests of players, which draw from the global ``random``, use ``seeded_random``.
+"""
+import random
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk
+
+
+@pytest.fixture
+def seeded_random() -> Iterator[None]:
+    """seed the global ``random`` for the test and restore its state afterwards"""
+    state = random.getstate()
+    random.seed(0)
+    yield
+    random.setstate(state)
+
+
+def _play_random(game: Game, rng: random.Random) -> None:
+    actions = sorted(game.get_legal_actions())
+    game.execute_action(rng.choice(actions) if actions else None)
+
+
+def _empties(game: Game) -> int:
+    squares = game.board.config.size
+    return squares - game.count_disk(Disk.DARK) - game.count_disk(Disk.LIGHT)
+
+
+def random_game(length: int, empties: int, seed: int = 0) -> Game:
+    """game after random moves
+
+    Args:
+        length (int): length of board
+        empties (int): play until at most this many squares are empty
+        seed (int, optional): seed of the moves. Defaults to 0.
+
+    Returns:
+        Game: the game, over if it ended before
+    """
+    rng = random.Random(seed)
+    game = Game.init_game(length)
+    while not game.is_game_over() and _empties(game) > empties:
+        _play_random(game, rng)
+    return game
+
+
+def random_positions(
+    length: int, count: int, seed: int = 0
+) -> List[Tuple[Board, Disk]]:
+    """positions of random games, a new game starts when one is over
+
+    Args:
+        length (int): length of board
+        count (int): number of positions
+        seed (int, optional): seed of the moves. Defaults to 0.
+
+    Returns:
+        List[Tuple[Board, Disk]]: boards and sides to move
+    """
+    rng = random.Random(seed)
+    positions: List[Tuple[Board, Disk]] = []
+    game = Game.init_game(length)
+    while len(positions) < count:
+        if game.is_game_over():
+            game = Game.init_game(length)
+        positions.append((game.board, game.current_disk))
+        _play_random(game, rng)
+    return positions
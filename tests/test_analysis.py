@@ -0,0 +1,109 @@
+import io
+import json
+from pathlib import Path
+from typing import List, cast
+
+import pytest
+
+from pyreversi import analysis, codec, logic, symmetry
+from pyreversi.analysis import AnalysisOptions, Item, Result
+from pyreversi.models import Board, Disk, Position
+from tests.conftest import random_positions
+
+OPTIONS = AnalysisOptions(time_limit=None, max_depth=2)
+
+
+def to_text(items: List[Item]) -> str:
+    blocks = [
+        f"{board}\n{'x' if disk == Disk.DARK else 'o'}\n" for board, disk in items
+    ]
+    return "# positions\n" + "\n".join(blocks)
+
+
+def same(left: List[Item], right: List[Item]) -> bool:
+    return all(
+        (a.config == b.config).all() and x == y for (a, x), (b, y) in zip(left, right)
+    ) and len(left) == len(right)
+
+
+def move_of(result: Result) -> Position:
+    return Position(*cast(List[int], result["move"]))
+
+
+def test_read_text() -> None:
+    items = random_positions(6, 5)
+    stream = io.BytesIO(to_text(items).encode())
+    assert same(list(analysis.read_positions(stream)), items)
+    # 手番の行は省略できる
+    board = logic.init_board(4)
+    parsed = list(analysis.iter_text_positions(f"\n\n{board}\n".splitlines()))
+    assert same(parsed, [(board, Disk.DARK)])
+    with pytest.raises(ValueError, match="line 2"):
+        list(analysis.iter_text_positions(["", "x-", "-"]))
+    with pytest.raises(ValueError, match="unknown square"):
+        list(analysis.iter_text_positions(["x?", "--"]))
+
+
+@pytest.mark.parametrize("length", [4, 5, 8])
+def test_read_binary(length: int) -> None:
+    items = random_positions(length, 5) + random_positions(6, 2)
+    data = b"".join(codec.encode(board, disk) for board, disk in items)
+    assert same(list(analysis.read_positions(io.BytesIO(data))), items)
+    assert same(list(analysis.read_positions(io.BytesIO(data), "binary")), items)
+    with pytest.raises(ValueError, match="truncated"):
+        list(analysis.read_positions(io.BytesIO(data[:-1]), "binary"))
+    with pytest.raises(ValueError):
+        analysis.read_positions(io.BytesIO(data), "csv")
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_analyze(workers: int) -> None:
+    items = random_positions(6, 7)
+    results = list(analysis.analyze(items, OPTIONS, workers, chunk_size=2, start=3))
+    assert [result["index"] for result in results] == list(range(3, 10))
+    for (board, disk), result in zip(items, results):
+        legal = logic.obtain_legal_actions(board, disk)
+        if legal:
+            assert move_of(result) in legal
+        else:
+            assert result["move"] is None
+        assert result["disk"] == ("x" if disk == Disk.DARK else "o")
+        assert result["depth"] == 2
+
+
+def test_cache_restores_moves() -> None:
+    board, disk = random_positions(8, 5)[-1]
+    options = OPTIONS._replace(max_depth=1)
+    expected = analysis.analyze_position(board, disk, options._replace(cache=False))
+    for s in range(symmetry.SYMMETRIES):
+        image = Board(symmetry.transform(board.config, s))
+        result = analysis.analyze_position(image, disk, options)
+        move = move_of(result)
+        assert move in logic.obtain_legal_actions(image, disk)
+        assert result["score"] == expected["score"]
+    stats = symmetry.shared_cache().stats()[f"analysis:{options}"]
+    assert stats.hits >= symmetry.SYMMETRIES - 1
+
+
+def test_main_resume(tmp_path: Path) -> None:
+    items = random_positions(6, 6)
+    source = tmp_path / "positions.txt"
+    source.write_text(to_text(items))
+    output = tmp_path / "results.jsonl"
+    argv = [str(source), "-o", str(output), "--workers", "0", "--depth", "2"]
+    analysis.main(argv + ["--time-limit", "0"])
+    full = output.read_text().splitlines()
+    assert [json.loads(line)["index"] for line in full] == list(range(6))
+    # 書きかけの行で中断された出力を再開する
+    output.write_text("\n".join(full[:3]) + "\n" + full[3][:10])
+    assert analysis.completed_results(str(output)) == 3
+    output.write_text("\n".join(full[:3]) + "\n" + full[3][:10])
+    analysis.main(argv + ["--time-limit", "0", "--resume"])
+    resumed = output.read_text().splitlines()
+    assert [json.loads(line)["index"] for line in resumed] == list(range(6))
+    assert [json.loads(line)["move"] for line in resumed] == [
+        json.loads(line)["move"] for line in full
+    ]
+    output.write_text(full[2] + "\n")
+    with pytest.raises(ValueError):
+        analysis.completed_results(str(output))
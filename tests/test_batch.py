@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+from pyreversi import batch, logic
+from pyreversi.models import Board, Disk, Position
+from tests.conftest import random_positions
+
+
+def test_obtain_legal_actions() -> None:
+    configs = np.stack([logic.init_board(4).config, np.zeros((4, 4), np.int8)])
+    legal, flip_counts = batch.obtain_legal_actions(configs, Disk.LIGHT)
+    assert legal.shape == (2, 4, 4)
+    assert {Position(*index) for index in np.argwhere(legal[0])} == (
+        logic.obtain_legal_actions(logic.init_board(4), Disk.LIGHT)
+    )
+    assert flip_counts[0].sum() == 4
+    assert not legal[1].any()
+
+
+def test_same_as_reference() -> None:
+    for length in [4, 6, 8]:
+        positions = random_positions(length, 60, seed=length)
+        rng = random.Random(length)
+        configs = np.stack([board.config for board, _ in positions])
+        disks = np.array([disk for _, disk in positions], dtype=np.int8)
+        legal, flip_counts = batch.obtain_legal_actions(configs, disks)
+        rows = np.full(len(positions), -1)
+        cols = np.full(len(positions), -1)
+        expected = []
+        for index, (board, disk) in enumerate(positions):
+            actions = logic.obtain_legal_actions(board, disk)
+            assert {Position(*i) for i in np.argwhere(legal[index])} == actions
+            for action in actions:
+                flipped = logic.execute_action(board, disk, action)
+                assert flip_counts[index][action] == (
+                    logic.count_disk(flipped, disk) - logic.count_disk(board, disk) - 1
+                )
+            if actions:
+                action = rng.choice(sorted(actions))
+                rows[index], cols[index] = action
+                expected.append(logic.execute_action(board, disk, action))
+            else:
+                expected.append(board)
+        counts = batch.execute_action(configs, disks, rows, cols)
+        for index, board in enumerate(expected):
+            assert Board(configs[index]) == board
+            if rows[index] >= 0:
+                assert counts[index] == flip_counts[index][rows[index], cols[index]]
+            else:
+                assert counts[index] == 0
@@ -0,0 +1,111 @@
+import random
+
+import numpy as np
+import pytest
+
+from pyreversi import bitboard, logic
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk
+from pyreversi.players import GreedyPlayer, RandomPlayer
+
+
+def test_masks_round_trip() -> None:
+    config = np.array(
+        [
+            [1, -1, -1, 0],
+            [0, 1, -1, 0],
+            [0, 0, 0, 0],
+            [0, 1, -1, 0],
+        ],
+        dtype=np.int8,
+    )
+    dark, light = bitboard.to_masks(Board(config))
+    assert dark == 1 << 0 | 1 << 5 | 1 << 13
+    assert light == 1 << 1 | 1 << 2 | 1 << 6 | 1 << 14
+    assert bitboard.to_board(dark, light, 4) == Board(config)
+    assert bitboard.popcount(dark) == 3
+    assert list(bitboard.iter_indices(dark)) == [0, 5, 13]
+
+
+@pytest.mark.parametrize("length", [4, 6, 8, 10])
+def test_init_board(length: int) -> None:
+    assert bitboard.init_board(length) == logic.init_board(length)
+
+
+def test_no_wrap_around() -> None:
+    # 行の端から次の行へ回り込んで裏返してはいけない
+    config = np.array(
+        [
+            [0, 0, 0, 1],
+            [-1, -1, 0, 0],
+            [0, 0, 0, 0],
+            [0, 0, 0, 0],
+        ],
+        dtype=np.int8,
+    )
+    board = Board(config)
+    assert bitboard.obtain_legal_actions(board, Disk.DARK) == frozenset()
+    assert bitboard.obtain_legal_actions(board, Disk.DARK) == (
+        logic.obtain_legal_actions(board, Disk.DARK)
+    )
+
+
+@pytest.mark.parametrize("length", [4, 5, 6, 8, 10, 12, 16])
+def test_same_as_reference(length: int) -> None:
+    random.seed(length)
+    for _ in range(3):
+        board = logic.init_board(length)
+        disk = Disk.DARK
+        passed = False
+        while True:
+            actions = logic.obtain_legal_actions(board, disk)
+            assert bitboard.obtain_legal_actions(board, disk) == actions
+            assert bitboard.count_disk(board, disk) == logic.count_disk(board, disk)
+            if not actions:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                action = random.choice(sorted(actions))
+                board_next = logic.execute_action(board, disk, action)
+                assert bitboard.execute_action(board, disk, action) == board_next
+                board = board_next
+            disk = Disk(disk.reverse())
+
+
+def test_set_backend() -> None:
+    assert "bitboard" in logic.available_backends()
+    with pytest.raises(ValueError):
+        logic.set_backend("unknown")
+    logic.set_backend("bitboard")
+    try:
+        assert logic.get_backend() == "bitboard"
+        game = Game.init_game(6)
+        players = [RandomPlayer(), GreedyPlayer()]
+        turn = 0
+        while not game.is_game_over():
+            game.execute_action(players[turn % 2].play(game))
+            turn += 1
+        assert game.count_disk(Disk.DARK) + game.count_disk(Disk.LIGHT) <= 36
+    finally:
+        logic.set_backend("python")
+    assert logic.get_backend() == "python"
+
+
+@pytest.mark.parametrize("length", [4, 8, 10])
+def test_legal_flips(length: int) -> None:
+    random.seed(length)
+    game = Game.init_game(length)
+    while not game.is_game_over():
+        for disk in (Disk.DARK, Disk.LIGHT):
+            expected = logic.obtain_legal_flips(game.board, disk)
+            assert bitboard.obtain_legal_flips(game.board, disk) == expected
+            some = list(game.board)[::3]
+            assert bitboard.obtain_legal_flips(game.board, disk, some) == {
+                position: flips
+                for position, flips in expected.items()
+                if position in some
+            }
+        actions = sorted(game.get_legal_actions())
+        game.execute_action(random.choice(actions) if actions else None)
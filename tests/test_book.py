@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pyreversi import symmetry
+from pyreversi.book import BookBuilder, BookPlayer, OpeningBook, main, position_key
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk, Position
+from pyreversi.players import GreedyPlayer, make_player
+from pyreversi.records import RecordWriter
+from pyreversi.tournament import play_game
+
+
+def test_position_key() -> None:
+    game = Game.init_game(8)
+    game.execute_action(Position(2, 3))
+    key, _ = position_key(game.board, game.current_disk)
+    for s in range(symmetry.SYMMETRIES):
+        board = Board(symmetry.transform(game.board.config, s).copy())
+        assert position_key(board, game.current_disk)[0] == key
+    assert position_key(game.board, Disk.DARK)[0] != key
+
+
+def test_book(tmp_path: Path) -> None:
+    builder = BookBuilder()
+    first = Game.init_game(8)
+    # 対称な4つの初手
+    for action, score in [
+        (Position(2, 3), 10),
+        (Position(3, 2), -4),
+        (Position(4, 5), 0),
+        (Position(5, 4), 6),
+    ]:
+        builder.add(first.board, first.current_disk, action, score)
+    second = Game.init_game(8)
+    second.execute_action(Position(2, 3))
+    builder.add(second.board, second.current_disk, Position(2, 2), -3)
+    builder.add(second.board, second.current_disk, Position(2, 4), 5)
+    builder.add(second.board, second.current_disk, Position(2, 4), 1)
+    assert len(builder) == 3
+
+    path = str(tmp_path / "book")
+    builder.save(path)
+    book = OpeningBook(path)
+    assert isinstance(book.entries, np.memmap)
+    assert len(book) == 3
+    assert np.all(np.diff(book.entries["key"].astype(np.float64)) >= 0)
+
+    (move,) = book.lookup(first.board, first.current_disk)
+    assert move.action in first.get_legal_actions()
+    assert (move.games, move.wins, move.draws, move.score) == (4, 2, 1, 12)
+
+    # 対称な局面でも元の盤の手が返る
+    board = Board(symmetry.transform(second.board.config, 5).copy())
+    moves = book.lookup(board, second.current_disk)
+    game = Game(board, second.current_disk)
+    assert all(move.action in game.get_legal_actions() for move in moves)
+    assert sorted(move.games for move in moves) == [1, 2]
+    assert book.lookup(Game.init_game(6).board, Disk.DARK) == []
+
+    # 対称な局面はshared_cacheから引かれ，元の盤の手に戻される
+    for s in range(symmetry.SYMMETRIES):
+        board = Board(symmetry.transform(second.board.config, s).copy())
+        game = Game(board, second.current_disk)
+        moves = book.lookup(board, second.current_disk)
+        assert all(move.action in game.get_legal_actions() for move in moves)
+    assert symmetry.shared_cache().stats()[book.namespace].hits >= 7
+
+    player = BookPlayer(inner=GreedyPlayer(), book=book)
+    player.set_disk(Disk.LIGHT)
+    assert player.inner.disk == Disk.LIGHT
+    best = player.play(second)
+    assert best is not None and second.get_flips(best) and best.row == 2
+    assert player.play(Game.init_game(6)) in Game.init_game(6).get_legal_actions()
+    assert BookPlayer(inner=GreedyPlayer(), book=book, min_count=5).play(first)
+
+
+def test_main(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    records = str(tmp_path / "games.rec")
+    with RecordWriter(records) as writer:
+        for _ in range(5):
+            result = play_game(make_player("random"), make_player("random"), 6)
+            writer.write(6, result.actions, result.difference)
+    output = str(tmp_path / "book.npy")
+    main([records, output, "--plies", "4"])
+    assert "moves" in capsys.readouterr().out
+    book = OpeningBook(output)
+    (move,) = book.lookup(Game.init_game(6).board, Disk.DARK)
+    assert move.games == 5
+    player = make_player(f"book:path={output},inner=greedy")
+    assert isinstance(player, BookPlayer)
+
+
+def test_illegal_book_move() -> None:
+    # keyの衝突などで合法でない手が定石にあればinnerに任せる
+    game = Game.init_game(6)
+    builder = BookBuilder()
+    builder.add(game.board, game.current_disk, Position(0, 0), 10)
+    book = OpeningBook(builder.build())
+    (move,) = book.lookup(game.board, game.current_disk)
+    assert not game.is_legal_action(move.action)
+    player = BookPlayer(inner=GreedyPlayer(), book=book)
+    player.set_disk(Disk.DARK)
+    assert player.play(game) in game.get_legal_actions()
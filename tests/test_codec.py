@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+import pytest
+
+from pyreversi import codec, symmetry
+from pyreversi.game import Game
+from pyreversi.logic import execute_action, init_board
+from pyreversi.models import Disk, Position
+
+
+def test_encode_decode() -> None:
+    rng = random.Random(0)
+    for length in [4, 6, 8, 10]:
+        game = Game.init_game(length)
+        positions = []
+        while not game.is_game_over():
+            positions.append((game.board, game.current_disk))
+            data = codec.encode_game(game)
+            assert len(data) == codec.record_size(length)
+            decoded = codec.decode_game(data)
+            assert decoded.board == game.board
+            assert decoded.current_disk == game.current_disk
+            actions = sorted(game.get_legal_actions())
+            game.execute_action(rng.choice(actions) if actions else None)
+        data = codec.encode_positions(positions)
+        assert len(data) == codec.record_size(length) * len(positions)
+        assert codec.decode_positions(data, length) == positions
+        assert codec.encode_positions([]) == b""
+        assert codec.decode_positions(b"", length) == []
+    assert codec.record_size(8) == 17
+    assert codec.record_size(6) == 9
+    with pytest.raises(ValueError):
+        codec.decode_many(b"\x00" * 16, 8)
+    with pytest.raises(ValueError):
+        codec.decode_many(codec.encode(init_board(6), Disk.DARK), 8)
+
+
+def test_canonical() -> None:
+    board = execute_action(init_board(8), Disk.DARK, Position(2, 3))
+    data, s = codec.canonical(board, Disk.LIGHT)
+    for other in [Position(3, 2), Position(4, 5), Position(5, 4)]:
+        symmetric = execute_action(init_board(8), Disk.DARK, other)
+        assert symmetric != board
+        assert codec.canonical(symmetric, Disk.LIGHT)[0] == data
+    canonical_board, disk = codec.decode(data)
+    assert disk == Disk.LIGHT
+    assert np.array_equal(symmetry.transform(board.config, s), canonical_board.config)
+    assert codec.canonical(board, Disk.DARK)[0] != data
@@ -0,0 +1,54 @@
+from pyreversi.endgame import EndgamePlayer, solve
+from pyreversi.models import Disk
+from pyreversi.mutable import MutableGame
+from pyreversi.players import RandomPlayer
+from tests.conftest import random_game
+
+
+def _minimax(game: MutableGame) -> int:
+    moves = game.legal_moves()
+    if not moves:
+        if game.is_game_over():
+            return game.count_disk(game.current_disk) - game.count_disk(
+                Disk(-game.current_disk)
+            )
+        game.make_move_mask(0)
+        score = -_minimax(game)
+        game.unmake_move()
+        return score
+    best = -game.length * game.length
+    for index in range(game.length * game.length):
+        if moves >> index & 1:
+            game.make_move_mask(1 << index)
+            best = max(best, -_minimax(game))
+            game.unmake_move()
+    return best
+
+
+def test_solve() -> None:
+    for length, empties in [(4, 8), (6, 7), (8, 7)]:
+        for seed in range(3):
+            game = random_game(length, empties, seed)
+            result = solve(game)
+            assert result.score == _minimax(MutableGame.from_game(game))
+            # 読み筋をたどると評価値どおりに終局する
+            disk = game.current_disk
+            for action in result.line:
+                game.execute_action(action)
+            assert game.is_game_over()
+            assert game.count_disk(disk) - game.count_disk(Disk(-disk)) == result.score
+
+
+def test_endgame_player() -> None:
+    player = EndgamePlayer(RandomPlayer(), threshold=8)
+    game = random_game(6, 12, seed=1)
+    assert player.play(game) is not None or not game.get_legal_actions()
+    # 空きマスが多い間はinnerが打ち，解かない
+    skipped = player.last_result
+    assert skipped is None
+    game = random_game(6, 8, seed=1)
+    action = player.play(game)
+    result = player.last_result
+    assert result is not None
+    if result.line:
+        assert action == result.line[0]
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pyreversi import symmetry
+from pyreversi.evaluation import PatternEvaluator, features, layout, phases_of
+from pyreversi.game import Game
+from pyreversi.models import Disk
+from pyreversi.mutable import MutableGame
+from pyreversi.search import AlphaBetaPlayer
+from tests.conftest import random_positions
+
+
+@pytest.mark.parametrize("length", [4, 6, 8, 10])
+def test_layout(length: int) -> None:
+    table = layout(length)
+    assert table.names == ("edge", "edge2", "diagonal", "corner")
+    assert table.features == sum(table.sizes) + 3
+    assert np.all(table.squares <= length * length)
+    # 像は全て8つの対称変換で閉じている
+    images = {tuple(row[row < length * length]) for row in table.squares}
+    assert len(images) == len(table.squares)
+
+
+@pytest.mark.parametrize("length", [4, 6, 8])
+def test_evaluate(length: int) -> None:
+    rng = np.random.default_rng(length)
+    weights = rng.standard_normal((3, layout(length).features)).astype(np.float32)
+    evaluator = PatternEvaluator(weights, length, scale=1000.0)
+    positions = random_positions(length, 60, seed=length)
+    configs = np.stack([board.config for board, _ in positions])
+    disks = np.array([disk for _, disk in positions], dtype=np.int8)
+    scores = evaluator.evaluate_batch(configs, disks)
+    assert scores.shape == (len(positions),)
+    for (board, disk), score in zip(positions, scores):
+        game = MutableGame(board, disk)
+        assert abs(evaluator(game.player, game.opponent, length) - score * 1000) <= 2
+    # 対称な局面は同じ評価値
+    for s in range(symmetry.SYMMETRIES):
+        transformed = symmetry.transform(configs, s)
+        np.testing.assert_allclose(
+            evaluator.evaluate_batch(transformed, disks), scores, rtol=1e-4, atol=1e-3
+        )
+
+    indices, numeric = features(configs, disks)
+    assert indices.shape == (len(positions), len(layout(length).squares))
+    assert np.all(numeric[:, 2] == 1)
+    # 石が多いほど後の段階になる
+    phases = phases_of(configs, 3)
+    filled = np.count_nonzero(configs.reshape(len(configs), -1), axis=1)
+    assert np.all(np.diff(phases[np.argsort(filled)]) >= 0)
+    assert phases.min() == 0 and phases.max() == 2
+
+
+def test_initial(tmp_path: Path) -> None:
+    evaluator = PatternEvaluator.initial(8)
+    game = Game.init_game(8)
+    config = game.board.config.copy()
+    assert evaluator.evaluate_batch(config[None], Disk.DARK)[0] == 0
+    config[0, 0] = Disk.DARK
+    corner = evaluator.evaluate_batch(config[None], Disk.DARK)[0]
+    assert corner == pytest.approx(3.0, abs=0.5)
+    assert evaluator.evaluate_batch(config[None], Disk.LIGHT)[0] == pytest.approx(
+        -corner
+    )
+
+    path = str(tmp_path / "weights")
+    evaluator.save(path)
+    loaded = PatternEvaluator.load(path)
+    np.testing.assert_array_equal(loaded.weights, evaluator.weights)
+    assert loaded.length == 8
+    with pytest.raises(ValueError):
+        PatternEvaluator(evaluator.weights, 6)
+
+    player = AlphaBetaPlayer(time_limit=None, max_depth=2, evaluator=path)
+    assert player.play(game) in game.get_legal_actions()
+
+
+def test_length_mismatch() -> None:
+    evaluator = PatternEvaluator.initial(8)
+    game = MutableGame(Game.init_game(6).board, Disk.DARK)
+    with pytest.raises(ValueError, match="length 8"):
+        evaluator(game.player, game.opponent, 6)
+    with pytest.raises(ValueError):
+        evaluator.evaluate_batch(Game.init_game(6).board.config[None], Disk.DARK)
@@ -1,8 +1,19 @@
+import importlib
+import random
+from typing import Dict, Tuple, cast
+
 import numpy as np
 import pytest
 
+from pyreversi import logic
 from pyreversi.game import Game, IllegalActionError
-from pyreversi.logic import init_board, obtain_legal_actions
+from pyreversi.logic import (
+    available_backends,
+    count_disk,
+    execute_action,
+    init_board,
+    obtain_legal_actions,
+)
 from pyreversi.models import Board, Disk, Position
 
 
@@ -72,3 +83,58 @@ def test_execute_action() -> None:
     assert game.board == Board(after_config)
     assert game.get_legal_actions() == frozenset()
     assert game.is_game_over() is True
+
+
+def test_incremental_state() -> None:
+    random.seed(0)
+    for length in [4, 6, 8]:
+        game = Game.init_game(length)
+        while not game.is_game_over():
+            expected = Game(game.board, game.current_disk)
+            assert game.get_legal_actions() == obtain_legal_actions(
+                game.board, game.current_disk
+            )
+            assert game.get_legal_actions() == expected.get_legal_actions()
+            assert game.is_game_over() == expected.is_game_over()
+            for disk in [Disk.DARK, Disk.LIGHT]:
+                assert game.count_disk(disk) == count_disk(game.board, disk)
+            for action in game.get_legal_actions():
+                assert execute_action(game.board, game.current_disk, action) == Board(
+                    _flipped(game, action)
+                )
+            actions = sorted(game.get_legal_actions())
+            game.execute_action(random.choice(actions) if actions else None)
+
+
+def _flipped(game: Game, action: Position) -> np.ndarray:
+    config = game.board.config.copy()
+    for position in (action,) + game.get_flips(action):
+        config[position] = game.current_disk
+    return config
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_follows_backend(backend: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    module = importlib.import_module(logic._BACKENDS[backend])
+    calls = []
+    original = module.obtain_legal_flips
+
+    def spy(*args: object) -> Dict[Position, Tuple[Position, ...]]:
+        calls.append(args)
+        return cast(Dict[Position, Tuple[Position, ...]], original(*args))
+
+    monkeypatch.setattr(module, "obtain_legal_flips", spy)
+    rng = random.Random(1)
+    reference = Game.init_game(6)
+    with logic.use_backend(backend):
+        game = Game.init_game(6)
+        while not game.is_game_over():
+            assert game.board == reference.board
+            assert game.get_legal_actions() == reference.get_legal_actions()
+            for action in game.get_legal_actions():
+                assert game.get_flips(action) == reference.get_flips(action)
+            actions = sorted(game.get_legal_actions())
+            choice = rng.choice(actions) if actions else None
+            game.execute_action(choice)
+            reference.execute_action(choice)
+    assert calls
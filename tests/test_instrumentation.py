@@ -0,0 +1,128 @@
+import urllib.request
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+import pytest
+
+from pyreversi import instrumentation
+from pyreversi.game import Game
+from pyreversi.models import Position
+from pyreversi.players import GreedyPlayer, RandomPlayer
+from pyreversi.search import AlphaBetaPlayer
+from pyreversi.tournament import play_game
+
+
+@pytest.fixture
+def enabled() -> Iterator[None]:
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        yield
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+
+def test_disabled() -> None:
+    instrumentation.reset()
+    play = RandomPlayer.play
+    play_game(RandomPlayer(), GreedyPlayer(), 4)
+    assert RandomPlayer.play is play
+    assert instrumentation.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_game(enabled: None) -> None:
+    game = Game.init_game(8)
+    game.execute_action(Position(2, 3))
+    counters = instrumentation.snapshot()["counters"]
+    assert counters["game_actions_total"] == 1
+    assert counters["game_board_copies_total"] == 1
+    assert counters["game_flips_total"] == 1
+    assert counters["game_square_updates_total"] >= 2
+    histogram = instrumentation.snapshot()["histograms"]["game_execute_action_seconds"]
+    assert histogram["count"] == 1 and histogram["sum"] > 0
+
+
+def test_players(enabled: None) -> None:
+    np.random.seed(0)
+
+    class Subclass(RandomPlayer):
+        def play(self, game: Game) -> Position:
+            return super().play(game)  # type: ignore
+
+    # 有効な間に定義したクラスも包まれる
+    assert hasattr(Subclass.play, "__wrapped__")
+    play_game(Subclass(), AlphaBetaPlayer(time_limit=None, max_depth=1), 4)
+    snapshot = instrumentation.snapshot()
+    histograms = snapshot["histograms"]
+    counters = snapshot["counters"]
+    assert histograms['player_play_seconds{player="Subclass"}']["count"] >= 1
+    assert histograms['player_play_seconds{player="AlphaBetaPlayer"}']["count"] >= 1
+    assert counters['player_search_nodes_total{player="AlphaBetaPlayer"}'] > 0
+
+    instrumentation.disable()
+    assert not hasattr(Subclass.play, "__wrapped__")
+
+
+def test_stale_result(enabled: None) -> None:
+    class Result(NamedTuple):
+        nodes: int
+
+    class Searcher(RandomPlayer):
+        def __init__(self) -> None:
+            super().__init__()
+            self.last_result = Result(5)
+            self.search = False
+
+        def play(self, game: Game) -> Optional[Position]:
+            if self.search:
+                self.last_result = Result(7)
+            return super().play(game)
+
+    player = Searcher()
+    game = Game.init_game(4)
+    key = 'player_search_nodes_total{player="Searcher"}'
+    # last_resultが変わらない手は数えない
+    player.play(game)
+    player.play(game)
+    assert key not in instrumentation.snapshot()["counters"]
+    player.search = True
+    player.play(game)
+    player.play(game)
+    assert instrumentation.snapshot()["counters"][key] == 14
+
+
+def test_histogram() -> None:
+    histogram = instrumentation.Histogram()
+    for seconds in [0.0, 1e-6, 1.5e-6, 1e-3, 1e6]:
+        histogram.observe(seconds)
+    assert histogram.counts[0] == 2
+    assert histogram.counts[1] == 1
+    assert histogram.counts[10] == 1
+    assert histogram.counts[-1] == 1
+    bounds = instrumentation.Histogram.bounds()
+    assert bounds[0] == 1e-6 and bounds[10] > 1e-3 > bounds[9]
+
+
+def test_prometheus(enabled: None) -> None:
+    instrumentation.count("requests_total", 2, player="a")
+    instrumentation.observe("latency_seconds", 3e-6)
+    text = instrumentation.prometheus_text()
+    assert "# TYPE pyreversi_requests_total counter" in text
+    assert 'pyreversi_requests_total{player="a"} 2' in text
+    assert "# TYPE pyreversi_latency_seconds histogram" in text
+    assert 'pyreversi_latency_seconds_bucket{le="2e-06"} 0' in text
+    assert 'pyreversi_latency_seconds_bucket{le="4e-06"} 1' in text
+    assert 'pyreversi_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "pyreversi_latency_seconds_count 1" in text
+
+    server = instrumentation.serve(0, "127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.read().decode() == instrumentation.prometheus_text()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+    finally:
+        server.shutdown()
+        server.server_close()
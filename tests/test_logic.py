@@ -1,13 +1,19 @@
+import random
+import sys
+from typing import Set
+
 import numpy as np
+import pytest
 
 from pyreversi.logic import (
     _increment_search,
     _is_legal_action,
+    _rays,
     execute_action,
     init_board,
     obtain_legal_actions,
 )
-from pyreversi.models import Board, Direction, Disk, Position
+from pyreversi.models import _DIRECTIONS, Board, Direction, Disk, Position
 
 
 def test_init_board() -> None:
@@ -109,3 +115,83 @@ def test_execute_action() -> None:
         dtype=np.int8,
     )
     assert new_board == Board(after_config)
+
+
+def test_rays() -> None:
+    rays = _rays(4)
+    assert len(rays) == 16
+    # 角のマスからは3方向
+    assert set(rays[0]) == {(1, 2, 3), (4, 8, 12), (5, 10, 15)}
+    assert set(rays[5]) == {
+        (0,),
+        (1,),
+        (2,),
+        (4,),
+        (6, 7),
+        (8,),
+        (9, 13),
+        (10, 15),
+    }
+    assert _rays(4) is rays
+
+
+def test_increment_search_long_line() -> None:
+    # 再帰の上限より長い列でも探せる
+    length = sys.getrecursionlimit() + 8
+    config = np.zeros((length, length), dtype=np.int8)
+    config[0] = Disk.LIGHT
+    config[0, 0] = Disk.DARK
+    board = Board(config)
+    start = Position(0, length - 1)
+    assert _increment_search(board, Disk.DARK, start, Direction(0, -1)) == (
+        True,
+        Position(0, 0),
+    )
+    assert _increment_search(board, Disk.DARK, start, Direction(0, 1)) == (False, None)
+
+
+def naive_flips(board: Board, disk: Disk, position: Position) -> Set[Position]:
+    """裏返る石を方向ごとに1マスずつ調べる"""
+    if board.value(position) != 0:
+        return set()
+    flipped = set()
+    for direction in _DIRECTIONS:
+        neighbor = position + direction
+        if not board.is_in_range(neighbor) or board.value(neighbor) != -disk:
+            continue
+        found, end = _increment_search(board, disk, neighbor, direction)
+        if found:
+            assert end is not None
+            while neighbor != end:
+                flipped.add(neighbor)
+                neighbor = neighbor + direction
+    return flipped
+
+
+@pytest.mark.parametrize("length", [4, 5, 6, 8, 10, 12, 14, 16])
+def test_same_as_naive_scan(length: int) -> None:
+    rng = random.Random(length)
+    board = init_board(length)
+    disk = Disk.DARK
+    positions = [Position(row, col) for row in range(length) for col in range(length)]
+    passed = False
+    while True:
+        flips = {position: naive_flips(board, disk, position) for position in positions}
+        actions = obtain_legal_actions(board, disk)
+        assert actions == {position for position, flip in flips.items() if flip}
+        if not actions:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            action = rng.choice(sorted(actions))
+            new_board = execute_action(board, disk, action)
+            changed = {
+                position
+                for position in positions
+                if new_board.value(position) != board.value(position)
+            }
+            assert changed == flips[action] | {action}
+            board = new_board
+        disk = Disk(disk.reverse())
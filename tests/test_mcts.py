@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pyreversi import bitboard
+from pyreversi.game import Game
+from pyreversi.mcts import MCTS, MCTSPlayer, batch_playout, playout
+from pyreversi.models import Board, Disk, Position
+from pyreversi.mutable import MutableGame
+from pyreversi.players import RandomPlayer, make_player
+from pyreversi.tournament import play_game
+
+
+def test_playout() -> None:
+    np.random.seed(0)
+    player, opponent = bitboard.initial_masks(4)
+    for difference in [playout(player, opponent, 4) for _ in range(20)]:
+        assert -16 <= difference <= 16
+    differences = batch_playout(player, opponent, 4, 20)
+    assert differences.shape == (20,)
+    assert np.all(np.abs(differences) <= 16)
+
+    # 終局している局面
+    full = (1 << 16) - 1
+    assert playout(full & ~1, 1, 4) == 14
+    assert batch_playout(1, full & ~1, 4, 2).tolist() == [-14, -14]
+
+
+def test_mcts_finds_win() -> None:
+    # 黒が(0,0)に打つと全て黒になる
+    board = Board(
+        np.array(
+            [[0, -1, 1, 0], [-1, -1, 0, 0], [1, 0, 1, 0], [0, 0, 0, 0]],
+            dtype=np.int8,
+        )
+    )
+    game = Game(board, Disk.DARK)
+    for rollouts in [1, 4]:
+        player = MCTSPlayer(playouts=300, rollouts=rollouts)
+        assert player.play(game) == Position(0, 0)
+        assert player.last_result is not None
+        assert player.last_result.win_rate > 0.9
+        assert player.last_result.playouts >= 300
+
+
+def test_tree_reuse() -> None:
+    game = Game.init_game(6)
+    player = MCTSPlayer(playouts=200)
+    action = player.play(game)
+    game.execute_action(action)
+    game.execute_action(RandomPlayer().play(game))
+    mutable = MutableGame.from_game(game)
+    mcts = player.mcts
+    assert mcts.root is not None
+    child = [
+        node
+        for node in mcts.root.children
+        if (node.player, node.opponent) == (mutable.player, mutable.opponent)
+    ]
+    visits = child[0].visits if child else 0
+    player.play(game)
+    assert player.last_result is not None
+    # 再利用した部分木の訪問回数も含まれる
+    assert sum(player.last_result.visits.values()) >= visits + 199
+
+    mcts = MCTS()
+    root = mcts.set_root(*bitboard.initial_masks(4), 4)
+    assert mcts.search(time_limit=0.05) > 0
+    assert mcts.set_root(root.player, root.opponent, 4) is root
+    assert mcts.set_root(root.opponent, root.player, 4) is not root
+
+
+def test_play_game() -> None:
+    np.random.seed(1)
+    result = play_game(MCTSPlayer(playouts=20), MCTSPlayer(time_limit=0.01), 4)
+    assert Game.init_game(4).board.config.size >= abs(result.difference)
+    assert isinstance(make_player("mcts:playouts=10,workers=0"), MCTSPlayer)
+    with pytest.raises(ValueError):
+        MCTSPlayer(playouts=None)
+
+
+def test_root_parallel() -> None:
+    player = MCTSPlayer(playouts=200, workers=2)
+    try:
+        game = Game.init_game(4)
+        action = player.play(game)
+        assert action in game.get_legal_actions()
+        assert player.last_result is not None
+        assert player.last_result.playouts == 200
+    finally:
+        player.close()
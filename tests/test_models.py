@@ -2,7 +2,7 @@ import numpy as np
 import pytest
 from numpy import array
 
-from pyreversi.models import Board, Direction, Disk, Position, Square
+from pyreversi.models import Board, Direction, Disk, Position, Square, board_positions
 
 
 def test_disk() -> None:
@@ -65,6 +65,8 @@ def test_board() -> None:
         np.ones((4, 4), dtype=np.int8)
     )
     assert str(board) == config_str
+    assert hash(board) == hash(Board(config.astype(np.int8)))
+    assert len({board, Board(config.astype(np.int8))}) == 1
     # pylint: disable=eval-used
     assert board == eval(repr(board))
     assert board[Position(0, 0)] == Square.NULL
@@ -80,3 +82,32 @@ def test_board() -> None:
     with pytest.raises(IndexError):
         # pylint: disable=expression-not-assigned
         board[Position(-1, -1)]
+
+
+def test_reversible_hash() -> None:
+    assert len({Disk.DARK, Disk.DARK, Disk.LIGHT}) == 2
+    assert {Disk.DARK: "x"}[Disk.DARK] == "x"
+    assert hash(Square.DARK) == hash(Disk.DARK)
+    # Reversible同士でなければ等しくない
+    assert Disk.DARK != Square.NULL
+    assert not Disk.DARK.__eq__(1)
+
+
+def test_board_fast_paths() -> None:
+    config = np.zeros((4, 4), dtype=np.int8)
+    config[1][2] = Square.DARK
+    config[3][0] = Square.LIGHT
+    board = Board(config)
+    assert list(board) == [Position(row, col) for row in range(4) for col in range(4)]
+    assert list(board) == list(board_positions(4))
+    assert board_positions(4) is board_positions(4)
+    assert board.cells == tuple(config.ravel().tolist())
+    assert board.value(Position(1, 2)) == 1
+    assert board.value(Position(3, 0)) == -1
+    assert board[Position(3, 0)] is Square.LIGHT
+    for position in board:
+        assert board.value(position) == int(board[position])
+    with pytest.raises(IndexError):
+        board.value(Position(4, 0))
+    with pytest.raises(TypeError):
+        board.value((0, 0))
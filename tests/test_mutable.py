@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from pyreversi.game import Game, IllegalActionError
+from pyreversi.models import Disk, Position
+from pyreversi.mutable import MutableGame
+
+
+def test_make_unmake_move() -> None:
+    random.seed(0)
+    for length in [4, 6, 8]:
+        game = Game.init_game(length)
+        mutable = MutableGame.from_game(game)
+        boards = [game.board]
+        while not game.is_game_over():
+            assert mutable.get_legal_actions() == game.get_legal_actions()
+            assert not mutable.is_game_over()
+            actions = sorted(game.get_legal_actions())
+            action = random.choice(actions) if actions else None
+            game.execute_action(action)
+            mutable.make_move(action)
+            assert mutable.board == game.board
+            assert mutable.current_disk == game.current_disk
+            for disk in [Disk.DARK, Disk.LIGHT]:
+                assert mutable.count_disk(disk) == game.count_disk(disk)
+            boards.append(game.board)
+        assert mutable.is_game_over()
+        assert mutable.ply == len(boards) - 1
+        while mutable.ply:
+            boards.pop()
+            mutable.unmake_move()
+            assert mutable.board == boards[-1]
+        assert mutable.current_disk == Disk.DARK
+        with pytest.raises(IndexError):
+            mutable.unmake_move()
+
+
+def test_illegal_move() -> None:
+    mutable = MutableGame.from_game(Game.init_game(4))
+    with pytest.raises(IllegalActionError):
+        mutable.make_move(None)
+    with pytest.raises(IllegalActionError):
+        mutable.make_move(Position(0, 0))
+    with pytest.raises(IllegalActionError):
+        mutable.make_move(Position(0, 4))
+    mutable.make_move(Position(0, 1))
+    assert mutable.to_game().board == mutable.board
+    assert mutable.count_empty() == 11
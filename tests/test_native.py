@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+import pytest
+
+from pyreversi import logic, native
+from pyreversi.game import Game
+from pyreversi.models import Disk
+from pyreversi.players import RandomPlayer
+
+# numbaがなければkernelはPythonのまま動くので，同じテストで確かめられる
+
+
+@pytest.mark.parametrize("length", [3, 4, 8])
+def test_ray_table(length: int) -> None:
+    rays, lengths = native.ray_table(length)
+    for square, square_rays in enumerate(logic._rays(length)):
+        assert lengths[square].sum() == sum(len(ray) for ray in square_rays)
+        for direction, ray in enumerate(square_rays):
+            assert tuple(rays[square, direction, : len(ray)]) == ray
+    assert native.ray_table(length)[0] is rays
+
+
+@pytest.mark.parametrize("length", [4, 5, 6, 8, 10])
+def test_same_as_reference(length: int) -> None:
+    rng = random.Random(length)
+    board = logic.init_board(length)
+    assert native.init_board(length) == board
+    disk = Disk.DARK
+    passed = False
+    while True:
+        actions = logic.obtain_legal_actions(board, disk)
+        assert native.obtain_legal_actions(board, disk) == actions
+        assert native.count_disk(board, disk) == logic.count_disk(board, disk)
+        flips = logic.obtain_legal_flips(board, disk)
+        assert native.obtain_legal_flips(board, disk) == flips
+        some = list(board)[1::2]
+        assert native.obtain_legal_flips(board, disk, some) == {
+            position: flipped for position, flipped in flips.items() if position in some
+        }
+        if not actions:
+            if passed:
+                break
+            passed = True
+        else:
+            passed = False
+            action = rng.choice(sorted(actions))
+            board_next = logic.execute_action(board, disk, action)
+            assert native.execute_action(board, disk, action) == board_next
+            board = board_next
+        disk = Disk(disk.reverse())
+
+
+def test_flip_illegal() -> None:
+    board = logic.init_board(4)
+    cells = board.config.ravel().copy()
+    tables = native.ray_table(4)
+    # 置いても挟めないマスと，空でないマス
+    assert native.flip(cells, int(Disk.DARK), 0, *tables) == 0
+    assert native.flip(cells, int(Disk.DARK), 5, *tables) == 0
+    assert (cells == board.config.ravel()).all()
+    assert native.flip(cells, int(Disk.DARK), 4, *tables) == 1
+
+
+def test_auto_backend() -> None:
+    with logic.use_backend("auto"):
+        assert logic.get_backend() == ("native" if native.COMPILED else "python")
+        random.seed(0)
+        game = Game.init_game(6)
+        player = RandomPlayer()
+        while not game.is_game_over():
+            game.execute_action(player.play(game))
+    assert logic.get_backend() == "python"
+
+
+@pytest.mark.skipif(native.COMPILED, reason="numba is installed")
+def test_native_needs_numba() -> None:
+    assert "native" not in logic.available_backends()
+    with pytest.raises(ValueError, match="numba"):
+        logic.set_backend("native")
+    assert logic.get_backend() == "python"
+
+
+@pytest.mark.skipif(not native.COMPILED, reason="numba is not installed")
+def test_native_backend() -> None:
+    assert "native" in logic.available_backends()
+    with logic.use_backend("native"):
+        board = logic.init_board(8)
+        actions = logic.obtain_legal_actions(board, Disk.DARK)
+        assert len(actions) == 4
+        config = np.asarray(logic.execute_action(board, Disk.DARK, min(actions)).config)
+        assert np.count_nonzero(config == int(Disk.DARK)) == 4
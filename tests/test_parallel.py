@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from pyreversi.game import Game
+from pyreversi.parallel import (
+    ParallelPlayer,
+    ParallelSearch,
+    SharedTranspositionTable,
+    benchmark_positions,
+    measure_scaling,
+)
+from pyreversi.players import make_player
+from pyreversi.search import AlphaBetaSearch
+from pyreversi.transposition import Bound
+
+
+def test_shared_table() -> None:
+    table = SharedTranspositionTable(1 << 10)
+    other = SharedTranspositionTable(1 << 10, name=table.name)
+    try:
+        assert len(table) == len(other) == 1 << 10
+        table.store(12345, 7, 3, Bound.EXACT, 5)
+        entry = other.probe(12345)
+        assert entry is not None and (entry.score, entry.depth, entry.move) == (7, 3, 5)
+        # 世代も共有される
+        table.advance()
+        assert other._generation == table._generation == 2
+        other.new_search()
+        assert table._generation == 2
+        # 壊れたエントリは外れとして読まれる
+        other._checks[12345 & 1023] ^= np.uint64(1)
+        assert table.probe(12345) is None
+    finally:
+        other.close()
+        table.close()
+
+
+def test_single_worker_matches_search() -> None:
+    game = benchmark_positions(6, 1)[0]
+    expected = AlphaBetaSearch().search(game, None, 4)
+    with ParallelSearch(1, entries=1 << 12) as search:
+        result = search.search(game, None, 4)
+    assert (result.action, result.score, result.depth) == (
+        expected.action,
+        expected.score,
+        expected.depth,
+    )
+
+
+def test_workers() -> None:
+    game = benchmark_positions(6, 1)[0]
+    expected = AlphaBetaSearch().search(game, None, 4)
+    with ParallelSearch(2, entries=1 << 12) as search:
+        result = search.search(game, None, 4)
+        # helperの手も数える
+        assert result.nodes > 0
+        assert result.depth == expected.depth
+        assert game.is_legal_action(result.action)
+        result = search.search(game, 0.05, None)
+        assert game.is_legal_action(result.action)
+
+
+def test_player() -> None:
+    player = make_player("parallel:workers=2,time_limit=none,max_depth=2")
+    assert isinstance(player, ParallelPlayer)
+    try:
+        game = Game.init_game(6)
+        while not game.is_game_over():
+            game.execute_action(player.play(game))
+        assert player.last_result is not None
+    finally:
+        player.close()
+    with pytest.raises(ValueError):
+        ParallelSearch(0)
+
+
+def test_measure_scaling() -> None:
+    results = measure_scaling(benchmark_positions(6, 2), [1, 2], 3, entries=1 << 12)
+    assert [result.workers for result in results] == [1, 2]
+    assert results[0].speedup == 1.0
+    assert all(result.nps > 0 for result in results)
+    assert results[1].nps_per_worker == pytest.approx(results[1].nps / 2)
@@ -0,0 +1,27 @@
+import pytest
+
+from pyreversi import logic
+from pyreversi.perft import KNOWN, engines, main, run
+
+
+@pytest.mark.parametrize("engine", engines())
+def test_known(engine: str) -> None:
+    for depth in range(6):
+        assert run(engine, 8, depth).nodes == KNOWN[8][depth]
+    assert logic.get_backend() == "python"
+
+
+@pytest.mark.parametrize("length, depth", [(4, 9), (6, 5)])
+def test_engines_agree(length: int, depth: int) -> None:
+    # 4x4ではパスと終局を含む
+    counts = {run(engine, length, depth).nodes for engine in engines()}
+    assert len(counts) == 1
+
+
+def test_main(capsys: pytest.CaptureFixture[str]) -> None:
+    main(["--length", "4", "8", "--depth", "3", "--engine", "mutable", "python"])
+    out = capsys.readouterr().out
+    assert "mutable 8x8 depth 3 nodes 56" in out
+    assert "nodes/s" in out
+    with pytest.raises(ValueError):
+        run("unknown", 8, 1)
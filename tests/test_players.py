@@ -1,8 +1,9 @@
 import numpy as np
+import pytest
 
 from pyreversi.game import Game
 from pyreversi.models import Board, Disk, Position, Square
-from pyreversi.players import GreedyPlayer
+from pyreversi.players import GreedyPlayer, check_spec, parse_spec
 
 
 def test_greedy_player() -> None:
@@ -18,3 +19,34 @@ def test_greedy_player() -> None:
     assert GreedyPlayer().play(game) == Position(0, 0)
     game.execute_action(Position(0, 0))
     assert GreedyPlayer().play(game) is None
+
+
+def test_parse_spec() -> None:
+    assert parse_spec("mcts:playouts=none,reuse=false,exploration=1") == (
+        "mcts",
+        {"playouts": None, "reuse": False, "exploration": 1},
+    )
+    with pytest.raises(ValueError, match="unknown player"):
+        parse_spec("nobody")
+    with pytest.raises(ValueError, match="malformed"):
+        parse_spec("alphabeta:max_depth")
+
+
+def test_check_spec() -> None:
+    for spec in [
+        "random",
+        "alphabeta:time_limit=none,max_depth=2",
+        "alphabeta:time_limit=1,evaluator=weights.npz",
+        "mcts:reuse=true,exploration=2",
+        "book:path=book.npy,inner=greedy",
+    ]:
+        check_spec(spec)
+    for spec in [
+        "random:depth=1",
+        "alphabeta:max_depth=abc",
+        "alphabeta:max_depth=1.5",
+        "mcts:reuse=1",
+        "parallel:workers=none",
+    ]:
+        with pytest.raises(ValueError):
+            check_spec(spec)
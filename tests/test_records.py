@@ -0,0 +1,151 @@
+import os
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pytest
+
+from pyreversi.game import Game
+from pyreversi.models import Disk
+from pyreversi.players import RandomPlayer
+from pyreversi.records import (
+    GameRecord,
+    RecordReader,
+    RecordWriter,
+    encode_record,
+    replay,
+    replay_arrays,
+)
+from pyreversi.tournament import GameResult, play_game, run_tournament
+
+
+def _write_games(args: Tuple[str, int, int, int]) -> None:
+    path, length, seed, games = args
+    np.random.seed(seed)
+    with RecordWriter(path) as writer:
+        for _ in range(games):
+            result = play_game(RandomPlayer(), RandomPlayer(), length)
+            writer.write(length, result.actions, result.difference)
+
+
+@pytest.mark.parametrize("length", [4, 6, 8, 16])
+def test_replay(length: int) -> None:
+    np.random.seed(length)
+    result: GameResult = play_game(RandomPlayer(), RandomPlayer(), length)
+    data = encode_record(length, result.actions, result.difference)
+    moves = [action for action in result.actions if action is not None]
+    assert len(data) == 6 + len(moves)
+    record = GameRecord(length, data[6:], result.difference)
+    assert record.actions() == moves
+
+    game = Game.init_game(length)
+    replayed = list(replay(record))
+    assert len(replayed) == len(result.actions)
+    for (mutable, move), action in zip(replayed, result.actions):
+        assert move == (None if action is None else action.row * length + action.col)
+        game.execute_action(action)
+    assert game.is_game_over()
+    assert game.count_disk(Disk.DARK) - game.count_disk(Disk.LIGHT) == record.score
+
+    configs, disks, squares = replay_arrays(record)
+    assert configs.shape == (len(moves), length, length)
+    assert squares.tolist() == list(record.moves)
+    game = Game.init_game(length)
+    index = 0
+    for action in result.actions:
+        if action is not None:
+            np.testing.assert_array_equal(configs[index], game.board.config)
+            assert disks[index] == game.current_disk
+            index += 1
+        game.execute_action(action)
+
+
+def test_encode_record_too_large() -> None:
+    with pytest.raises(ValueError):
+        encode_record(18, [], 0)
+
+
+def test_writer_reader(tmp_path: Path) -> None:
+    path = str(tmp_path / "games.rec")
+    Path(path).touch()
+    with RecordReader(path) as reader:
+        assert len(reader) == 0
+        assert not list(reader)
+
+    with Pool(2) as pool:
+        pool.map(_write_games, [(path, 6, seed, 5) for seed in range(4)])
+    with RecordReader(path) as reader:
+        records = list(reader)
+        assert len(reader) == len(records) == 20
+        for i, record in enumerate(records):
+            assert reader[i] == record
+        assert reader[-1] == records[-1]
+        positions = list(reader.positions())
+    assert len(positions) == sum(len(list(replay(record))) for record in records)
+    board, disk, record = positions[0]
+    assert board == Game.init_game(6).board and disk == Disk.DARK
+
+    # 追記後は索引の続きから読む
+    _write_games((path, 4, 9, 3))
+    with RecordReader(path) as reader:
+        assert len(reader) == 23
+        assert reader[22].length == 4
+        assert list(reader)[-1] == reader[22]
+
+    with open(path, "r+b") as file:
+        file.write(b"\x00")
+    Path(path + ".idx").unlink()
+    with RecordReader(path) as reader:
+        with pytest.raises(ValueError):
+            list(reader)
+
+
+def test_tournament_record(tmp_path: Path) -> None:
+    path = str(tmp_path / "games.rec")
+    stats = list(run_tournament("random", "greedy", 4, 6, 0, 4, seed=2, record=path))
+    with RecordReader(path) as reader:
+        records = list(reader)
+    assert len(records) == stats[-1].games == 6
+    assert all(record.length == 4 for record in records)
+
+
+def test_torn_and_stale(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "games.rec"
+    write = os.write
+    # 一度に3バイトしか書かないos.writeでも全て書く
+    monkeypatch.setattr(os, "write", lambda fd, data: write(fd, bytes(data[:3])))
+    _write_games((str(path), 4, 0, 3))
+    monkeypatch.undo()
+    data = path.read_bytes()
+    with RecordReader(str(path)) as reader:
+        records = list(reader)
+        assert len(reader) == 3
+    # 書きかけの末尾の棋譜は読まない
+    for size in (len(data) + 2, len(data) + 8):
+        path.write_bytes(
+            data + encode_record(4, records[0].actions(), 0)[: size - len(data)]
+        )
+        with RecordReader(str(path)) as reader:
+            assert list(reader) == records
+            assert len(reader) == 3
+    # 別の内容に置き換わった古い索引は作り直す
+    path.write_bytes(b"".join(encode_record(4, r.actions()[:1], 0) for r in records))
+    path.write_bytes(path.read_bytes() + data)
+    with RecordReader(str(path)) as reader:
+        assert len(reader) == 6
+        assert reader[5] == records[2]
+
+
+def test_index_not_writable(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "games.rec"
+    _write_games((str(path), 4, 1, 2))
+
+    def fail(*_: object) -> None:
+        raise PermissionError("read-only")
+
+    # 索引を保存できなくても読める
+    monkeypatch.setattr(os, "replace", fail)
+    with RecordReader(str(path)) as reader:
+        assert len(reader) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["games.rec"]
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+
+from pyreversi.game import Game
+from pyreversi.models import Board, Disk, Position, Square
+from pyreversi.mutable import MutableGame
+from pyreversi.players import RandomPlayer
+from pyreversi.search import WIN_SCORE, AlphaBetaPlayer, AlphaBetaSearch, final_score
+from pyreversi.transposition import TranspositionTable
+
+
+def _minimax(game: MutableGame) -> int:
+    moves = game.legal_moves()
+    if not moves:
+        if game.is_game_over():
+            return final_score(game.player, game.opponent)
+        game.make_move_mask(0)
+        score = -_minimax(game)
+        game.unmake_move()
+        return score
+    best = -WIN_SCORE * 2
+    for index in range(game.length * game.length):
+        if moves >> index & 1:
+            game.make_move_mask(1 << index)
+            best = max(best, -_minimax(game))
+            game.unmake_move()
+    return best
+
+
+def test_search_exact() -> None:
+    random.seed(1)
+    for _ in range(5):
+        game = Game.init_game(4)
+        for _ in range(3):
+            actions = sorted(game.get_legal_actions())
+            game.execute_action(random.choice(actions) if actions else None)
+        result = AlphaBetaSearch().search(game)
+        if game.is_game_over():
+            continue
+        assert result.score == _minimax(MutableGame.from_game(game))
+        table = TranspositionTable(1 << 10)
+        for _ in range(2):
+            assert AlphaBetaSearch(table=table).search(game).score == result.score
+        if result.action is not None:
+            assert game.is_legal_action(result.action)
+
+
+def test_search_winning_move() -> None:
+    config = np.array(
+        [
+            [Square.NULL, Square.LIGHT, Square.DARK],
+            [Square.NULL, Square.LIGHT, Square.DARK],
+            [Square.NULL, Square.DARK, Square.DARK],
+        ],
+        dtype=np.int8,
+    )
+    result = AlphaBetaSearch().search(Game(Board(config), Disk.DARK))
+    assert result.action == Position(0, 0)
+    assert result.score > WIN_SCORE
+
+
+def test_alpha_beta_player() -> None:
+    random.seed(0)
+    player = AlphaBetaPlayer(time_limit=0.05)
+    game = Game.init_game(8)
+    players = [player, RandomPlayer()]
+    turn = 0
+    while not game.is_game_over():
+        game.execute_action(players[turn % 2].play(game))
+        turn += 1
+        if turn == 1:
+            assert player.last_result is not None
+            assert player.last_result.nodes > 0
+            assert player.last_result.nps > 0
+            assert player.last_result.elapsed < 0.5
+    assert game.count_disk(Disk.DARK) > game.count_disk(Disk.LIGHT)
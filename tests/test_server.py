@@ -0,0 +1,242 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple, cast
+
+import pytest
+
+from pyreversi import instrumentation, server
+from pyreversi.mcts import MCTSPlayer
+from pyreversi.models import Position
+from pyreversi.players import RandomPlayer
+from pyreversi.server import Client, GameServer, Message
+
+
+def run_with_server(
+    test: Callable[[GameServer, Client], Awaitable[None]],
+    game_server: Optional[GameServer] = None,
+) -> None:
+    async def main(game_server: GameServer) -> None:
+        await game_server.start()
+        try:
+            async with await Client.connect(port=game_server.port) as client:
+                await test(game_server, client)
+        finally:
+            await game_server.close()
+
+    asyncio.run(main(game_server or GameServer(port=0, workers=0)))
+
+
+def legal(state: Message) -> List[Tuple[int, int]]:
+    return [(row, col) for row, col in cast(List[List[int]], state["legal"])]
+
+
+def ai_actions(state: Message) -> List[Message]:
+    return cast(List[Message], state["ai_actions"])
+
+
+def session_of(state: Message) -> str:
+    return cast(str, state["session"])
+
+
+async def play_to_end(client: Client, **options: object) -> Message:
+    state = await client.new_game(**options)
+    while not state["game_over"]:
+        actions = legal(state)
+        state = await client.move(session_of(state), actions[0] if actions else None)
+        assert state["type"] == "state"
+    return state
+
+
+def slow_move(spec: str, config: bytes, length: int, disk: int) -> Optional[Position]:
+    time.sleep(0.3)
+    return None
+
+
+def failing_move(
+    spec: str, config: bytes, length: int, disk: int
+) -> Optional[Position]:
+    raise RuntimeError("broken player")
+
+
+def test_new_game() -> None:
+    async def test(_: GameServer, client: Client) -> None:
+        state = await client.new_game(length=6, player="greedy", color="dark")
+        assert state["type"] == "state"
+        assert state["turn"] == "dark"
+        assert state["ai_actions"] == []
+        assert state["score"] == {"dark": 2, "light": 2}
+        assert len(legal(state)) == 4
+        # AIが黒なら先に打つ
+        state = await client.new_game(length=6, player="greedy", color="light")
+        assert state["turn"] == "light"
+        assert len(ai_actions(state)) == 1
+        assert state["score"] == {"dark": 4, "light": 1}
+
+    run_with_server(test)
+
+
+def test_play_game() -> None:
+    async def test(_: GameServer, client: Client) -> None:
+        state = await play_to_end(client, length=4, player="random")
+        assert sum(cast(Dict[str, int], state["score"]).values()) <= 16
+        again = await client.state(session_of(state))
+        assert again["board"] == state["board"]
+        assert (await client.close_game(session_of(state)))["type"] == "closed"
+        assert (await client.state(session_of(state)))["type"] == "error"
+
+    run_with_server(test)
+
+
+def test_process_pool() -> None:
+    async def test(_: GameServer, client: Client) -> None:
+        state = await play_to_end(client, length=6, player="alphabeta:max_depth=2")
+        assert state["game_over"]
+
+    run_with_server(test, GameServer(port=0, workers=1))
+
+
+def test_errors() -> None:
+    async def test(game_server: GameServer, client: Client) -> None:
+        assert (await client.request(type="unknown"))["type"] == "error"
+        assert (await client.new_game(player="nobody"))["type"] == "error"
+        assert (await client.new_game(length=5))["type"] == "error"
+        state = await client.new_game(length=6)
+        response = await client.move(session_of(state), (0, 0))
+        assert response["type"] == "error"
+        assert "illegal" in cast(str, response["error"])
+        assert (await client.move("missing", (0, 0)))["type"] == "error"
+        # 作れないplayerはsessionを作らずに断る
+        for player in ["alphabeta:max_depth=abc", "alphabeta:depth=2"]:
+            response = await client.new_game(player=player, color="light")
+            assert response["type"] == "error"
+        for move_timeout in [None, "1", 0, -1.0, float("nan"), float("inf"), True]:
+            response = await client.new_game(move_timeout=move_timeout)
+            assert "move_timeout" in cast(str, response["error"])
+        assert len(game_server.sessions) == 1
+
+    run_with_server(test)
+
+
+def test_internal_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def handle(self: GameServer, request: Message) -> Message:
+        raise KeyError("bug")
+
+    monkeypatch.setattr(GameServer, "handle", handle)
+
+    async def test(_: GameServer, client: Client) -> None:
+        response = await client.stats()
+        assert response["type"] == "error"
+        assert "internal error" in cast(str, response["error"])
+        # 接続は使い続けられる
+        assert (await client.stats())["type"] == "error"
+
+    run_with_server(test)
+
+
+def test_ai_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "_ai_move", failing_move)
+
+    async def test(game_server: GameServer, client: Client) -> None:
+        # 最初の手で失敗したsessionは残らない
+        response = await client.new_game(length=6, color="light")
+        assert response["type"] == "error"
+        assert "broken player" in cast(str, response["error"])
+        assert not game_server.sessions
+        state = await client.new_game(length=6, color="dark")
+        response = await client.move(session_of(state), legal(state)[0])
+        assert response["type"] == "error"
+        assert not game_server.sessions
+
+    run_with_server(test)
+
+
+def test_max_sessions() -> None:
+    async def test(game_server: GameServer, client: Client) -> None:
+        await client.new_game(length=4)
+        assert (await client.new_game(length=4))["type"] == "error"
+        assert len(game_server.sessions) == 1
+
+    run_with_server(test, GameServer(port=0, workers=0, max_sessions=1))
+
+
+def test_move_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "_ai_move", slow_move)
+
+    async def test(game_server: GameServer, client: Client) -> None:
+        state = await client.new_game(length=6, color="light", move_timeout=0.05)
+        # 時間切れでも合法手が打たれる
+        assert ai_actions(state)[0]["timeout"]
+        assert state["score"] == {"dark": 4, "light": 1}
+        # 時間切れの手が終わるまでpoolの枠は空かない
+        pending = game_server._pending
+        assert pending is not None and pending.locked()
+        await asyncio.sleep(0.5)
+        assert not pending.locked()
+
+    run_with_server(test, GameServer(port=0, workers=0, max_pending=1))
+
+
+def test_concurrent_sessions() -> None:
+    async def test(_: GameServer, client: Client) -> None:
+        states = await asyncio.gather(
+            *(play_to_end(client, length=4, player="greedy") for _ in range(20))
+        )
+        assert all(state["game_over"] for state in states)
+        stats = await client.stats()
+        assert stats["sessions"] == 20
+        latency = cast(Dict[str, Dict[str, float]], stats["latency_ms"])
+        assert latency["new"]["count"] == 20
+        assert latency["move"]["p50"] <= latency["move"]["p99"]
+
+    run_with_server(test, GameServer(port=0, workers=0, max_inflight=4))
+
+
+def test_cached_players(monkeypatch: pytest.MonkeyPatch) -> None:
+    closed: List[Optional[int]] = []
+
+    def close(self: MCTSPlayer) -> None:
+        closed.append(self.playouts)
+
+    monkeypatch.setattr(server, "_players", {})
+    monkeypatch.setattr(server, "_MAX_PLAYERS", 2)
+    monkeypatch.setattr(MCTSPlayer, "close", close)
+    first = server._cached_player("mcts:playouts=1")
+    server._cached_player("mcts:playouts=2")
+    assert server._cached_player("mcts:playouts=1") is first
+    # 最も長く使われていないplayerが閉じられる
+    server._cached_player("mcts:playouts=3")
+    assert closed == [2]
+    assert list(server._players) == ["mcts:playouts=1", "mcts:playouts=3"]
+
+
+def test_latency_tracker() -> None:
+    tracker = server.LatencyTracker(window=100)
+    for i in range(1, 201):
+        tracker.record("move", i / 1000)
+    report = tracker.report()["move"]
+    assert report["count"] == 200
+    # 直近の100件だけが百分位数に使われる
+    assert 149 <= report["p50"] <= 151
+    assert report["p99"] <= 200
+
+
+def test_main_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
+    served: List[Tuple[int, str]] = []
+
+    def serve(port: int, host: str) -> None:
+        served.append((port, host))
+
+    def run(coroutine: Coroutine[None, None, None]) -> None:
+        coroutine.close()
+
+    monkeypatch.setattr(instrumentation, "serve", serve)
+    monkeypatch.setattr(asyncio, "run", run)
+    server.main(["--workers", "0", "--port", "0"])
+    assert not served and not instrumentation.enabled
+    try:
+        server.main(["--workers", "0", "--port", "0", "--metrics-port", "9100"])
+        assert served == [(9100, "0.0.0.0")]
+        assert hasattr(RandomPlayer.play, "__wrapped__")
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
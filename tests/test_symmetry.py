@@ -0,0 +1,88 @@
+from typing import FrozenSet
+
+import numpy as np
+import pytest
+
+from pyreversi import logic, symmetry
+from pyreversi.models import Board, Disk, Position
+from pyreversi.symmetry import SymmetryCache, canonicalize
+from tests.conftest import random_game
+
+
+@pytest.mark.parametrize("length", [4, 5, 8])
+def test_permutations(length: int) -> None:
+    grid = np.arange(length * length).reshape(length, length)
+    images = {symmetry.transform(grid, s).tobytes() for s in range(8)}
+    assert len(images) == symmetry.SYMMETRIES
+    forward = symmetry.permutations(length)
+    inverse = symmetry.inverse_permutations(length)
+    for s in range(symmetry.SYMMETRIES):
+        assert (symmetry.transform(grid, s).ravel() == forward[s]).all()
+        assert (forward[s][inverse[s]] == np.arange(length * length)).all()
+        for square in (0, 1, length * length - 1):
+            moved = symmetry.transform_square(square, length, s)
+            assert symmetry.restore_square(moved, length, s) == square
+    with pytest.raises(ValueError):
+        forward[0][0] = 1
+    # 先頭の次元はそのまま
+    configs = np.stack([grid, -grid])
+    assert (symmetry.transform(configs, 3)[1] == -symmetry.transform(grid, 3)).all()
+
+
+def test_canonicalize() -> None:
+    board = random_game(8, 52).board
+    form = canonicalize(board)
+    for s in range(symmetry.SYMMETRIES):
+        image = Board(symmetry.transform(board.config, s))
+        assert canonicalize(image).key == form.key
+    assert form.board.config.tobytes() == form.key
+    assert (symmetry.transform(board.config, form.symmetry) == form.board.config).all()
+    # 初期盤面は対称なので複数の変換が正規形を与える
+    assert len(canonicalize(logic.init_board(8)).symmetries) > 1
+
+
+def test_move_mapping() -> None:
+    game = random_game(8, 52)
+    form = canonicalize(game.board)
+    canonical_actions = logic.obtain_legal_actions(form.board, game.current_disk)
+    assert {form.to_original(a) for a in canonical_actions} == game.get_legal_actions()
+    for action in game.get_legal_actions():
+        assert form.to_original(form.to_canonical(action)) == action
+    # 対称な初期盤面では，同等な4手が1つの手にそろう
+    initial = canonicalize(logic.init_board(8))
+    actions = logic.obtain_legal_actions(logic.init_board(8), Disk.DARK)
+    assert len({initial.to_canonical(action) for action in actions}) == 1
+
+
+def test_cache() -> None:
+    cache = SymmetryCache(maxsize=2)
+    game = random_game(8, 52)
+
+    def legal(board: Board, disk: Disk) -> FrozenSet[Position]:
+        return logic.obtain_legal_actions(board, disk)
+
+    for s in range(symmetry.SYMMETRIES):
+        board = Board(symmetry.transform(game.board.config, s))
+        actions, form = cache.get_or_compute(board, game.current_disk, legal, "legal")
+        assert {form.to_original(a) for a in actions} == logic.obtain_legal_actions(
+            board, game.current_disk
+        )
+    stats = cache.stats()["legal"]
+    assert (stats.hits, stats.misses) == (7, 1)
+    assert stats.hit_rate == pytest.approx(7 / 8)
+    assert "hit rate 87.5%" in cache.report()
+    # 手番が違えば別の局面
+    assert cache.get(canonicalize(game.board), Disk(-game.current_disk)) is None
+    # LRU
+    cache.put(canonicalize(logic.init_board(4)), Disk.DARK, 1)
+    cache.put(canonicalize(logic.init_board(6)), Disk.DARK, 2)
+    assert len(cache) == 2
+    assert cache.get(canonicalize(game.board), game.current_disk, "legal") is None
+    cache.resize(1)
+    assert cache.get(canonicalize(logic.init_board(6)), Disk.DARK) == 2
+    cache.clear()
+    assert len(cache) == 0 and not cache.stats()
+
+
+def test_shared_cache() -> None:
+    assert symmetry.shared_cache() is symmetry.shared_cache()
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import pytest
+
+from pyreversi.players import GreedyPlayer, RandomPlayer, make_player
+from pyreversi.search import AlphaBetaPlayer
+from pyreversi.tournament import TournamentStats, main, play_game, run_tournament
+
+
+def test_make_player() -> None:
+    assert isinstance(make_player("random"), RandomPlayer)
+    assert isinstance(make_player("greedy"), GreedyPlayer)
+    player = make_player("alphabeta:time_limit=0.5,max_depth=none")
+    assert isinstance(player, AlphaBetaPlayer)
+    assert player.time_limit == 0.5
+    assert player.max_depth is None
+    with pytest.raises(ValueError):
+        make_player("unknown")
+    with pytest.raises(ValueError):
+        make_player("alphabeta:max_depth")
+
+
+def test_play_game() -> None:
+    result = play_game(RandomPlayer(), GreedyPlayer(), 4)
+    assert -16 <= result.difference <= 16
+    assert len(result.actions) >= 1
+
+
+def test_tournament_stats() -> None:
+    stats = TournamentStats(6, 2, 2, 2.0)
+    assert stats.games == 10
+    assert stats.score == 0.7
+    assert stats.games_per_second == 5.0
+    lower, upper = stats.confidence_interval()
+    assert 0.0 <= lower < 0.7 < upper <= 1.0
+    assert "score 0.7000" in str(stats)
+
+
+def test_run_tournament(capsys: pytest.CaptureFixture[str]) -> None:
+    in_process = list(run_tournament("random", "greedy", 4, 9, 0, 4, seed=1))
+    assert len(in_process) == 3
+    assert in_process[-1].games == 9
+    in_pool = list(run_tournament("random", "greedy", 4, 9, 2, 4, seed=1))
+    assert in_pool[-1].games == 9
+    # 各chunkの乱数はworkerによらない
+    assert in_pool[-1][:3] == in_process[-1][:3]
+    main(["random", "random", "--length", "4", "--games", "4", "--workers", "0"])
+    assert "random vs random: games 4" in capsys.readouterr().out
+    # 不正な引数はworkerに送る前に断る
+    with pytest.raises(ValueError, match="max_depth"):
+        next(run_tournament("random", "alphabeta:max_depth=abc", 4, 2, 0))
+
+
+def test_in_process_keeps_random_state() -> None:
+    # workers=0ではchunkごとに乱数を設定し直すが，呼び出し側の状態は戻す
+    random.seed(5)
+    np.random.seed(5)
+    expected = random.random(), np.random.random()
+    random.seed(5)
+    np.random.seed(5)
+    list(run_tournament("random", "random", 4, 2, 0, seed=1))
+    assert (random.random(), np.random.random()) == expected
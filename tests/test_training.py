@@ -0,0 +1,58 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from pyreversi.evaluation import PatternEvaluator
+from pyreversi.players import GreedyPlayer, Player, RandomPlayer
+from pyreversi.records import RecordReader, RecordWriter, replay_arrays
+from pyreversi.tournament import play_game
+from pyreversi.training import iter_batches, main, train
+
+
+def _record(path: str, length: int, games: int) -> None:
+    with RecordWriter(path) as writer:
+        for i in range(games):
+            players: List[Player] = [RandomPlayer(), GreedyPlayer()]
+            if i % 2 == 0:
+                players.reverse()
+            result = play_game(players[0], players[1], length)
+            writer.write(length, result.actions, result.difference)
+
+
+# RandomPlayerとGreedyPlayerはrandomを使う
+@pytest.mark.usefixtures("seeded_random")
+def test_iter_batches(tmp_path: Path) -> None:
+    path = str(tmp_path / "games.rec")
+    _record(path, 4, 20)
+    _record(path, 6, 2)
+    with RecordReader(path) as reader:
+        expected = sorted(
+            (config.tobytes(), int(disk), float(record.score * disk))
+            for record in reader
+            if record.length == 4
+            for config, disk in zip(*replay_arrays(record)[:2])
+        )
+        batches = list(iter_batches(reader, 4, 16, 40, np.random.default_rng(0)))
+    assert all(len(batch[0]) <= 16 for batch in batches)
+    streamed = sorted(
+        (config.tobytes(), int(disk), float(target))
+        for configs, disks, targets in batches
+        for config, disk, target in zip(configs, disks, targets)
+    )
+    assert streamed == expected
+
+
+@pytest.mark.usefixtures("seeded_random")
+def test_train(tmp_path: Path) -> None:
+    path = str(tmp_path / "games.rec")
+    _record(path, 6, 60)
+    evaluator, losses = train(path, 6, epochs=4, phases=2, batch_size=256)
+    assert evaluator.weights.shape[0] == 2
+    assert losses[-1] < losses[0]
+
+    output = str(tmp_path / "weights.npz")
+    main([path, output, "--length", "6", "--phases", "2", "--batch-size", "128"])
+    loaded = PatternEvaluator.load(output)
+    assert loaded.length == 6 and np.any(loaded.weights != 0)
@@ -0,0 +1,46 @@
+import pytest
+
+from pyreversi.transposition import Bound, Entry, TranspositionTable
+
+
+def test_store_probe() -> None:
+    table = TranspositionTable(1000)
+    assert len(table) == 512
+    assert table.nbytes == 512 * 16
+    key = 0xFEDCBA9876543210
+    assert table.probe(key) is None
+    table.store(key, -1234, 5, Bound.LOWER, 27)
+    assert table.probe(key) == Entry(-1234, 5, Bound.LOWER, 27)
+    table.store(key, 7, 6, Bound.EXACT, -1)
+    assert table.probe(key) == Entry(7, 6, Bound.EXACT, -1)
+    table.store(key, 7, 6, Bound.UPPER, None)
+    assert table.probe(key) == Entry(7, 6, Bound.UPPER, None)
+    # same index, different key
+    assert table.probe(key ^ 1 << 40) is None
+    table.clear()
+    assert table.probe(key) is None
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
+    with pytest.raises(ValueError):
+        TranspositionTable(16, policy="unknown")
+
+
+def test_replacement_policy() -> None:
+    key = 3
+    other = 3 | 1 << 40
+    table = TranspositionTable(16, policy="depth")
+    table.store(key, 1, 8, Bound.EXACT, 0)
+    table.store(other, 2, 4, Bound.EXACT, 0)
+    assert table.probe(key) is not None
+    assert table.probe(other) is None
+    table.store(other, 2, 8, Bound.EXACT, 0)
+    assert table.probe(other) is not None
+    table.new_search()
+    table.store(key, 1, 1, Bound.EXACT, 0)
+    assert table.probe(key) == Entry(1, 1, Bound.EXACT, 0)
+
+    table = TranspositionTable(16, policy="always")
+    table.store(key, 1, 8, Bound.EXACT, 0)
+    table.store(other, 2, 4, Bound.EXACT, 0)
+    assert table.probe(key) is None
+    assert table.probe(other) == Entry(2, 4, Bound.EXACT, 0)
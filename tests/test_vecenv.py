@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from pyreversi import batch
+from pyreversi.game import Game
+from pyreversi.models import Disk, Position
+from pyreversi.vecenv import VecGame
+
+
+def flat_legal(game: Game, length: int) -> np.ndarray:
+    mask = np.zeros(length * length, dtype=bool)
+    for action in game.get_legal_actions():
+        mask[action.row * length + action.col] = True
+    return mask
+
+
+@pytest.mark.parametrize("length", [4, 6, 8])
+def test_step_matches_game(length: int) -> None:
+    num_games = 16
+    env = VecGame(num_games, length)
+    games = [Game.init_game(length) for _ in range(num_games)]
+    rng = np.random.default_rng(length)
+    finished = 0
+    for _ in range(3 * length * length):
+        legal = env.legal_mask()
+        for index, game in enumerate(games):
+            assert (env.configs[index] == game.board.config).all()
+            assert env.disks[index] == game.current_disk
+            assert (legal[index] == flat_legal(game, length)).all()
+        actions = env.random_actions(rng)
+        movers = env.disks.copy()
+        result = env.step(actions)
+        for index, game in enumerate(games):
+            game.execute_action(Position(*divmod(int(actions[index]), length)))
+            # パスは自動
+            if not game.is_game_over() and not game.get_legal_actions():
+                game.execute_action(None)
+            assert result.dones[index] == game.is_game_over()
+            if game.is_game_over():
+                finished += 1
+                score = game.count_disk(Disk.DARK) - game.count_disk(Disk.LIGHT)
+                assert result.scores[index] == score
+                assert result.rewards[index] == np.sign(score * movers[index])
+                games[index] = Game.init_game(length)
+            else:
+                assert result.rewards[index] == 0
+        assert (result.observations == env.configs * env.disks[:, None, None]).all()
+    assert finished > num_games
+
+
+def test_no_auto_reset() -> None:
+    env = VecGame(8, 4, auto_reset=False)
+    rng = np.random.default_rng(0)
+    while not env.dones.all():
+        env.step(env.random_actions(rng))
+    assert not env.legal_mask().any()
+    configs = env.configs.copy()
+    # 終わったゲームの手は無視される
+    result = env.step(np.zeros(8, dtype=np.int64))
+    assert (env.configs == configs).all()
+    assert not result.dones.any()
+    env.reset(np.arange(8) < 3)
+    assert not env.dones[:3].any() and env.dones[3:].all()
+    assert env.legal_mask()[:3].sum() == 12
+
+
+def test_illegal_action() -> None:
+    env = VecGame(2, 8)
+    with pytest.raises(ValueError):
+        env.step(np.array([0, 0]))
+    with pytest.raises(ValueError):
+        env.step(np.array([64, 64]))
+
+
+@pytest.mark.parametrize("length", [4, 8, 10])
+def test_batch_legal_mask(length: int) -> None:
+    env = VecGame(64, length)
+    rng = np.random.default_rng(1)
+    for _ in range(length * length):
+        expected = batch.obtain_legal_actions(env.configs, env.disks)[0]
+        assert (batch.legal_mask(env.configs, env.disks) == expected).all()
+        env.step(env.random_actions(rng))
@@ -0,0 +1,39 @@
+import random
+
+from pyreversi import zobrist
+from pyreversi.game import Game
+from pyreversi.logic import init_board
+from pyreversi.models import Disk
+from pyreversi.mutable import MutableGame
+
+
+def test_hash_board() -> None:
+    board = init_board(8)
+    assert zobrist.hash_board(board, Disk.DARK) == zobrist.hash_board(
+        init_board(8), Disk.DARK
+    )
+    assert (
+        zobrist.hash_board(board, Disk.DARK) ^ zobrist.hash_board(board, Disk.LIGHT)
+        == zobrist.keys(8).side
+    )
+    assert zobrist.hash_board(board, Disk.DARK) != zobrist.hash_board(
+        init_board(6), Disk.DARK
+    )
+
+
+def test_incremental_key() -> None:
+    random.seed(0)
+    game = Game.init_game(6)
+    mutable = MutableGame.from_game(game)
+    keys = [mutable.key]
+    while not game.is_game_over():
+        actions = sorted(game.get_legal_actions())
+        action = random.choice(actions) if actions else None
+        game.execute_action(action)
+        mutable.make_move(action)
+        assert mutable.key == zobrist.hash_board(game.board, game.current_disk)
+        keys.append(mutable.key)
+    while mutable.ply:
+        mutable.unmake_move()
+        keys.pop()
+        assert mutable.key == keys[-1]